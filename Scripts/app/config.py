@@ -1,11 +1,16 @@
 # scripts/app/config.py
 
+import sys
 from pathlib import Path
 
 ROOT_DIR = Path(__file__).parents[2]
 DATA_DIR = ROOT_DIR / "data"
 MODEL_DIR = ROOT_DIR / "models"
 
+# Rendre importable le package "api" (modules partagés : datastore, ...)
+if str(ROOT_DIR) not in sys.path:
+    sys.path.insert(0, str(ROOT_DIR))
+
 # Remplace ceci :
 # DEFAULT_DATA_FILE = "dataset_clean.csv"
 # par :
@@ -2,7 +2,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from app.utils.data_loader import load_data
+from app import config  # noqa: F401 - rend le package "api" importable
+from api.partitions import partitions_version
+from app.utils.data_loader import department_selector, load_data
+from app.utils.filters import filter_engine
+from app.utils.pagination import paginate, sort_index
 from app.utils.ui_style import apply_greentech_style
 
 # ======================================================
@@ -15,15 +19,21 @@ st.title("🔍 Exploration des données DPE")
 # 🔁 Rafraîchissement des données ADEME
 # ======================================================
 
+import time
 import requests
 
 API_URL = "http://127.0.0.1:8000"  # à adapter selon ton déploiement local ou Render
 
-# --- Lecture de la dernière mise à jour ---
+# --- Lecture de la dernière mise à jour (revalidation via ETag : 304 si inchangée) ---
+cached = st.session_state.get("last_update_cache", {})
 try:
-    r = requests.get(f"{API_URL}/last_update", timeout=15)
-    if r.status_code == 200:
+    headers = {"If-None-Match": cached["etag"]} if cached.get("etag") else {}
+    r = requests.get(f"{API_URL}/last_update", headers=headers, timeout=15)
+    if r.status_code == 304:
+        last_date = cached["value"]
+    elif r.status_code == 200:
         last_date = r.json().get("last_update", "Non disponible")
+        st.session_state.last_update_cache = {"etag": r.headers.get("ETag"), "value": last_date}
     else:
         last_date = "Non disponible"
 except Exception:
@@ -34,32 +44,64 @@ with st.container(border=True):
     st.markdown(f"**Dernière mise à jour enregistrée :** `{last_date}`")
 
     if st.button("🔁 Rafraîchir les données depuis l’ADEME"):
-        with st.spinner("⏳ Mise à jour en cours... (cela peut prendre quelques minutes)"):
+        # --- Lancement de la tâche de fond (réponse immédiate avec son identifiant) ---
+        try:
+            res = requests.post(f"{API_URL}/refresh_data", timeout=15)
+            if res.status_code == 202:
+                st.session_state.refresh_job_id = res.json()["job_id"]
+            elif res.status_code == 409:
+                st.info("ℹ️ Un rafraîchissement est déjà en cours, suivi de sa progression.")
+                st.session_state.refresh_job_id = res.json()["detail"]["job_id"]
+            else:
+                st.error(f"Erreur {res.status_code}")
+                st.code(res.text)
+        except Exception as e:
+            st.error(f"❌ Erreur de connexion à l’API : {e}")
+
+    # --- Suivi de la tâche (sondage de /jobs/{id}) ---
+    job_id = st.session_state.get("refresh_job_id")
+    if job_id:
+        bar = st.progress(0.0, text="⏳ Mise à jour en cours...")
+        job = None
+        while True:
             try:
-                res = requests.post(f"{API_URL}/refresh_data", timeout=600)
-                if res.status_code == 200:
-                    payload = res.json()
-                    if payload["status"] == "ok":
-                        st.success(
-                            f"✅ {payload['new_rows']} nouvelles lignes ajoutées "
-                            f"(dernière date : {payload['updated_until']})."
-                        )
-                        st.rerun()
-                    else:
-                        st.info("ℹ️ Aucune nouvelle donnée trouvée (déjà à jour).")
-                else:
-                    st.error(f"Erreur {res.status_code}")
-                    st.code(res.text)
+                job = requests.get(f"{API_URL}/jobs/{job_id}", timeout=15).json()
             except Exception as e:
                 st.error(f"❌ Erreur de connexion à l’API : {e}")
+                break
+            prog = job.get("progress", {})
+            if job.get("status") in ("done", "failed"):
+                break
+            expected = prog.get("rows_expected")
+            ratio = min(prog["rows_fetched"] / expected, 1.0) if expected else 0.0
+            eta = f" — reste ~{int(prog['eta_s'])} s" if prog.get("eta_s") is not None else ""
+            bar.progress(ratio, text=(
+                f"⏳ {prog['pages']} pages, {prog['rows_fetched']:,} / {expected or '?'} lignes reçues{eta}"
+            ))
+            time.sleep(2)
+        bar.empty()
+        st.session_state.pop("refresh_job_id", None)
+
+        if job and job.get("status") == "done":
+            payload = job["result"]
+            if payload["status"] == "ok":
+                st.success(
+                    f"✅ {payload['new_rows']} nouvelles lignes ajoutées "
+                    f"(dernière date : {payload['updated_until']})."
+                )
+                st.rerun()
+            else:
+                st.info("ℹ️ Aucune nouvelle donnée trouvée (déjà à jour).")
+        elif job and job.get("status") == "failed":
+            st.error(f"❌ Échec du rafraîchissement : {job.get('error')}")
 
 # ======================================================
 # CHARGEMENT DES DONNÉES
 # ======================================================
-df = load_data()
-if "date_reception_dpe" in df.columns:
-    df["date_reception_dpe"] = pd.to_datetime(df["date_reception_dpe"], errors="coerce").dt.date
-    df = df.sort_values("date_reception_dpe", ascending=False)
+departments = department_selector()
+df = load_data(departments=departments)
+version = partitions_version(departments)
+engine = filter_engine(df, version)
 
 
 # ======================================================
@@ -71,85 +113,66 @@ with st.expander("🎚️ Filtres de sélection", expanded=True):
     with col1:
         codes = st.multiselect(
             "Code postal",
-            options=sorted(df["code_postal_ban"].dropna().unique()),
+            options=engine.options("code_postal_ban"),
             default=None
         )
 
     with col2:
         types_b = st.multiselect(
             "Type de bâtiment",
-            options=sorted(df["type_batiment"].dropna().unique()),
+            options=engine.options("type_batiment"),
             default=None
         )
 
     with col3:
         periodes = st.multiselect(
             "Période de construction",
-            options=sorted(df["periode_construction"].dropna().unique()),
+            options=engine.options("periode_construction"),
             default=None
         )
 
     with col4:
         energies = st.multiselect(
             "Énergie chauffage",
-            options=sorted(df["type_energie_principale_chauffage"].dropna().unique()),
+            options=engine.options("type_energie_principale_chauffage"),
             default=None
         )
 
 # ======================================================
 # APPLICATION DES FILTRES
 # ======================================================
-filtered_df = df.copy()
-if codes:
-    filtered_df = filtered_df[filtered_df["code_postal_ban"].isin(codes)]
-if types_b:
-    filtered_df = filtered_df[filtered_df["type_batiment"].isin(types_b)]
-if periodes:
-    filtered_df = filtered_df[filtered_df["periode_construction"].isin(periodes)]
-if energies:
-    filtered_df = filtered_df[filtered_df["type_energie_principale_chauffage"].isin(energies)]
+selection = {
+    "code_postal_ban": codes,
+    "type_batiment": types_b,
+    "periode_construction": periodes,
+    "type_energie_principale_chauffage": energies,
+}
+rows = engine.select(selection)
 
-st.markdown(f"### 📊 Données filtrées : {filtered_df.shape[0]:,} lignes affichées")
+st.markdown(f"### 📊 Données filtrées : {len(rows):,} lignes affichées")
 
 # ======================================================
 # AFFICHAGE DU TABLEAU AVEC PAGINATION ET FORMATAGE
 # ======================================================
-ROWS_PER_PAGE = 50
-total_rows = len(filtered_df)
-total_pages = max(1, (total_rows - 1) // ROWS_PER_PAGE + 1)
-
-if "page_number" not in st.session_state:
-    st.session_state.page_number = 1
-
-col_prev, col_page, col_next = st.columns([1, 2, 1])
-with col_prev:
-    if st.button("◀ Précédent", use_container_width=True) and st.session_state.page_number > 1:
-        st.session_state.page_number -= 1
-with col_next:
-    if st.button("Suivant ▶", use_container_width=True) and st.session_state.page_number < total_pages:
-        st.session_state.page_number += 1
-with col_page:
-    st.markdown(
-        f"<div style='text-align:center;'>Page {st.session_state.page_number} / {total_pages}</div>",
-        unsafe_allow_html=True
-    )
-
-start_idx = (st.session_state.page_number - 1) * ROWS_PER_PAGE
-end_idx = start_idx + ROWS_PER_PAGE
-page_df = filtered_df.iloc[start_idx:end_idx]
-
-# --- Formatage des valeurs (nombres sans séparateurs pour les entiers) ---
-def format_values(val):
-    if isinstance(val, (int, float)):
-        if float(val).is_integer():
-            return f"{int(val)}"
-        else:
-            return f"{val:,.2f}".replace(",", " ")
-    return val
-
-formatted_page = page_df.applymap(format_values)
-
-st.dataframe(formatted_page, use_container_width=True)
+# Tri par rangs précalculés et mise en forme des seules lignes de la page
+page_df = paginate(
+    df, rows, sort_index(df, version), key="exploration", rows_per_page=50,
+    default_sort="date_reception_dpe", cache_key=engine.key(selection),
+)
+if "date_reception_dpe" in page_df.columns:
+    page_df["date_reception_dpe"] = pd.to_datetime(page_df["date_reception_dpe"], errors="coerce").dt.date
+
+st.dataframe(page_df, use_container_width=True)
+
+# Colonnes des statistiques et graphiques ci-dessous, pour les seules lignes filtrées
+chart_cols = [
+    c for c in (
+        "surface_habitable_logement", "conso_5_usages_par_m2_ef", "emission_ges_5_usages_par_m2",
+        "etiquette_dpe", "classe_consommation_energie", "classe_consommation_energie_5_usages",
+        "type_energie_principale_chauffage", "code_postal_ban", "periode_construction",
+    ) if c in df.columns
+]
+filtered_df = df[chart_cols].take(rows) if len(rows) < len(df) else df[chart_cols]
 
 # ======================================================
 # STATISTIQUES SOMMAIRES
@@ -2,7 +2,11 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-from app.utils.data_loader import load_data
+import plotly.graph_objects as go
+from app import config  # noqa: F401 - rend le package "api" importable
+from api.partitions import partitions_version
+from app.utils.aggregates import summary_cube
+from app.utils.data_loader import department_selector, load_data
 from app.utils.ui_style import apply_greentech_style
 
 # ======================================================
@@ -15,7 +19,10 @@ st.title("📊 Analyse et visualisation des données DPE")
 # ======================================================
 # CHARGEMENT DES DONNÉES
 # ======================================================
-df = load_data()
+departments = department_selector()
+df = load_data(departments=departments)
+# Agrégats des graphiques, calculés et mémorisés une fois par version des données
+cube = summary_cube(df, partitions_version(departments))
 
 # ======================================================
 # LISTE UNIFIÉE DES COLONNES PAR TYPE DE GRAPHIQUE
@@ -101,7 +108,9 @@ y_var = None
 if options.get("y"):
     y_var = st.sidebar.selectbox("Variable en ordonnée (Y)", options=options.get("y", []))
 
-color_var = st.sidebar.selectbox("Variable de regroupement", options=[None] + options.get("color", []))
+color_var = None
+if options.get("color"):
+    color_var = st.sidebar.selectbox("Variable de regroupement", options=[None] + options.get("color", []))
 
 # ======================================================
 # STATISTIQUES DE BASE
@@ -110,8 +119,7 @@ st.subheader("📊 Statistiques descriptives")
 
 with st.expander("Afficher les statistiques de base", expanded=False):
     styled_df = (
-        df.describe()
-        .transpose()
+        cube.describe()
         .style.set_table_styles([
             {"selector": "th", "props": [("text-align", "center")]},
             {"selector": "td", "props": [("text-align", "right")]},
@@ -129,43 +137,62 @@ with st.expander("Afficher les statistiques de base", expanded=False):
 st.subheader("📉 Visualisation interactive")
 
 fig = None
+# Les graphiques ne reçoivent que des agrégats (taille indépendante du nombre de logements)
 
 # --- Histogramme / Barres empilées ---
 if chart_type == "Histogramme / Barres empilées":
-    fig = px.histogram(
-        df,
+    hist = cube.histogram(x_var, color_var, nbins=50)
+    fig = px.bar(
+        hist["table"],
         x=x_var,
+        y="effectif",
         color=color_var if color_var else None,
-        nbins=50,
         title=f"Histogramme / Barres empilées de {x_var}" + (f" par {color_var}" if color_var else ""),
     )
+    if hist["numeric"]:
+        fig.update_traces(width=hist["width"])
+        fig.update_layout(bargap=0)
 
 # --- Boxplot unifié (analyse univariée) ---
 elif chart_type == "Boxplot":
-    fig = px.box(
-        df,
-        y=x_var,
-        color=color_var if color_var else None,
-        points=False,
+    boxes = cube.box(x_var, color_var)
+    palette = px.colors.qualitative.Plotly
+    fig = go.Figure([
+        go.Box(
+            name=str(row.groupe),
+            x=[str(row.groupe)],
+            q1=[row.q1], median=[row.median], q3=[row.q3], mean=[row.mean],
+            lowerfence=[row.lowerfence], upperfence=[row.upperfence],
+            marker_color=palette[i % len(palette)],
+            hovertext=f"{row.n:,} logements",
+        )
+        for i, row in enumerate(boxes.itertuples(index=False))
+    ])
+    fig.update_layout(
         title=f"Distribution de {x_var}" + (f" par {color_var}" if color_var else ""),
+        yaxis_title=x_var, xaxis_title=color_var, showlegend=bool(color_var),
     )
 
 # --- Nuage de points ---
 elif chart_type == "Nuage de points (Scatterplot)":
+    points = cube.scatter(x_var, y_var, color_var)
     fig = px.scatter(
-        df,
+        points,
         x=x_var,
         y=y_var,
         color=color_var if color_var else None,
-        hover_data=[x_var, y_var],
-        title=f"Nuage de points : {x_var} vs {y_var}",
+        size="effectif",
+        size_max=18,
+        hover_data=["effectif"],
+        title=f"Nuage de points : {x_var} vs {y_var} (logements regroupés par cellule)",
     )
 
 # --- Camembert ---
 elif chart_type == "Camembert (Piechart)":
     fig = px.pie(
-        df,
+        cube.counts(x_var, color_var),
         names=x_var,
+        values="effectif",
         color=color_var if color_var else None,
         title=f"Répartition de {x_var}",
     )
@@ -190,5 +217,5 @@ if (
     and pd.api.types.is_numeric_dtype(df[x_var])
     and pd.api.types.is_numeric_dtype(df[y_var])
 ):
-    corr_value = df[[x_var, y_var]].corr().iloc[0, 1]
+    corr_value = cube.correlation(x_var, y_var)
     st.info(f"📈 Corrélation entre **{x_var}** et **{y_var}** : {corr_value:.3f}")
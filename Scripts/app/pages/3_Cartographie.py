@@ -2,9 +2,14 @@
 import streamlit as st
 import pandas as pd
 import folium
-from folium.plugins import MarkerCluster
+import plotly.express as px
 from streamlit_folium import st_folium
-from app.utils.data_loader import load_data
+from app import config  # noqa: F401 - rend le package "api" importable
+from api.clusters import DPE_COLORS, LABELS, ClusterPyramid
+from api.partitions import partitions_version
+from api.spatial import SpatialIndexes
+from app.utils.data_loader import department_selector, load_data
+from app.utils.filters import filter_engine
 from app.utils.ui_style import apply_greentech_style
 
 # ======================================================
@@ -14,82 +19,134 @@ st.set_page_config(page_title="🗺️ Cartographie DPE", layout="wide")
 apply_greentech_style()
 st.title("🗺️ Cartographie interactive des logements DPE")
 
-df = load_data()
+departments = department_selector()
+df = load_data(departments=departments)
+version = partitions_version(departments)
+engine = filter_engine(df, version)
 
 # Vérification des colonnes nécessaires
 if not {"latitude", "longitude"}.issubset(df.columns):
     st.error("❌ Les colonnes 'latitude' et 'longitude' sont manquantes dans le dataset.")
     st.stop()
 
-# Nettoyage (suppression des coordonnées manquantes)
-df = df.dropna(subset=["latitude", "longitude"])
-
 # ======================================================
 # FILTRES
 # ======================================================
 st.sidebar.header("🎚️ Filtres de la carte")
 
-codes = st.sidebar.multiselect("Code postal", sorted(df["code_postal_ban"].dropna().unique()))
-types_b = st.sidebar.multiselect("Type de bâtiment", sorted(df["type_batiment"].dropna().unique()))
+codes = st.sidebar.multiselect("Code postal", engine.options("code_postal_ban"))
+types_b = st.sidebar.multiselect("Type de bâtiment", engine.options("type_batiment"))
 etiquettes = st.sidebar.multiselect("Étiquette DPE", ["A","B","C","D","E","F","G"])
 
-filtered_df = df.copy()
-if codes:
-    filtered_df = filtered_df[filtered_df["code_postal_ban"].isin(codes)]
-if types_b:
-    filtered_df = filtered_df[filtered_df["type_batiment"].isin(types_b)]
-if etiquettes and "etiquette_dpe" in filtered_df.columns:
-    filtered_df = filtered_df[filtered_df["etiquette_dpe"].isin(etiquettes)]
+st.sidebar.header("📏 Autour d'un point")
+rayon_km = st.sidebar.slider("Rayon (km) autour du point cliqué", 0.5, 20.0, 2.0, 0.5)
 
-# ======================================================
-# LIMITATION DES POINTS
-# ======================================================
-MAX_POINTS = 6000
-if len(filtered_df) > MAX_POINTS:
-    st.warning(f"Trop de points à afficher ({len(filtered_df):,}). Seuls {MAX_POINTS} seront utilisés.")
-    filtered_df = filtered_df.sample(MAX_POINTS, random_state=42)
 
-if filtered_df.empty:
+@st.cache_resource
+def get_spatial_indexes() -> SpatialIndexes:
+    """Index spatiaux partagés par les sessions (mis à jour à chaque nouvelle version des partitions)."""
+    return SpatialIndexes()
+
+
+@st.cache_resource(show_spinner="Agrégation des logements par zoom...", max_entries=8)
+def build_pyramid(_df: pd.DataFrame, _rows, version: tuple, codes: tuple, types_b: tuple, etiquettes: tuple) -> ClusterPyramid:
+    """
+    Pyramide de clusters (tous zooms) des logements filtrés (`_rows`, cf.
+    moteur de filtres), calculée une fois par version des données et sélection.
+    """
+    return ClusterPyramid.from_frame(_df.take(_rows) if len(_rows) < len(_df) else _df)
+
+
+selection = {"code_postal_ban": codes, "type_batiment": types_b, "etiquette_dpe": etiquettes}
+pyramid = build_pyramid(df, engine.select(selection), version, tuple(codes), tuple(types_b), tuple(etiquettes))
+extent = pyramid.bounds()
+if extent is None:
     st.warning("Aucun logement ne correspond à ces filtres.")
     st.stop()
 
 # ======================================================
-# COULEURS DPE
+# FENÊTRE AFFICHÉE
 # ======================================================
-DPE_COLORS = {
-    "A": "#007f00", "B": "#4CAF50", "C": "#CDDC39",
-    "D": "#FFEB3B", "E": "#FFC107", "F": "#FF5722", "G": "#B71C1C"
-}
+# Emprise et zoom renvoyés par la carte au dernier déplacement ; à défaut, toute l'emprise des données
+view = st.session_state.get("carte") or {}
+bounds = view.get("bounds") or {}
+sw, ne = bounds.get("_southWest") or {}, bounds.get("_northEast") or {}
+if None not in (sw.get("lat"), sw.get("lng"), ne.get("lat"), ne.get("lng")) and view.get("zoom") is not None:
+    bbox, zoom = (sw["lat"], sw["lng"], ne["lat"], ne["lng"]), view["zoom"]
+else:
+    bbox, zoom = extent, 9
+
+clusters = pyramid.geojson(zoom, bbox)
+clicked = view.get("last_clicked")
 
 # ======================================================
 # CARTE FOLIUM
 # ======================================================
-center = [filtered_df["latitude"].mean(), filtered_df["longitude"].mean()]
-m = folium.Map(location=center, zoom_start=8, tiles="CartoDB positron")
-
-marker_cluster = MarkerCluster().add_to(m)
-
-for _, row in filtered_df.iterrows():
-    color = DPE_COLORS.get(row.get("etiquette_dpe", "N/A"), "#808080")
-    popup = folium.Popup(html=f"""
-        <b>Commune :</b> {row.get('nom_commune_ban', '')}<br>
-        <b>Type :</b> {row.get('type_batiment', '')}<br>
-        <b>DPE :</b> {row.get('etiquette_dpe', 'N/A')}<br>
-        <b>Surface :</b> {row.get('surface_habitable_logement', '')} m²<br>
-        <b>Conso (kWh/m²) :</b> {row.get('conso_5_usages_par_m2_ef', '')}
-    """, max_width=250)
-
-    folium.CircleMarker(
-        location=[row["latitude"], row["longitude"]],
-        radius=4,
-        color=color,
-        fill=True,
-        fill_opacity=0.8,
-        popup=popup
-    ).add_to(marker_cluster)
+# Carte de base stable d'un rerun à l'autre : seule la couche des clusters est remplacée
+center = [(extent[0] + extent[2]) / 2, (extent[1] + extent[3]) / 2]
+m = folium.Map(location=center, zoom_start=9, tiles="CartoDB positron")
+
+layer = folium.FeatureGroup(name="Logements DPE")
+folium.GeoJson(
+    clusters,
+    marker=folium.CircleMarker(fill=True),
+    style_function=lambda f: {
+        "radius": f["properties"]["radius"],
+        "color": f["properties"]["color"],
+        "fillColor": f["properties"]["color"],
+        "fillOpacity": 0.8,
+        "weight": 1,
+    },
+    tooltip=folium.GeoJsonTooltip(
+        fields=["logements", "dpe", "repartition", "conso"],
+        aliases=["Logements", "DPE majoritaire", "Répartition", "Conso moyenne (kWh/m²)"],
+    ),
+).add_to(layer)
+if clicked:
+    folium.Circle(
+        location=[clicked["lat"], clicked["lng"]], radius=rayon_km * 1000,
+        color="#097536", weight=2, fill=True, fill_opacity=0.05,
+    ).add_to(layer)
 
 # ======================================================
 # AFFICHAGE
 # ======================================================
-st.subheader(f"📍 {len(filtered_df)} logements affichés sur la carte")
-st_folium(m, width=1300, height=700)
+visible = sum(f["properties"]["logements"] for f in clusters["features"])
+st.subheader(f"📍 {pyramid.points:,} logements cartographiés")
+st.caption(
+    f"{visible:,} logements dans la vue, regroupés en {len(clusters['features']):,} points "
+    f"(zoom {clusters['zoom']}) — taille : nombre de logements, couleur : étiquette majoritaire."
+)
+st_folium(
+    m, key="carte", width=1300, height=700, feature_group_to_add=layer,
+    returned_objects=["bounds", "zoom", "last_clicked"],
+)
+
+# ======================================================
+# RÉPARTITION AUTOUR DU POINT CLIQUÉ (INDEX SPATIAL)
+# ======================================================
+st.subheader(f"📏 Logements dans un rayon de {rayon_km:g} km")
+if not clicked:
+    st.info("Cliquez sur la carte pour afficher la répartition DPE autour d'un point.")
+else:
+    stats = get_spatial_indexes().distribution(
+        center=(clicked["lat"], clicked["lng"]), meters=rayon_km * 1000, departments=departments,
+    )
+    st.caption(
+        f"Point ({clicked['lat']:.5f}, {clicked['lng']:.5f}) — tous les logements des départements "
+        "sélectionnés, hors filtres de la carte."
+    )
+    col1, col2 = st.columns([1, 2])
+    with col1:
+        st.metric("Logements", f"{stats['count']:,}")
+        st.metric("Conso moyenne (kWh/m²)", stats["conso_moyenne"] if stats["conso_moyenne"] is not None else "—")
+    with col2:
+        if stats["count"]:
+            fig = px.bar(
+                x=LABELS, y=[stats["dpe"][label] for label in LABELS], color=LABELS,
+                color_discrete_map=DPE_COLORS, labels={"x": "Étiquette DPE", "y": "Logements"},
+            )
+            fig.update_layout(showlegend=False, height=280, margin=dict(t=10, b=10))
+            st.plotly_chart(fig, use_container_width=True)
+        else:
+            st.warning("Aucun logement dans ce rayon.")
@@ -6,9 +6,12 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import joblib, os, glob
 import requests
+from app import config  # noqa: F401 - rend le package "api" importable
 from app.utils.ui_style import apply_greentech_style
+from api.features import SharedFeatures
+from api.normalization import normalizer_for
+from api.registry import VersionedRegistry
 
 st.set_page_config(page_title="Prédictions", page_icon="⚡", layout="wide")
 apply_greentech_style()
@@ -25,47 +28,24 @@ st.markdown(
 
 @st.cache_resource
 def load_models():
-    models_dir = os.path.join(os.path.dirname(__file__), "..", "..", "..", "models")
-    models_dir = os.path.abspath(models_dir)
-
-    def pick(path_pattern, fallback_pattern):
-        latest = os.path.join(models_dir, path_pattern)
-        if os.path.exists(latest):
-            return latest
-        candidates = sorted(glob.glob(os.path.join(models_dir, fallback_pattern)),
-                            key=os.path.getmtime, reverse=True)
-        return candidates[0] if candidates else None
-
-    dpe_path = pick("model_DPE_latest.pkl", "model_DPE_*.pkl")
-    mpr_path = pick("model_MPR_latest.pkl", "model_MPR_*.pkl")
-    conso_path = pick("model_CONSO_*.pkl", "model_CONSO_*.pkl")
-    preproc_conso_path = os.path.join(models_dir, "preprocessor_conso.pkl")
-
-    models = {}
-    for key, path in {
-        "dpe": dpe_path,
-        "mpr": mpr_path,
-        "conso": conso_path,
-        "preproc_conso": preproc_conso_path
-    }.items():
-        if path and os.path.exists(path):
-            models[key] = joblib.load(path)
-        else:
-            st.info(f"ℹ️ Modèle non chargé : {path}")
-            models[key] = None
-    return models
+    """
+    Registre versionné partagé avec l'API (models/manifest.json) : mêmes
+    versions de modèles, chargement à la demande en memory-map, bascule à
+    chaud quand la version active change.
+    """
+    return VersionedRegistry()
 
 
 # ============================================================
 # 🧠 Fonction d’interprétation DPE
 # ============================================================
 
-def dpe_label_from_model(model_pipeline, X_input):
-    """Retourne (label_str, y_raw, mapping_dict)"""
+def dpe_label_from_model(model_pipeline, features):
+    """Retourne (label_str, y_raw, mapping_dict) ; features = SharedFeatures du logement saisi."""
     if model_pipeline is None:
         return None, None, {}
 
-    y_raw = model_pipeline.predict(X_input)[0]
+    y_raw = features.predict(model_pipeline)[0]
 
     classes = None
     try:
@@ -93,46 +73,22 @@ def dpe_label_from_model(model_pipeline, X_input):
         return None, y_raw, {}
 
 
-# ============================================================
-# 🔍 Extraction du vocabulaire attendu
-# ============================================================
-
-def get_expected_schema(pipe):
-    if pipe is None:
-        return {"num": [], "cat": [], "categories": {}}
-    pre = pipe.named_steps["preprocess"]
-    num_features = pre.transformers_[0][2]
-    cat_features = pre.transformers_[1][2]
-    enc = pre.named_transformers_["cat"].named_steps["encoder"]
-    cats = enc.categories_
-    categories_by_feature = {feat: list(cats[i]) for i, feat in enumerate(cat_features)}
-    return {"num": list(num_features), "cat": list(cat_features), "categories": categories_by_feature}
-
-def normalize_categories(X_in, expected_schema):
-    """Corrige les petites différences de casse ou tirets."""
-    X = X_in.copy()
-    for feat, vals in expected_schema["categories"].items():
-        if feat in X.columns and isinstance(X.iloc[0][feat], str):
-            val = X.iloc[0][feat].strip()
-            match = next(
-                (v for v in vals if v.lower().replace("-", "–") == val.lower().replace("-", "–")),
-                val
-            )
-            X.at[0, feat] = match
-    return X
-
-
 # ============================================================
 # 📦 Chargement initial
 # ============================================================
 
-models = load_models()
+model_set = load_models().current()
+models = model_set.models
+for key, path in model_set.paths.items():
+    if models[key] is None:
+        st.info(f"ℹ️ Modèle non chargé : {path}")
 model_dpe = models["dpe"]
 model_mpr = models["mpr"]
 model_conso = models["conso"]
 preproc_conso = models["preproc_conso"]
 
-schema_dpe = get_expected_schema(model_dpe)
+# Vocabulaire des encodeurs (DPE, MPR, CONSO) : dictionnaires canoniques précalculés
+normalizer = normalizer_for(models)
 
 # ============================================================
 # 🏠 Formulaire utilisateur
@@ -188,7 +144,11 @@ if predict_btn:
         "logement_traversant": 1 if logement_traversant == "oui" else 0
     }])
 
-    X_input = normalize_categories(X_input, schema_dpe)
+    # Casse / accents / tirets alignés sur les catégories des encodeurs, puis un seul encodage pour les 3 modèles
+    X_input, unknown = normalizer.apply(X_input)
+    if unknown[0]:
+        st.warning(f"⚠️ Valeurs inconnues des modèles : {unknown[0]}")
+    features = SharedFeatures(X_input)
 
     st.markdown("#### 📋 Données saisies :")
     st.dataframe(X_input)
@@ -201,7 +161,7 @@ if predict_btn:
 
     # --- DPE ---
     try:
-        etiquette, y_raw_dpe, dpe_map = dpe_label_from_model(model_dpe, X_input)
+        etiquette, y_raw_dpe, dpe_map = dpe_label_from_model(model_dpe, features)
         if etiquette:
             st.metric("Étiquette DPE prédite", etiquette)
         else:
@@ -224,7 +184,7 @@ if predict_btn:
 
     # --- MPR ---
     try:
-        y_pred_mpr = model_mpr.predict(X_input)[0]
+        y_pred_mpr = features.predict(model_mpr)[0]
         eligibilite = "✅ Oui" if y_pred_mpr == 1 else "❌ Non"
         st.metric("Éligible MaPrimeRénov’", eligibilite)
     except Exception as e:
@@ -232,8 +192,7 @@ if predict_btn:
 
     # --- Consommation ---
     try:
-        X_trans = preproc_conso.transform(X_input)
-        y_pred_conso = model_conso.predict(X_trans)[0]
+        y_pred_conso = features.predict(model_conso, prep=preproc_conso)[0]
         st.metric("Consommation estimée", f"{y_pred_conso:,.0f} kWh/m²/an")
     except Exception as e:
         st.error(f"Erreur régression : {e}")
@@ -47,8 +47,17 @@ st.markdown(
     """
 - <span class='badge badge-get'>GET</span> **`/status`** — Vérifie la santé du service  
 - <span class='badge badge-get'>GET</span> **`/last_update`** — Donne la dernière date de réception DPE  
+- <span class='badge badge-get'>GET</span> **`/partitions`** — Partitions départementales servies (lignes, dernière date)  
+- <span class='badge badge-get'>GET</span> **`/geo/distribution`** — Répartition DPE dans un rayon ou une fenêtre (index spatial)  
+- <span class='badge badge-get'>GET</span> **`/geo/nearest`** — Logements les plus proches d'un point  
+- <span class='badge badge-get'>GET</span> **`/models`** — Versions des modèles chargés et empreinte mémoire  
+- <span class='badge badge-get'>GET</span> **`/metrics`** — Métriques Prometheus (latences par route et par étape)  
 - <span class='badge badge-get'>GET</span> **`/predict_sample`** — Prédiction rapide avec paramètres URL  
 - <span class='badge badge-post'>POST</span> **`/predict_all`** — Prédiction complète (DPE + consommation)
+- <span class='badge badge-post'>POST</span> **`/predict_batch`** — Prédiction par lot (tableau JSON ou NDJSON)
+- <span class='badge badge-post'>POST</span> **`/predict_file`** — Scoring d'un fichier CSV/Parquet, réponse en flux (CSV ou NDJSON)
+- <span class='badge badge-post'>POST</span> **`/models/reload`** — Relit le manifest des modèles et bascule à chaud
+- <span class='badge badge-post'>POST</span> **`/lookup/build`** — Précalcule les prédictions sur la grille catégorielle (tâche de fond)
 """,
     unsafe_allow_html=True,
 )
@@ -0,0 +1,216 @@
+# scripts/app/utils/aggregates.py
+"""
+Agrégats des graphiques de la page Analyse statistique.
+
+Plutôt que de transmettre toutes les lignes à Plotly (qui les sérialise vers
+le navigateur), chaque graphique est calculé côté serveur sous forme
+d'agrégats dont la taille ne dépend pas du nombre de logements :
+
+    histogramme      -> effectifs par classe (et par groupe de couleur),
+    boxplot          -> quartiles, moyenne et moustaches par groupe,
+    nuage de points  -> grille 2D : effectif et barycentre par cellule,
+    camembert        -> effectifs par modalité (et par groupe de couleur),
+    statistiques     -> describe() des colonnes numériques.
+
+Un SummaryCube est construit par version du dataset ; ses résultats sont
+mémorisés (LRU) par (type de graphique, x, y, couleur).
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+MISSING_LABEL = "Non renseigné"
+
+
+def _groups(values: pd.Series) -> tuple:
+    """Codes 0..k-1 des modalités triées et leurs libellés (valeurs manquantes : dernier groupe)."""
+    codes, uniques = pd.factorize(values, sort=True)
+    labels = [str(u) for u in np.asarray(uniques).tolist()]
+    if (codes < 0).any():
+        codes = np.where(codes < 0, len(labels), codes)
+        labels.append(MISSING_LABEL)
+    return codes, labels
+
+
+def _numeric(values: pd.Series) -> bool:
+    return pd.api.types.is_numeric_dtype(values.dtype) and not pd.api.types.is_bool_dtype(values.dtype)
+
+
+class SummaryCube:
+    """Agrégats mémorisés des graphiques d'un DataFrame."""
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = 64):
+        self.df = df
+        self.rows = len(df)
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    def _memo(self, key: tuple, compute):
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+        value = compute()
+        with self._lock:
+            self._results[key] = value
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        return value
+
+    def _color_codes(self, color: str, mask: np.ndarray = None) -> tuple:
+        if not color:
+            n = self.rows if mask is None else int(mask.sum())
+            return np.zeros(n, dtype="int64"), [None]
+        codes, labels = _groups(self.df[color])
+        return (codes if mask is None else codes[mask]), labels
+
+    # --------------------------------------------------------
+    # Statistiques descriptives
+    # --------------------------------------------------------
+    def describe(self) -> pd.DataFrame:
+        """Équivalent de df.describe().transpose(), calculé une fois par version."""
+        return self._memo(("describe",), lambda: self.df.describe().transpose())
+
+    # --------------------------------------------------------
+    # Histogramme / barres empilées
+    # --------------------------------------------------------
+    def histogram(self, x: str, color: str = None, nbins: int = 50) -> dict:
+        """
+        Effectifs par classe de `x` et par groupe de `color`. Variable numérique :
+        nbins classes de même largeur (ou une barre par valeur entière s'il y en
+        a au plus nbins) ; sinon une barre par modalité.
+        """
+        return self._memo(("histogram", x, None, color, nbins), lambda: self._histogram(x, color, nbins))
+
+    def _histogram(self, x: str, color: str, nbins: int) -> dict:
+        values = self.df[x]
+        width = None
+        if _numeric(values):
+            v = values.to_numpy("float64", na_value=np.nan)
+            mask = np.isfinite(v)
+            v = v[mask]
+            distinct = np.unique(v) if len(v) else v
+            if len(distinct) <= nbins and np.all(distinct == np.round(distinct)):
+                centers = distinct
+                idx = np.searchsorted(distinct, v)
+                width = 0.8 * float(np.min(np.diff(distinct))) if len(distinct) > 1 else 0.8
+            else:
+                edges = np.histogram_bin_edges(v, bins=nbins)
+                idx = np.clip(np.searchsorted(edges, v, side="right") - 1, 0, nbins - 1)
+                centers = (edges[:-1] + edges[1:]) / 2
+                width = float(edges[1] - edges[0])
+        else:
+            codes, uniques = pd.factorize(values, sort=True)  # -1 = valeur manquante
+            mask = codes >= 0
+            idx = codes[mask]
+            centers = np.array([str(u) for u in np.asarray(uniques).tolist()], dtype=object)
+
+        colors, labels = self._color_codes(color, mask)
+        counts = np.bincount(colors * len(centers) + idx, minlength=len(labels) * len(centers))
+        group, position = np.divmod(np.flatnonzero(counts), len(centers))
+        table = pd.DataFrame({x: centers[position], "effectif": counts[counts > 0]})
+        if color:
+            table[color] = np.asarray(labels, dtype=object)[group]
+        return {"table": table, "width": width, "numeric": width is not None, "count": int(mask.sum())}
+
+    # --------------------------------------------------------
+    # Boxplot
+    # --------------------------------------------------------
+    def box(self, x: str, color: str = None) -> pd.DataFrame:
+        """Quartiles (interpolation linéaire, comme Plotly), moyenne et moustaches (1,5 IQR) par groupe."""
+        return self._memo(("box", x, None, color), lambda: self._box(x, color))
+
+    def _box(self, x: str, color: str) -> pd.DataFrame:
+        v = pd.to_numeric(self.df[x], errors="coerce").to_numpy("float64", na_value=np.nan)
+        mask = np.isfinite(v)
+        colors, labels = self._color_codes(color, mask)
+        values = pd.Series(v[mask])
+        grouped = values.groupby(colors)
+        quartiles = grouped.quantile([0.25, 0.5, 0.75]).unstack()
+        stats = pd.DataFrame({
+            "n": grouped.size(),
+            "q1": quartiles[0.25],
+            "median": quartiles[0.5],
+            "q3": quartiles[0.75],
+            "mean": grouped.mean(),
+        })
+        # Moustaches : valeurs extrêmes comprises dans [q1 - 1,5 IQR, q3 + 1,5 IQR]
+        iqr = (stats["q3"] - stats["q1"]).to_numpy()
+        low = (stats["q1"].to_numpy() - 1.5 * iqr)[np.searchsorted(stats.index, colors)]
+        high = (stats["q3"].to_numpy() + 1.5 * iqr)[np.searchsorted(stats.index, colors)]
+        inside = (values.to_numpy() >= low) & (values.to_numpy() <= high)
+        stats["lowerfence"] = values[inside].groupby(colors[inside]).min()
+        stats["upperfence"] = values[inside].groupby(colors[inside]).max()
+        stats.insert(0, "groupe", [labels[i] if labels[i] is not None else x for i in stats.index])
+        return stats.reset_index(drop=True)
+
+    # --------------------------------------------------------
+    # Nuage de points
+    # --------------------------------------------------------
+    def scatter(self, x: str, y: str, color: str = None, bins: int = 150) -> pd.DataFrame:
+        """
+        Nuage agrégé sur une grille bins x bins (par groupe de couleur) : un
+        point par cellule non vide, au barycentre de ses logements, avec son effectif.
+        """
+        return self._memo(("scatter", x, y, color, bins), lambda: self._scatter(x, y, color, bins))
+
+    def _scatter(self, x: str, y: str, color: str, bins: int) -> pd.DataFrame:
+        vx = pd.to_numeric(self.df[x], errors="coerce").to_numpy("float64", na_value=np.nan)
+        vy = pd.to_numeric(self.df[y], errors="coerce").to_numpy("float64", na_value=np.nan)
+        mask = np.isfinite(vx) & np.isfinite(vy)
+        vx, vy = vx[mask], vy[mask]
+        colors, labels = self._color_codes(color, mask)
+        if not len(vx):
+            return pd.DataFrame(columns=list(dict.fromkeys([x, y, "effectif"] + ([color] if color else []))))
+
+        def cell(v):
+            lo, hi = v.min(), v.max()
+            if hi == lo:
+                return np.zeros(len(v), dtype="int64")
+            return np.minimum(((v - lo) / (hi - lo) * bins).astype("int64"), bins - 1)
+
+        keys, inv = np.unique((colors * bins + cell(vx)) * bins + cell(vy), return_inverse=True)
+        count = np.bincount(inv)
+        # x et y peuvent désigner la même colonne (une seule colonne, mêmes barycentres)
+        table = pd.DataFrame({
+            x: np.bincount(inv, weights=vx) / count,
+            y: np.bincount(inv, weights=vy) / count,
+            "effectif": count,
+        })
+        if color:
+            table[color] = np.asarray(labels, dtype=object)[keys // (bins * bins)]
+        return table
+
+    def correlation(self, x: str, y: str) -> float:
+        """Corrélation de Pearson entre deux colonnes numériques (toutes les lignes)."""
+        return self._memo(("corr", x, y, None), lambda: float(self.df[[x, y]].corr().iloc[0, 1]) if x != y else 1.0)
+
+    # --------------------------------------------------------
+    # Camembert
+    # --------------------------------------------------------
+    def counts(self, x: str, color: str = None) -> pd.DataFrame:
+        """Effectifs par modalité de `x` et par groupe de `color` (valeurs manquantes exclues)."""
+        return self._memo(("counts", x, None, color), lambda: self._counts(x, color))
+
+    def _counts(self, x: str, color: str) -> pd.DataFrame:
+        if not color or color == x:
+            counts = self.df[x].value_counts(sort=False)
+            return counts[counts > 0].rename_axis(x).reset_index(name="effectif")
+        counts = self.df.groupby([x, color], observed=True, sort=False).size()
+        return counts[counts > 0].reset_index(name="effectif")
+
+    def stats(self) -> dict:
+        return {"rows": self.rows, "cached_results": len(self._results)}
+
+
+@st.cache_resource(max_entries=4)
+def _summary_cube(_df: pd.DataFrame, version: tuple) -> SummaryCube:
+    return SummaryCube(_df)
+
+
+def summary_cube(df: pd.DataFrame, version: tuple) -> SummaryCube:
+    """Agrégats mémorisés du DataFrame `df`, un cube par version du dataset (cf. partitions_version)."""
+    return _summary_cube(df, version)
@@ -3,13 +3,56 @@ import pandas as pd
 import streamlit as st
 from pathlib import Path
 from app import config
+from api.datastore import load_dataset, dataset_version
+from api.partitions import load_partitions, partitions_version, served_departments
 
-@st.cache_data(show_spinner="Chargement des données...")
-def load_data(file_name: str = None, subdir: str = None) -> pd.DataFrame:
+
+@st.cache_resource(show_spinner="Chargement des données...")
+def _load_dataset(file_path: str, version: str) -> pd.DataFrame:
+    """
+    Lit le store colonnaire (Arrow, memory-map) une seule fois par processus
+    et par version du dataset (CSV source + segments incrémentaux).
+    """
+    return load_dataset(file_path)
+
+
+@st.cache_resource(show_spinner="Chargement des données...", max_entries=4)
+def _load_partitions(departments: tuple, version: tuple) -> pd.DataFrame:
+    """
+    Lit les seules partitions départementales demandées, une fois par
+    combinaison de départements et par version (peu de combinaisons gardées).
+    """
+    return load_partitions(list(departments))
+
+
+def department_selector() -> list:
     """
-    Charge un fichier CSV depuis le dossier data.
-    Utilise le cache Streamlit pour plus de performance.
+    Départements à afficher. Si le processus sert plusieurs partitions, un
+    sélecteur apparaît dans la barre latérale (un seul département par défaut :
+    le volume national n'est jamais chargé sans le demander).
     """
+    served = served_departments()
+    if len(served) <= 1:
+        return served
+    return st.sidebar.multiselect("Départements", served, default=served[:1], key="departements")
+
+
+def load_data(file_name: str = None, subdir: str = None, departments: list = None) -> pd.DataFrame:
+    """
+    Charge le dataset via le store colonnaire partagé avec l'API.
+    Par défaut : partitions départementales sélectionnées (cf. department_selector) ;
+    avec file_name / subdir : un fichier précis du dossier data.
+    """
+    if file_name is None and subdir is None:
+        if departments is None:
+            departments = department_selector()
+        if not departments:
+            st.warning("⚠️ Aucun département sélectionné (ou aucune partition disponible).")
+            st.stop()
+        df = _load_partitions(tuple(departments), partitions_version(departments))
+        # Copie superficielle : les pages peuvent remplacer des colonnes sans toucher au cache
+        return df.copy(deep=False)
+
     if file_name is None:
         file_name = config.DEFAULT_DATA_FILE
     if subdir is None:
@@ -20,5 +63,5 @@ def load_data(file_name: str = None, subdir: str = None) -> pd.DataFrame:
         st.error(f"❌ Fichier introuvable : {file_path}")
         st.stop()
 
-    df = pd.read_csv(file_path)
-    return df
+    df = _load_dataset(str(file_path), dataset_version(str(file_path)))
+    return df.copy(deep=False)
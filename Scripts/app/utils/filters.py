@@ -0,0 +1,126 @@
+# scripts/app/utils/filters.py
+"""
+Moteur de filtres partagé par les pages Exploration et Cartographie.
+
+Pour chaque colonne filtrable, un index inversé est construit une seule fois
+par version du dataset : modalités triées (listes d'options des multiselect)
+et, pour chaque modalité, la liste de ses lignes. Une sélection sur une
+colonne devient un bitmap compact (np.packbits, 1 bit par ligne) ; les
+sélections de plusieurs colonnes se combinent par ET bit à bit.
+
+Bitmaps par (colonne, modalités) et résultats par sélection complète sont
+mémorisés (LRU) : revenir à une sélection déjà vue ne recalcule rien.
+"""
+import threading
+from collections import OrderedDict
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+# Colonnes indexées par défaut (filtres des pages Exploration et Cartographie)
+FILTER_COLUMNS = (
+    "code_postal_ban",
+    "type_batiment",
+    "periode_construction",
+    "type_energie_principale_chauffage",
+    "etiquette_dpe",
+)
+
+
+class FilterEngine:
+    """Index inversés par colonne et mémoïsation des sélections."""
+
+    def __init__(self, df: pd.DataFrame, columns=FILTER_COLUMNS, cache_size: int = 64):
+        self.rows = len(df)
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._bitmaps = OrderedDict()  # (colonne, modalités) -> bitmap
+        self._results = OrderedDict()  # sélection -> lignes retenues
+        self.index = {col: self._build(df[col]) for col in columns if col in df.columns}
+
+    @staticmethod
+    def _build(values: pd.Series) -> dict:
+        codes, uniques = pd.factorize(values, sort=True)  # -1 = valeur manquante
+        order = np.argsort(codes, kind="stable")
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        options = list(np.asarray(uniques).tolist())
+        return {
+            "options": options,
+            "codes": {value: i for i, value in enumerate(options)},
+            # Lignes de chaque modalité, contiguës : postings[offsets[i]:offsets[i + 1]]
+            "postings": order[len(codes) - counts.sum():],
+            "offsets": np.concatenate([[0], np.cumsum(counts)]),
+            "counts": counts,
+        }
+
+    def options(self, column: str) -> list:
+        """Modalités triées de la colonne (sans valeurs manquantes)."""
+        return self.index[column]["options"] if column in self.index else []
+
+    def _remember(self, cache: OrderedDict, key, value):
+        with self._lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > self.cache_size:
+                cache.popitem(last=False)
+        return value
+
+    def bitmap(self, column: str, values) -> np.ndarray:
+        """Bitmap (1 bit par ligne) des lignes dont la colonne prend l'une des valeurs."""
+        key = (column, frozenset(values))
+        cached = self._bitmaps.get(key)
+        if cached is not None:
+            return cached
+        idx = self.index[column]
+        mask = np.zeros(self.rows, dtype=bool)
+        for value in values:
+            i = idx["codes"].get(value)
+            if i is not None:
+                mask[idx["postings"][idx["offsets"][i]:idx["offsets"][i + 1]]] = True
+        return self._remember(self._bitmaps, key, np.packbits(mask))
+
+    def key(self, selection: dict) -> tuple:
+        """Clé canonique d'une sélection (colonnes filtrantes seulement, ordre indifférent)."""
+        return tuple(sorted(
+            (col, frozenset(values)) for col, values in selection.items() if values and col in self.index
+        ))
+
+    def select(self, selection: dict) -> np.ndarray:
+        """
+        Positions (croissantes) des lignes qui vérifient toutes les sélections
+        {colonne: valeurs} ; une sélection vide ne filtre pas.
+        """
+        active = self.key(selection)
+        cached = self._results.get(active)
+        if cached is not None:
+            return cached
+        if not active:
+            rows = np.arange(self.rows)
+        else:
+            combined = reduce(np.bitwise_and, (self.bitmap(col, values) for col, values in active))
+            rows = np.flatnonzero(np.unpackbits(combined, count=self.rows))
+        rows.setflags(write=False)
+        return self._remember(self._results, active, rows)
+
+    def stats(self) -> dict:
+        return {
+            "rows": self.rows,
+            "columns": {col: len(idx["options"]) for col, idx in self.index.items()},
+            "cached_bitmaps": len(self._bitmaps),
+            "cached_results": len(self._results),
+        }
+
+
+@st.cache_resource(show_spinner="Indexation des filtres...", max_entries=4)
+def _filter_engine(_df: pd.DataFrame, version: tuple, columns: tuple) -> FilterEngine:
+    return FilterEngine(_df, columns)
+
+
+def filter_engine(df: pd.DataFrame, version: tuple, columns=FILTER_COLUMNS) -> FilterEngine:
+    """
+    Moteur de filtres du DataFrame `df`, construit une fois par version du
+    dataset (cf. partitions_version) et partagé par les sessions et les pages.
+    """
+    return _filter_engine(df, version, tuple(columns))
@@ -0,0 +1,180 @@
+# scripts/app/utils/pagination.py
+"""
+Tableau paginé côté serveur pour de gros DataFrames.
+
+Le tri ne touche jamais le DataFrame : pour chaque colonne triée, le rang de
+chaque ligne (argsort stable, valeurs manquantes en dernier) est calculé une
+fois par version du dataset. Ordonner une sélection revient à trier les rangs
+de ses seules lignes (ou à lire la permutation complète sans filtre), et
+l'ordre obtenu est mémorisé par (sélection, colonne, sens). Seules les lignes
+de la page demandée sont ensuite extraites et mises en forme, colonne par
+colonne (opérations vectorisées, pas d'appel Python par cellule).
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+
+class SortIndex:
+    """Rangs de tri par colonne (calculés à la demande) et ordres mémorisés par sélection."""
+
+    def __init__(self, df: pd.DataFrame, cache_size: int = 32):
+        self.df = df
+        self.rows = len(df)
+        self.cache_size = cache_size
+        self._lock = threading.Lock()
+        self._ranks = {}  # colonne -> (rangs croissants, rangs décroissants, permutations)
+        self._orders = OrderedDict()
+
+    @staticmethod
+    def _sort_key(values: pd.Series) -> np.ndarray:
+        """Permutation qui trie la colonne (valeurs manquantes en dernier)."""
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Tri sur les modalités triées, pas sur l'ordre (arbitraire) du dictionnaire
+            categories = values.cat.categories
+            rank = np.empty(len(categories) + 1, dtype="int64")
+            rank[np.argsort(categories.to_numpy(), kind="stable")] = np.arange(len(categories))
+            rank[-1] = len(categories)
+            return np.argsort(rank[values.cat.codes.to_numpy()], kind="stable")
+        return values.reset_index(drop=True).sort_values(kind="stable", na_position="last").index.to_numpy()
+
+    def _column(self, column: str) -> dict:
+        cached = self._ranks.get(column)
+        if cached is not None:
+            return cached
+        values = self.df[column]
+        perm = self._sort_key(values)
+        valid = int(values.notna().sum())
+        rank = np.empty(self.rows, dtype="int64")
+        rank[perm] = np.arange(self.rows)
+        # Décroissant : valeurs inversées, valeurs manquantes toujours en dernier
+        rank_desc = np.where(rank < valid, valid - 1 - rank, rank)
+        perm_desc = np.concatenate([perm[:valid][::-1], perm[valid:]])
+        entry = {"asc": (rank, perm), "desc": (rank_desc, perm_desc)}
+        with self._lock:
+            self._ranks[column] = entry
+        return entry
+
+    def order(self, rows: np.ndarray, column: str = None, ascending: bool = True, cache_key=None) -> np.ndarray:
+        """
+        Lignes `rows` dans l'ordre de `column` (ordre d'origine si None).
+        cache_key (ex. clé de sélection du moteur de filtres) active la mémoïsation.
+        """
+        if column is None or column not in self.df.columns:
+            return rows
+        key = (cache_key, column, ascending) if cache_key is not None else None
+        if key is not None and key in self._orders:
+            return self._orders[key]
+
+        rank, perm = self._column(column)["asc" if ascending else "desc"]
+        ordered = perm if len(rows) == self.rows else rows[np.argsort(rank[rows], kind="stable")]
+        if key is not None:
+            with self._lock:
+                self._orders[key] = ordered
+                while len(self._orders) > self.cache_size:
+                    self._orders.popitem(last=False)
+        return ordered
+
+
+@st.cache_resource(max_entries=4)
+def _sort_index(_df: pd.DataFrame, version: tuple) -> SortIndex:
+    return SortIndex(_df)
+
+
+def sort_index(df: pd.DataFrame, version: tuple) -> SortIndex:
+    """SortIndex du DataFrame `df`, un par version du dataset (cf. partitions_version)."""
+    return _sort_index(df, version)
+
+
+# Groupes de chiffres précalculés (zéros de tête) pour la mise en forme vectorisée
+_PAD2 = np.array([f"{i:02d}" for i in range(100)], dtype=object)
+_PAD3 = np.array([f"{i:03d}" for i in range(1000)], dtype=object)
+
+
+def _thousands(ints: np.ndarray) -> np.ndarray:
+    """Entiers positifs -> texte avec une espace comme séparateur de milliers ("1 234 567")."""
+    top = np.zeros(len(ints), dtype="int64")  # indice du groupe de tête
+    levels = 0
+    while (ints >= 1000 ** (levels + 1)).any():
+        levels += 1
+        top[ints >= 1000 ** levels] = levels
+    out = np.full(len(ints), "", dtype=object)
+    for k in range(levels, -1, -1):
+        group = (ints // 1000 ** k) % 1000
+        out = np.where(top == k, out + group.astype(str).astype(object), out)
+        out = np.where(top > k, out + " " + _PAD3[group], out)
+    return out
+
+
+def format_page(page: pd.DataFrame) -> pd.DataFrame:
+    """
+    Mise en forme des colonnes décimales : entiers sans décimale ni séparateur,
+    autres valeurs à 2 décimales avec espace comme séparateur de milliers.
+    Vectorisé par colonne (arithmétique entière et tables de groupes de
+    chiffres) ; valeurs manquantes laissées vides.
+    """
+    out = page.copy()
+    for col in page.columns:
+        if not pd.api.types.is_float_dtype(page[col].dtype):
+            continue
+        values = page[col].to_numpy("float64")
+        text = np.full(len(values), None, dtype=object)
+        finite = np.isfinite(values)
+        whole = finite & (values == np.floor(np.where(finite, values, 0)))
+        text[whole] = values[whole].astype("int64").astype(str)
+
+        decimal = finite & ~whole
+        scaled = np.abs(values[decimal]) * 100
+        cents = np.round(scaled).astype("int64")
+        # Demi-centimes : arrondi de la valeur binaire exacte, comme le format Python
+        tie = np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6 * np.maximum(scaled, 1)
+        cents[tie] = [int(f"{x:.2f}".replace(".", "")) for x in scaled[tie] / 100]
+        sign = np.where(values[decimal] < 0, "-", "").astype(object)
+        text[decimal] = sign + _thousands(cents // 100) + "." + _PAD2[cents % 100]
+        out[col] = pd.Series(text, index=page.index)
+    return out
+
+
+def paginate(df: pd.DataFrame, rows: np.ndarray, sorter: SortIndex, key: str = "table",
+             rows_per_page: int = 50, sort_columns: list = None, default_sort: str = None,
+             cache_key=None) -> pd.DataFrame:
+    """
+    Contrôles de tri et de pagination, puis la page courante des lignes `rows`
+    de `df`, triée et mise en forme (seules ces lignes sont extraites).
+    La page revient à 1 quand la sélection ou le tri change.
+    """
+    sort_columns = sort_columns or list(df.columns)
+    col_sort, col_dir = st.columns([3, 1])
+    with col_sort:
+        default = sort_columns.index(default_sort) if default_sort in sort_columns else 0
+        sort_col = st.selectbox("Trier par", sort_columns, index=default, key=f"{key}_sort")
+    with col_dir:
+        ascending = st.radio("Ordre", ["Décroissant", "Croissant"], horizontal=True, key=f"{key}_dir") == "Croissant"
+
+    total_pages = max(1, (len(rows) - 1) // rows_per_page + 1)
+    page_key, state_key = f"{key}_page", f"{key}_state"
+    state = (cache_key, sort_col, ascending)
+    if st.session_state.get(state_key) != state or page_key not in st.session_state:
+        st.session_state[state_key] = state
+        st.session_state[page_key] = 1
+    st.session_state[page_key] = min(st.session_state[page_key], total_pages)
+
+    col_prev, col_page, col_next = st.columns([1, 2, 1])
+    with col_prev:
+        if st.button("◀ Précédent", use_container_width=True, key=f"{key}_prev") and st.session_state[page_key] > 1:
+            st.session_state[page_key] -= 1
+    with col_next:
+        if st.button("Suivant ▶", use_container_width=True, key=f"{key}_next") and st.session_state[page_key] < total_pages:
+            st.session_state[page_key] += 1
+    with col_page:
+        st.markdown(
+            f"<div style='text-align:center;'>Page {st.session_state[page_key]} / {total_pages}</div>",
+            unsafe_allow_html=True
+        )
+
+    ordered = sorter.order(rows, sort_col, ascending, cache_key=cache_key)
+    start = (st.session_state[page_key] - 1) * rows_per_page
+    return format_page(df.take(ordered[start:start + rows_per_page]))
@@ -0,0 +1,100 @@
+"""
+Micro-batching des prédictions unitaires (/predict_all, /predict_sample).
+
+Les requêtes d'une ligne arrivant dans une courte fenêtre (max_wait_ms) sont
+regroupées, jusqu'à max_batch lignes, en un seul appel vectorisé : une forêt
+prédit 64 lignes presque aussi vite qu'une seule. Chaque requête reçoit
+ensuite sa propre ligne de résultat. La file d'attente est bornée à
+max_queue lots complets : au-delà, submit lève QueueFullError (429).
+"""
+import asyncio
+import time
+from collections import Counter
+
+from api.executor import QueueFullError
+
+
+class MicroBatcher:
+    """
+    Regroupe les appels submit(row) et exécute predict_batch(rows) -> list
+    (un résultat par ligne, dans l'ordre) via `run` (ex. INFERENCE.run).
+    Au plus max_queue x max_batch lignes attendent d'être regroupées (0 : sans limite).
+    """
+
+    def __init__(self, predict_batch, run, max_batch: int = 64, max_wait_ms: float = 5.0, max_queue: int = 0):
+        self.predict_batch = predict_batch
+        self.run = run
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.max_pending = max_queue * max_batch
+        self._queue = None
+        self._loop = None
+        self._task = None
+        self._inflight = set()  # références des lots en cours (évite leur ramasse-miettes)
+        self.counters = {"requests": 0, "batches": 0, "rows": 0, "rejected": 0}
+        self.sizes = Counter()
+
+    def _ensure_started(self):
+        """Démarre (ou redémarre si la boucle asyncio a changé) la tâche de collecte."""
+        loop = asyncio.get_running_loop()
+        if self._task is None or self._task.done() or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue(maxsize=self.max_pending)
+            self._task = loop.create_task(self._collect())
+
+    async def submit(self, row: dict):
+        """Ajoute une ligne au prochain lot et attend son résultat."""
+        self._ensure_started()
+        future = self._loop.create_future()
+        self.counters["requests"] += 1
+        try:
+            self._queue.put_nowait((row, future))
+        except asyncio.QueueFull:
+            self.counters["rejected"] += 1
+            raise QueueFullError(f"File de micro-batching pleine ({self.max_pending} lignes en attente)") from None
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            # Le lot s'exécute pendant que le suivant se constitue
+            task = asyncio.ensure_future(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list):
+        rows = [row for row, _ in batch]
+        self.counters["batches"] += 1
+        self.counters["rows"] += len(rows)
+        self.sizes[len(rows)] += 1
+        try:
+            results = await self.run(self.predict_batch, rows)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self) -> dict:
+        batches = self.counters["batches"]
+        return {
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+            "max_pending": self.max_pending or None,
+            "pending": self._queue.qsize() if self._queue is not None else 0,
+            **self.counters,
+            "mean_batch_size": round(self.counters["rows"] / batches, 2) if batches else None,
+            "max_batch_size": max(self.sizes) if self.sizes else None,
+        }
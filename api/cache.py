@@ -0,0 +1,114 @@
+"""
+Cache des prédictions (LRU + TTL).
+
+Clé : vecteur de variables explicatives après normalisation (prepare_features),
+donc "maison" et " Maison " partagent la même entrée. Les clés portent la
+version du jeu de modèles (namespace) ; le cache est vidé quand le registre
+bascule sur un autre jeu (clé active modifiée, fichiers réécrits inclus).
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from api.inference import FEATURES, OUTPUTS, predict_rows
+from api.metrics import stage
+
+
+class PredictionCache:
+    """
+    LRU thread-safe avec expiration. model_key() donne la clé du jeu de modèles
+    actif : le cache est vidé quand elle change.
+    """
+
+    def __init__(self, maxsize: int = 50000, ttl: float = 3600, model_key=None, check_interval: float = 1.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.model_key = model_key
+        self.check_interval = check_interval
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._active_key = None
+        self._last_check = time.monotonic()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0, "invalidations": 0}
+
+    def _check_models(self, now: float):
+        """Vide le cache si le jeu de modèles actif a changé (au plus une vérification par intervalle)."""
+        if self.model_key is None or now - self._last_check < self.check_interval:
+            return
+        self._last_check = now
+        key = self.model_key()
+        if key != self._active_key:
+            if self._active_key is not None:
+                self._data.clear()
+                self.counters["invalidations"] += 1
+                print(f"[INFO] Jeu de modèles basculé ({self._active_key} -> {key}) : cache des prédictions vidé.")
+            self._active_key = key
+
+    def get_many(self, keys: list) -> list:
+        """Valeurs en cache (None si absente ou expirée), dans l'ordre des clés."""
+        now = time.monotonic()
+        out = []
+        with self._lock:
+            self._check_models(now)
+            for key in keys:
+                entry = self._data.get(key)
+                if entry is not None and now - entry[0] > self.ttl:
+                    del self._data[key]
+                    self.counters["expired"] += 1
+                    entry = None
+                if entry is None:
+                    self.counters["misses"] += 1
+                    out.append(None)
+                else:
+                    self._data.move_to_end(key)
+                    self.counters["hits"] += 1
+                    out.append(entry[1])
+        return out
+
+    def put_many(self, items: list):
+        now = time.monotonic()
+        with self._lock:
+            for key, value in items:
+                self._data[key] = (now, value)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_s": self.ttl,
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else None,
+        }
+
+
+def cached_predict_rows(df, models: dict, cache: PredictionCache = None, namespace: str = "all") -> list:
+    """
+    predict_rows avec cache : df est déjà passé par prepare_features ; seules
+    les lignes absentes du cache sont prédites (en un seul appel vectorisé).
+    `namespace` distingue les jeux de modèles (ex. sans MPR).
+    """
+    if cache is None or cache.maxsize <= 0:
+        return predict_rows(df, models)
+
+    with stage("cache_lookup"):
+        keys = [(namespace, *row) for row in df[FEATURES].itertuples(index=False, name=None)]
+        results = cache.get_many(keys)
+    missing = [i for i, res in enumerate(results) if res is None]
+    if missing:
+        preds = predict_rows(df.iloc[missing], models)
+        fresh = []
+        for i, pred in zip(missing, preds):
+            results[i] = pred
+            if pred["error"] is None:
+                fresh.append((keys[i], {key: pred[key] for key in OUTPUTS}))
+        cache.put_many(fresh)
+    return [res if "error" in res else res | {"error": None} for res in results]
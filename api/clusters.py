@@ -0,0 +1,210 @@
+# ============================================================
+# 🗺️ Agrégation cartographique des logements (pyramide de clusters)
+# ============================================================
+"""
+Plutôt qu'un marqueur par logement, la carte affiche des agrégats sur une
+grille Web Mercator : à chaque niveau de zoom, le monde est découpé en
+cellules de CLUSTER_CELL_PX pixels, et chaque cellule porte
+
+    nombre de logements, répartition des étiquettes A..G,
+    conso moyenne (kWh/m²), barycentre des logements.
+
+La pyramide est calculée une fois, de manière vectorisée : le niveau le plus
+fin (CLUSTER_MAX_ZOOM) est agrégé depuis les points (np.unique + bincount),
+chaque niveau plus grossier depuis le précédent (une cellule = 2 x 2 cellules
+filles). Les cellules d'un niveau sont triées par clé (x, y) : celles d'une
+fenêtre d'affichage s'obtiennent par recherche dichotomique sur x puis un
+masque sur y. Tous les logements sont comptés, seuls les agrégats visibles
+sont convertis en objets Python (GeoJSON).
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+from api.config import CLUSTER_CELL_PX, CLUSTER_MAX_ZOOM
+
+LABELS = ["A", "B", "C", "D", "E", "F", "G"]
+DPE_COLORS = {
+    "A": "#007f00", "B": "#4CAF50", "C": "#CDDC39",
+    "D": "#FFEB3B", "E": "#FFC107", "F": "#FF5722", "G": "#B71C1C",
+}
+UNKNOWN_COLOR = "#808080"
+
+TILE_PX = 256
+# Latitude max de la projection Web Mercator
+MAX_LATITUDE = 85.05112878
+
+
+def mercator(lat, lon) -> tuple:
+    """Coordonnées Web Mercator normalisées dans [0, 1) (x vers l'est, y vers le sud)."""
+    lat = np.clip(np.asarray(lat, dtype="float64"), -MAX_LATITUDE, MAX_LATITUDE)
+    lon = np.asarray(lon, dtype="float64")
+    x = (lon + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lat) / 2)) / (2 * np.pi)
+    return np.clip(x, 0, 1 - 1e-12), np.clip(y, 0, 1 - 1e-12)
+
+
+def label_codes(labels, n: int) -> np.ndarray:
+    """Étiquettes -> 0..6 (A..G), -1 si absente ou inconnue."""
+    if labels is None:
+        return np.full(n, -1, dtype="int8")
+    labels = pd.Series(labels)
+    if not isinstance(labels.dtype, pd.CategoricalDtype):
+        labels = labels.astype("category")
+    # Correspondance calculée sur les modalités distinctes, pas sur les lignes
+    lookup = np.array([LABELS.index(c) if c in LABELS else -1 for c in labels.cat.categories.astype(str)] + [-1], dtype="int8")
+    return lookup[labels.cat.codes.to_numpy()]
+
+
+class ClusterPyramid:
+    """Agrégats par cellule de grille pour chaque niveau de zoom de min_zoom à max_zoom."""
+
+    def __init__(self, lat, lon, labels=None, conso=None,
+                 min_zoom: int = 0, max_zoom: int = CLUSTER_MAX_ZOOM, cell_px: int = CLUSTER_CELL_PX):
+        if cell_px <= 0 or TILE_PX % cell_px or cell_px & (cell_px - 1):
+            raise ValueError(f"cell_px doit être une puissance de 2 divisant {TILE_PX} (reçu {cell_px}).")
+        self.min_zoom, self.max_zoom, self.cell_px = min_zoom, max_zoom, cell_px
+        # Cellules par axe au zoom z : 2^(z + shift)
+        self.shift = int(math.log2(TILE_PX // cell_px))
+
+        lat = np.asarray(lat, dtype="float64")
+        lon = np.asarray(lon, dtype="float64")
+        valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+        codes = label_codes(labels, len(lat))[valid]
+        conso = np.full(len(lat), np.nan) if conso is None else pd.to_numeric(pd.Series(conso), errors="coerce").to_numpy("float64")
+        lat, lon, conso = lat[valid], lon[valid], conso[valid]
+        self.points = int(valid.sum())
+
+        x, y = mercator(lat, lon)
+        side = 1 << (max_zoom + self.shift)
+        cx, cy = (x * side).astype("int64"), (y * side).astype("int64")
+
+        # Niveau le plus fin : agrégation des points
+        uniq, inv = np.unique((cx << 32) | cy, return_inverse=True)
+        n = len(uniq)
+        known = codes >= 0
+        mix = np.bincount(inv[known] * len(LABELS) + codes[known], minlength=n * len(LABELS))
+        has_conso = np.isfinite(conso)
+        level = {
+            "key": uniq,
+            "count": np.bincount(inv, minlength=n),
+            "mix": mix.reshape(n, len(LABELS)),
+            "conso_sum": np.bincount(inv[has_conso], weights=conso[has_conso], minlength=n),
+            "conso_n": np.bincount(inv[has_conso], minlength=n),
+            "lat_sum": np.bincount(inv, weights=lat, minlength=n),
+            "lon_sum": np.bincount(inv, weights=lon, minlength=n),
+        }
+        self.levels = {max_zoom: level}
+        # Niveaux grossiers : fusion des cellules filles (x >> 1, y >> 1)
+        for zoom in range(max_zoom - 1, min_zoom - 1, -1):
+            level = self._coarsen(level)
+            self.levels[zoom] = level
+
+    @staticmethod
+    def _coarsen(level: dict) -> dict:
+        key = level["key"]
+        parent = ((key >> 33) << 32) | ((key & 0xFFFFFFFF) >> 1)
+        uniq, inv = np.unique(parent, return_inverse=True)
+        n = len(uniq)
+        summed = lambda values: np.bincount(inv, weights=values, minlength=n)
+        return {
+            "key": uniq,
+            "count": summed(level["count"]).astype("int64"),
+            "mix": np.stack([summed(col) for col in level["mix"].T], axis=1).astype("int64"),
+            "conso_sum": summed(level["conso_sum"]),
+            "conso_n": summed(level["conso_n"]).astype("int64"),
+            "lat_sum": summed(level["lat_sum"]),
+            "lon_sum": summed(level["lon_sum"]),
+        }
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, lat_col: str = "latitude", lon_col: str = "longitude",
+                   label_col: str = "etiquette_dpe", conso_col: str = "conso_5_usages_par_m2_ef", **kwargs):
+        return cls(
+            df[lat_col].to_numpy(), df[lon_col].to_numpy(),
+            df[label_col] if label_col in df.columns else None,
+            df[conso_col] if conso_col in df.columns else None,
+            **kwargs,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "points": self.points,
+            "levels": len(self.levels),
+            "cells": int(sum(len(lvl["key"]) for lvl in self.levels.values())),
+            "nbytes": int(sum(a.nbytes for lvl in self.levels.values() for a in lvl.values())),
+        }
+
+    def bounds(self) -> tuple:
+        """Emprise des logements (sud, ouest, nord, est), depuis le niveau le plus fin."""
+        level = self.levels[self.max_zoom]
+        if not len(level["key"]):
+            return None
+        lat = level["lat_sum"] / level["count"]
+        lon = level["lon_sum"] / level["count"]
+        return float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())
+
+    def query(self, zoom, bbox: tuple = None) -> dict:
+        """
+        Agrégats du niveau `zoom` (arrondi et borné à la pyramide) dont la cellule
+        recoupe bbox = (sud, ouest, nord, est) ; toute l'emprise si bbox est None.
+        """
+        zoom = int(min(max(round(zoom), self.min_zoom), self.max_zoom))
+        level = self.levels[zoom]
+        key = level["key"]
+        if bbox is None:
+            idx = np.arange(len(key))
+        else:
+            south, west, north, east = bbox
+            side = 1 << (zoom + self.shift)
+            (x0, x1), (y0, y1) = mercator([north, south], [west, east])
+            x0, x1, y0, y1 = int(x0 * side), int(x1 * side), int(y0 * side), int(y1 * side)
+            if west > east:  # fenêtre à cheval sur l'antiméridien : toute la largeur
+                x0, x1 = 0, side - 1
+            lo = np.searchsorted(key, x0 << 32)
+            hi = np.searchsorted(key, (x1 + 1) << 32)
+            cy = key[lo:hi] & 0xFFFFFFFF
+            idx = lo + np.flatnonzero((cy >= y0) & (cy <= y1))
+
+        count = level["count"][idx]
+        mix = level["mix"][idx]
+        conso_n = level["conso_n"][idx]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            conso = np.where(conso_n > 0, level["conso_sum"][idx] / conso_n, np.nan)
+        dominant = np.where(mix.sum(axis=1) > 0, mix.argmax(axis=1), -1)
+        return {
+            "zoom": zoom,
+            "count": count,
+            "lat": level["lat_sum"][idx] / count,
+            "lon": level["lon_sum"][idx] / count,
+            "mix": mix,
+            "conso": conso,
+            "dominant": dominant,
+        }
+
+    def geojson(self, zoom, bbox: tuple = None) -> dict:
+        """FeatureCollection des agrégats visibles (un point par cellule, au barycentre de ses logements)."""
+        q = self.query(zoom, bbox)
+        labels = np.array(LABELS + ["N/A"])[q["dominant"]]
+        colors = np.array([DPE_COLORS[l] for l in LABELS] + [UNKNOWN_COLOR])[q["dominant"]]
+        radius = np.minimum(5 + 4 * np.log10(np.maximum(q["count"], 1)), 30).round(1)
+        conso = np.round(q["conso"], 1)
+        features = []
+        for lat, lon, count, label, color, r, mean, mix in zip(
+            q["lat"].tolist(), q["lon"].tolist(), q["count"].tolist(), labels.tolist(),
+            colors.tolist(), radius.tolist(), conso.tolist(), q["mix"].tolist(),
+        ):
+            features.append({
+                "type": "Feature",
+                "geometry": {"type": "Point", "coordinates": [round(lon, 6), round(lat, 6)]},
+                "properties": {
+                    "logements": count,
+                    "dpe": label,
+                    "repartition": " · ".join(f"{l} {c}" for l, c in zip(LABELS, mix) if c),
+                    "conso": None if math.isnan(mean) else mean,
+                    "color": color,
+                    "radius": r,
+                },
+            })
+        return {"type": "FeatureCollection", "zoom": q["zoom"], "features": features}
@@ -7,9 +7,85 @@ ROOT_DIR = os.path.dirname(BASE_DIR)
 MODELS_DIR = os.path.join(ROOT_DIR, "models")
 DATA_DIR = os.path.join(ROOT_DIR, "data")
 
+# Dataset principal (CSV source) et cache colonnaire typé (Arrow)
+DATA_PATH = os.path.join(DATA_DIR, "donnees_dpe_73_clean.csv")
+STORE_DIR = os.getenv("STORE_DIR", os.path.join(DATA_DIR, ".store"))
+
+# Partitions départementales (un CSV par département : donnees_dpe_<dept>_clean.csv) et
+# départements servis par défaut (séparés par des virgules, "*" = toutes les partitions présentes)
+PARTITIONS_DIR = os.getenv("PARTITIONS_DIR", os.path.join(DATA_DIR, "departements"))
+DEPARTMENTS = tuple(d.strip().upper() for d in os.getenv("DEPARTMENTS", "73").split(",") if d.strip())
+
 # Chemins vers les modèles
 MODEL_DPE_PATH = os.path.join(MODELS_DIR, "model_DPE_Random_Forest.pkl")
 MODEL_CONSO_PATH = os.path.join(MODELS_DIR, "model_CONSO_Random_Forest.pkl")
+MODEL_MPR_PATH = os.path.join(MODELS_DIR, "model_MPR_Random_Forest.pkl")
+PREPROC_CONSO_PATH = os.path.join(MODELS_DIR, "preprocessor_conso.pkl")
 
 # Port API par défaut
 API_PORT = int(os.getenv("API_PORT", 8000))
+
+# Nombre maximal de lignes acceptées par /predict_batch
+BATCH_MAX_ROWS = int(os.getenv("BATCH_MAX_ROWS", 50000))
+
+# Scoring de fichiers (/predict_file) : nombre de lignes traitées par bloc
+SCORING_CHUNK_ROWS = int(os.getenv("SCORING_CHUNK_ROWS", 20000))
+
+# API ADEME (surchargeable, ex. serveur bouchon local : http://127.0.0.1:8765)
+ADEME_BASE_URL = os.getenv("ADEME_BASE_URL", "https://data.ademe.fr/data-fair/api/v1/datasets")
+ADEME_ENDPOINTS = {
+    "existants": f"{ADEME_BASE_URL}/dpe03existant/lines",
+    "neufs": f"{ADEME_BASE_URL}/dpe02neuf/lines",
+}
+
+# Ingestion : taille de page, nombre de requêtes parallèles, points de reprise
+INGESTION_PAGE_SIZE = int(os.getenv("INGESTION_PAGE_SIZE", 1200))
+INGESTION_WORKERS = int(os.getenv("INGESTION_WORKERS", 4))
+INGESTION_DIR = os.path.join(STORE_DIR, "ingestion")
+# Première date de réception ingérée lors de la création d'une nouvelle partition (réforme du DPE)
+INGESTION_START = os.getenv("INGESTION_START", "2021-07-01")
+
+# Tâches de fond (/refresh_data) : états JSON et verrous
+JOBS_DIR = os.path.join(STORE_DIR, "jobs")
+
+# Exécuteur d'inférence : threads (0 = nombre de cœurs disponibles) et file d'attente max (429 au-delà)
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", 0))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", 64))
+
+# Micro-batching des prédictions unitaires (/predict_all) : activation, taille max d'un lot, attente max (ms)
+MICROBATCH_ENABLED = os.getenv("MICROBATCH_ENABLED", "0").lower() in ("1", "true", "oui")
+MICROBATCH_MAX_SIZE = int(os.getenv("MICROBATCH_MAX_SIZE", 64))
+MICROBATCH_MAX_WAIT_MS = float(os.getenv("MICROBATCH_MAX_WAIT_MS", 5))
+
+# Cache des prédictions : nombre d'entrées max (0 = désactivé) et durée de vie (s)
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", 50000))
+PREDICTION_CACHE_TTL = float(os.getenv("PREDICTION_CACHE_TTL", 3600))
+
+# Modèles : chargement paresseux en memory-map (copies non compressées) et warm-up au démarrage
+MODELS_MMAP = os.getenv("MODELS_MMAP", "1").lower() in ("1", "true", "oui")
+MODELS_CACHE_DIR = os.path.join(STORE_DIR, "models")
+MODEL_WARMUP = os.getenv("MODEL_WARMUP", "1").lower() in ("1", "true", "oui")
+
+# Registre versionné des modèles (versions, schéma, date d'entraînement, sha256)
+MODEL_MANIFEST_PATH = os.getenv("MODEL_MANIFEST_PATH", os.path.join(MODELS_DIR, "manifest.json"))
+
+# Moteur compilé des RandomForest (api.forest) : tableaux NumPy, prédictions identiques à sklearn
+FOREST_ENGINE = os.getenv("FOREST_ENGINE", "1").lower() in ("1", "true", "oui")
+
+# Table de prédictions précalculées (api.lookup) : grille catégorielle x années x surfaces
+LOOKUP_ENABLED = os.getenv("LOOKUP_ENABLED", "1").lower() in ("1", "true", "oui")
+LOOKUP_DIR = os.path.join(STORE_DIR, "lookup")
+LOOKUP_YEARS = tuple(int(v) for v in os.getenv("LOOKUP_YEARS", "1900:2020:10").split(":"))  # début:fin:pas
+LOOKUP_SURFACES = tuple(int(v) for v in os.getenv("LOOKUP_SURFACES", "10:300:10").split(":"))  # début:fin:pas
+
+# Métriques Prometheus (/metrics) et profileur échantillonné opt-in (/debug/profile), intervalle en ms
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1").lower() in ("1", "true", "oui")
+PROFILER_ENABLED = os.getenv("PROFILER_ENABLED", "0").lower() in ("1", "true", "oui")
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", 5))
+
+# Agrégation cartographique (api.clusters) : taille d'une cellule en pixels et zoom max de la pyramide
+CLUSTER_CELL_PX = int(os.getenv("CLUSTER_CELL_PX", 64))
+CLUSTER_MAX_ZOOM = int(os.getenv("CLUSTER_MAX_ZOOM", 18))
+
+# Index spatial des logements (api.spatial) : côté d'une cellule de la grille, en degrés (~280 x 200 m en France)
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", 0.0025))
@@ -0,0 +1,574 @@
+"""
+Stockage colonnaire typé du dataset DPE (partagé par l'API et l'application Streamlit).
+
+Le CSV source (ex. donnees_dpe_73_clean.csv) est converti une seule fois en
+fichier Arrow IPC non compressé, avec des catégorielles pour les colonnes à
+faible cardinalité. Ce fichier est ensuite ouvert en memory-map : les colonnes
+non lues ne sont jamais chargées en mémoire, et il n'est reconstruit que lorsque
+le CSV source change (taille ou date de modification).
+
+Chaque reconstruction écrit aussi un petit fichier de métadonnées (.meta.json :
+date de réception max, nombre de lignes, schéma, hash du contenu, effectifs par
+source) servi en temps constant par /last_update et /status.
+
+Les rafraîchissements ADEME n'écrivent que le delta : les nouvelles lignes sont
+dédupliquées sur numero_dpe (index persistant des identifiants, par mois) et
+rangées dans des segments partitionnés par mois de réception. Une vue
+(.view.json) liste le store de base et les segments courants ; elle est
+remplacée atomiquement, si bien qu'un lecteur voit toujours un état complet
+(jamais un fichier à moitié écrit).
+"""
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+except ImportError:  # pragma: no cover - repli CSV si pyarrow n'est pas installé
+    pa = None
+
+from api.config import STORE_DIR
+from api.metrics import DATASET_READ, stage
+
+# Colonnes toujours stockées en catégorielles
+CATEGORICAL_COLUMNS = [
+    "type_batiment",
+    "etiquette_dpe",
+    "etiquette_ges",
+    "code_postal_ban",
+    "nom_commune_ban",
+    "periode_construction",
+    "Logement",
+    "classe_altitude",
+    "zone_climatique",
+    "classe_inertie_batiment",
+    "qualite_isolation_murs",
+    "qualite_isolation_menuiseries",
+    "qualite_isolation_enveloppe",
+    "type_energie_principale_chauffage",
+    "type_energie_principale_ecs",
+]
+
+# Autres colonnes texte converties en catégorielles si peu de valeurs distinctes
+CATEGORY_MAX_RATIO = 0.5
+
+FINGERPRINT_KEY = b"source_fingerprint"
+
+# Colonne de date de réception, colonne de source (Ancien / Neuf) et identifiant DPE
+DATE_COLUMN = "date_reception_dpe"
+SOURCE_COLUMN = "Logement"
+ID_COLUMN = "numero_dpe"
+
+# Au-delà de ce nombre de segments, ils sont fusionnés en un seul fichier
+COMPACT_MAX_SEGMENTS = int(os.getenv("COMPACT_MAX_SEGMENTS", 24))
+
+
+def source_fingerprint(csv_path: str) -> str:
+    """Empreinte O(1) du fichier source : taille + date de modification."""
+    st = os.stat(csv_path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def store_path(csv_path: str) -> str:
+    """Chemin du fichier Arrow associé au CSV source."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(STORE_DIR, f"{stem}.arrow")
+
+
+def metadata_path(csv_path: str) -> str:
+    """Chemin du fichier de métadonnées associé au CSV source."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(STORE_DIR, f"{stem}.meta.json")
+
+
+def segments_dir(csv_path: str) -> str:
+    """Dossier des segments incrémentaux associés au CSV source."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(STORE_DIR, stem, "segments")
+
+
+def ids_dir(csv_path: str) -> str:
+    """Dossier de l'index persistant des numero_dpe (un fichier par mois de réception)."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(STORE_DIR, stem, "ids")
+
+
+def view_path(csv_path: str) -> str:
+    """Chemin de la vue (store de base + liste des segments courants)."""
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(STORE_DIR, f"{stem}.view.json")
+
+
+def dataset_version(csv_path: str) -> str:
+    """
+    Version O(1) du dataset complet (CSV source + segments) : change à chaque
+    rafraîchissement. Sert de clé de cache côté Streamlit.
+    """
+    version = source_fingerprint(csv_path)
+    path = view_path(csv_path)
+    if os.path.exists(path):
+        version += f":{os.stat(path).st_mtime_ns}"
+    return version
+
+
+def file_sha256(path: str, block_size: int = 1 << 20) -> str:
+    """Hash SHA-256 du fichier, lu par blocs (mémoire constante)."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _atomic_write_json(path: str, payload: dict):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(payload, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def to_dates(values: pd.Series) -> pd.Series:
+    """
+    Dates (datetime64, NaT si invalide). Une colonne catégorielle est d'abord
+    convertie en objets : pd.to_datetime la renverrait sinon catégorielle, non ordonnée.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype(object)
+    return pd.to_datetime(values, errors="coerce")
+
+
+def compute_metadata(df: pd.DataFrame, csv_path: str, fingerprint: str, content_hash: bool = True) -> dict:
+    """Résumé du dataset : date max, volumétrie, schéma, hash et effectifs par source."""
+    last_update = None
+    if DATE_COLUMN in df.columns:
+        last_date = to_dates(df[DATE_COLUMN]).max()
+        last_update = None if pd.isna(last_date) else str(last_date.date())
+
+    sources = {}
+    if SOURCE_COLUMN in df.columns:
+        counts = df[SOURCE_COLUMN].value_counts(dropna=False)
+        sources = {str(k): int(v) for k, v in counts.items() if v}
+
+    return {
+        "source": os.path.basename(csv_path),
+        "source_fingerprint": fingerprint,
+        "content_hash": file_sha256(csv_path) if content_hash else None,
+        "last_update": last_update,
+        "rows": int(len(df)),
+        "columns": {col: str(dtype) for col, dtype in df.dtypes.items()},
+        "sources": sources,
+    }
+
+
+def write_metadata(csv_path: str, df: pd.DataFrame, fingerprint: str) -> dict:
+    """Calcule et écrit (atomiquement) le fichier de métadonnées."""
+    meta = compute_metadata(df, csv_path, fingerprint)
+    _atomic_write_json(metadata_path(csv_path), meta)
+    return meta
+
+
+def update_metadata(csv_path: str, df_new: pd.DataFrame, view_version: int) -> dict:
+    """
+    Met à jour les métadonnées à partir du seul delta ajouté (coût O(delta)) :
+    volumétrie, date max, effectifs par source et hash chaîné du contenu.
+    """
+    meta = read_metadata(csv_path)
+    delta = compute_metadata(df_new, csv_path, meta["source_fingerprint"], content_hash=False)
+
+    meta["rows"] += delta["rows"]
+    if delta["last_update"] and (meta["last_update"] is None or delta["last_update"] > meta["last_update"]):
+        meta["last_update"] = delta["last_update"]
+    for source, count in delta["sources"].items():
+        meta["sources"][source] = meta["sources"].get(source, 0) + count
+
+    delta_hash = hashlib.sha256(df_new.to_csv(index=False).encode("utf-8"))
+    meta["content_hash"] = hashlib.sha256((meta["content_hash"] + delta_hash.hexdigest()).encode()).hexdigest()
+    meta["view_version"] = view_version
+
+    _atomic_write_json(metadata_path(csv_path), meta)
+    return meta
+
+
+def read_metadata(csv_path: str) -> dict:
+    """
+    Retourne les métadonnées du dataset en temps constant (lecture du petit
+    fichier JSON). Si le CSV source a changé, le store et les métadonnées sont
+    reconstruits une fois.
+    """
+    with stage("read_metadata", DATASET_READ):
+        fingerprint = source_fingerprint(csv_path)
+        path = metadata_path(csv_path)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("source_fingerprint") == fingerprint:
+                return meta
+
+        if pa is None:
+            return write_metadata(csv_path, _read_source(csv_path), fingerprint)
+        build_store(csv_path)
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def optimize_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """Convertit les colonnes texte en catégorielles et homogénéise les types mixtes."""
+    n = max(len(df), 1)
+    for col in df.columns:
+        s = df[col]
+        if s.dtype == object:
+            # Colonnes mixtes (int + str) : tout en texte pour un schéma Arrow stable
+            if pd.api.types.infer_dtype(s, skipna=True) != "string":
+                s = s.where(s.isna(), s.astype(str))
+            if col in CATEGORICAL_COLUMNS or s.nunique() / n <= CATEGORY_MAX_RATIO:
+                s = s.astype("category")
+            df[col] = s
+        elif col in CATEGORICAL_COLUMNS:
+            df[col] = s.astype("category")
+    return df
+
+
+def _read_source(csv_path: str) -> pd.DataFrame:
+    # numero_dpe (ex. "2373E0001234") serait sinon lu comme un flottant en notation scientifique
+    return optimize_dtypes(pd.read_csv(csv_path, low_memory=False, dtype={ID_COLUMN: str}))
+
+
+def build_store(csv_path: str) -> str:
+    """
+    Convertit le CSV en fichier Arrow IPC typé (écriture atomique via
+    fichier temporaire + os.replace) et met à jour les métadonnées.
+    Retourne le chemin du fichier créé.
+    """
+    fingerprint = source_fingerprint(csv_path)
+    df = _read_source(csv_path)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    # Index de dictionnaire en int32 : les segments peuvent ajouter des modalités
+    schema = pa.schema(
+        [
+            pa.field(f.name, pa.dictionary(pa.int32(), f.type.value_type))
+            if pa.types.is_dictionary(f.type) else f
+            for f in table.schema
+        ],
+        metadata=dict(table.schema.metadata or {}) | {FINGERPRINT_KEY: fingerprint.encode()},
+    )
+    table = table.cast(schema)
+
+    path = store_path(csv_path)
+    _write_arrow(table, path)
+    write_metadata(csv_path, df, fingerprint)
+    print(f"[INFO] Store colonnaire reconstruit : {os.path.basename(path)} ({len(df):,} lignes)")
+    return path
+
+
+def _write_arrow(table, path: str):
+    """Écrit une table Arrow IPC de façon atomique (fichier temporaire + os.replace)."""
+    table = table.unify_dictionaries()  # un seul dictionnaire par colonne dans un fichier IPC
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with pa.OSFile(tmp_path, "wb") as sink:
+        with ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def _open_arrow(path: str):
+    """Ouvre un fichier Arrow IPC en memory-map (zéro copie)."""
+    return ipc.open_file(pa.memory_map(path, "r")).read_all()
+
+
+def _store_is_fresh(path: str, fingerprint: str) -> bool:
+    if not os.path.exists(path):
+        return False
+    try:
+        with pa.memory_map(path, "r") as source:
+            schema = ipc.open_file(source).schema
+        return (schema.metadata or {}).get(FINGERPRINT_KEY) == fingerprint.encode()
+    except Exception:
+        return False
+
+
+def ensure_store(csv_path: str) -> str:
+    """Retourne le fichier Arrow à jour, en le reconstruisant si le CSV a changé."""
+    path = store_path(csv_path)
+    if not _store_is_fresh(path, source_fingerprint(csv_path)):
+        build_store(csv_path)
+    return path
+
+
+def read_view(csv_path: str) -> dict:
+    """
+    Retourne la vue courante : {"version", "base_fingerprint", "segments"}.
+    Si le CSV source a changé depuis (nouvel export complet), les segments
+    précédents sont ignorés et la vue repart de zéro.
+    """
+    fingerprint = source_fingerprint(csv_path)
+    path = view_path(csv_path)
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            view = json.load(f)
+        if view.get("base_fingerprint") == fingerprint:
+            return view
+        print("[INFO] CSV source modifié : les segments incrémentaux précédents sont ignorés.")
+    return {"version": 0, "base_fingerprint": fingerprint, "segments": {}}
+
+
+def view_tables(csv_path: str, columns: list = None) -> dict:
+    """
+    Store de base et segments de la vue courante, ouverts en memory-map :
+    {"base": table, <partition mensuelle>: table, ...} dans l'ordre de la vue.
+    Seules les colonnes demandées seront effectivement lues depuis le disque.
+    Les segments de la vue précédente sont conservés à chaque bascule ; si la
+    vue a changé deux fois entre la lecture de view.json et l'ouverture de ses
+    segments, elle est relue une fois.
+    """
+    base = ensure_store(csv_path)
+    seg_dir = segments_dir(csv_path)
+
+    tables = {"base": _open_arrow(base)}
+    for attempt in range(2):
+        view = read_view(csv_path)
+        try:
+            segments = {key: _open_arrow(os.path.join(seg_dir, name)) for key, name in view["segments"].items()}
+            break
+        except FileNotFoundError:
+            if attempt:
+                raise
+    tables.update(segments)
+    if columns is not None:
+        tables = {key: t.select([c for c in columns if c in t.column_names]) for key, t in tables.items()}
+    return tables
+
+
+def read_table(csv_path: str, columns: list = None):
+    """
+    Concaténation du store de base et des segments de la vue courante
+    (pyarrow.Table, zéro copie, cf. view_tables).
+    """
+    tables = list(view_tables(csv_path, columns).values())
+    return tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+
+def _conform(df: pd.DataFrame, schema):
+    """Convertit des lignes brutes (API ADEME) vers le schéma Arrow du store."""
+    arrays = []
+    for field in schema:
+        value_type = field.type.value_type if pa.types.is_dictionary(field.type) else field.type
+        s = df[field.name] if field.name in df.columns else pd.Series([None] * len(df), dtype=object)
+
+        if pa.types.is_null(value_type):
+            arr = pa.nulls(len(df))
+        elif pa.types.is_integer(value_type) or pa.types.is_floating(value_type):
+            arr = pa.array(pd.to_numeric(s, errors="coerce"), from_pandas=True).cast(value_type, safe=False)
+        elif pa.types.is_string(value_type) or pa.types.is_large_string(value_type):
+            arr = pa.array(s.where(s.isna(), s.astype(str)), type=value_type, from_pandas=True)
+        else:
+            try:
+                arr = pa.array(s, from_pandas=True).cast(value_type, safe=False)
+            except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+                arr = pa.nulls(len(df), type=value_type)
+
+        if pa.types.is_dictionary(field.type):
+            arr = arr.dictionary_encode().cast(field.type)
+        arrays.append(arr)
+    return pa.Table.from_arrays(arrays, schema=schema.remove_metadata())
+
+
+def _partition_key(dates: pd.Series) -> pd.Series:
+    """Partition mensuelle (AAAA-MM) à partir de la date de réception."""
+    return to_dates(dates).dt.strftime("%Y-%m").fillna("sans_date")
+
+
+def _write_ids(path: str, ids: np.ndarray):
+    """Écrit un tableau d'identifiants .npy de façon atomique."""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        np.save(f, ids, allow_pickle=False)
+    os.replace(tmp_path, path)
+
+
+def _write_id_manifest(csv_path: str, view: dict, months: dict):
+    _atomic_write_json(os.path.join(ids_dir(csv_path), "ids.json"), {
+        "base_fingerprint": view["base_fingerprint"], "view_version": view["version"], "months": months,
+    })
+
+
+def _id_values(values: pd.Series) -> np.ndarray:
+    return values.astype(str).to_numpy().astype("U")
+
+
+def load_id_index(csv_path: str, view: dict) -> dict:
+    """
+    Index persistant des numero_dpe : {partition mensuelle: fichier .npy des
+    identifiants triés}. Reconstruit une seule fois depuis le dataset s'il est
+    absent ou ne correspond pas à la vue (nouvel export complet) ; ensuite
+    maintenu par append_rows à partir du seul delta.
+    """
+    path = os.path.join(ids_dir(csv_path), "ids.json")
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        if (manifest.get("base_fingerprint") == view["base_fingerprint"]
+                and manifest.get("view_version") == view["version"]):
+            return manifest["months"]
+
+    existing = read_table(csv_path, [ID_COLUMN, DATE_COLUMN]).to_pandas()
+    existing = existing.dropna(subset=[ID_COLUMN])
+    if DATE_COLUMN in existing.columns:
+        keys = _partition_key(existing[DATE_COLUMN])
+    else:
+        keys = pd.Series("sans_date", index=existing.index)
+    os.makedirs(ids_dir(csv_path), exist_ok=True)
+    months = {}
+    for key, part in existing.groupby(keys):
+        name = f"month={key}.v{view['version']}.npy"
+        _write_ids(os.path.join(ids_dir(csv_path), name), np.unique(_id_values(part[ID_COLUMN])))
+        months[key] = name
+    _write_id_manifest(csv_path, view, months)
+    _remove_unreferenced(ids_dir(csv_path), months.values())
+    print(f"[INFO] Index des numero_dpe reconstruit ({len(existing):,} identifiants, {len(months)} mois)")
+    return months
+
+
+def _known_ids(csv_path: str, months: dict, keys) -> np.ndarray:
+    """Identifiants déjà présents dans les partitions mensuelles `keys` (triés)."""
+    arrays = [np.load(os.path.join(ids_dir(csv_path), months[k])) for k in keys if k in months]
+    return np.unique(np.concatenate(arrays)) if arrays else np.array([], dtype="U1")
+
+
+def append_rows(csv_path: str, df_new: pd.DataFrame) -> dict:
+    """
+    Ajoute des lignes au dataset sans réécrire l'existant :
+      1. déduplication sur numero_dpe (dans le lot, puis contre l'index
+         persistant des identifiants, limité aux mois >= la plus ancienne
+         date du delta) ;
+      2. écriture des seuls segments mensuels touchés (nouvelles versions) ;
+      3. bascule atomique de la vue, des métadonnées et de l'index des identifiants.
+    Le coût est proportionnel au delta (et aux partitions touchées),
+    pas à la taille du dataset. Un seul écrivain à la fois est supposé.
+    """
+    view = read_view(csv_path)
+    base_schema = _open_arrow(ensure_store(csv_path)).schema
+    seg_dir = segments_dir(csv_path)
+    has_ids = ID_COLUMN in df_new.columns and ID_COLUMN in base_schema.names
+
+    # --- Déduplication ---
+    if has_ids:
+        months = load_id_index(csv_path, view)
+        df_new = df_new.dropna(subset=[ID_COLUMN]).drop_duplicates(subset=[ID_COLUMN], keep="last")
+        candidates = list(months)
+        if DATE_COLUMN in df_new.columns:
+            # Seuls les mois >= la plus ancienne date du delta peuvent contenir des doublons
+            dated = _partition_key(df_new[DATE_COLUMN])
+            dated = dated[dated != "sans_date"]
+            if not dated.empty:
+                candidates = [k for k in months if k >= dated.min()]
+        df_new = df_new[~np.isin(_id_values(df_new[ID_COLUMN]), _known_ids(csv_path, months, candidates))]
+    else:
+        df_new = df_new.drop_duplicates()
+
+    if df_new.empty:
+        return {"new_rows": 0, "view_version": view["version"]}
+
+    # --- Écriture des segments touchés (copy-on-write, versionnés) ---
+    version = view["version"] + 1
+    segments = dict(view["segments"])
+    partitions = _partition_key(df_new[DATE_COLUMN]) if DATE_COLUMN in df_new.columns else None
+    groups = list(df_new.groupby(partitions)) if partitions is not None else [("sans_date", df_new)]
+    for key, part in groups:
+        table = _conform(part, base_schema)
+        if key in segments:
+            table = pa.concat_tables([_open_arrow(os.path.join(seg_dir, segments[key])), table])
+        name = f"month={key}.v{version}.arrow"
+        _write_arrow(table, os.path.join(seg_dir, name))
+        segments[key] = name
+
+    # --- Bascule atomique de la vue, puis métadonnées ---
+    previous = view
+    view = {"version": version, "base_fingerprint": view["base_fingerprint"], "segments": segments}
+    _atomic_write_json(view_path(csv_path), view)
+    update_metadata(csv_path, df_new, version)
+    _remove_unreferenced(seg_dir, [*segments.values(), *previous["segments"].values()])
+
+    # --- Index des identifiants : seuls les mois touchés sont réécrits ---
+    if has_ids:
+        previous_ids = list(months.values())
+        for key, part in groups:
+            name = f"month={key}.v{version}.npy"
+            ids = np.union1d(_known_ids(csv_path, months, [key]), _id_values(part[ID_COLUMN]))
+            _write_ids(os.path.join(ids_dir(csv_path), name), ids)
+            months[key] = name
+        _write_id_manifest(csv_path, view, months)
+        _remove_unreferenced(ids_dir(csv_path), [*months.values(), *previous_ids])
+
+    if len(segments) > COMPACT_MAX_SEGMENTS:
+        compact_segments(csv_path)
+    return {"new_rows": int(len(df_new)), "view_version": version}
+
+
+def _remove_unreferenced(seg_dir: str, keep):
+    """
+    Supprime les segments absents de `keep` (vue courante et précédente : un
+    lecteur peut avoir lu l'ancienne view.json sans avoir encore ouvert ses
+    segments). Les lecteurs qui les ont déjà ouverts en memory-map continuent de les lire.
+    """
+    keep = set(keep)
+    for name in os.listdir(seg_dir):
+        if name.endswith((".arrow", ".npy")) and name not in keep:
+            try:
+                os.remove(os.path.join(seg_dir, name))
+            except OSError:
+                pass
+
+
+def compact_segments(csv_path: str) -> dict:
+    """Fusionne tous les segments de la vue en un seul fichier (bascule atomique)."""
+    view = read_view(csv_path)
+    if len(view["segments"]) <= 1:
+        return view
+
+    seg_dir = segments_dir(csv_path)
+    old = list(view["segments"].values())
+    table = pa.concat_tables([_open_arrow(os.path.join(seg_dir, name)) for name in old])
+    version = view["version"] + 1
+    name = f"compact.v{version}.arrow"
+    _write_arrow(table, os.path.join(seg_dir, name))
+
+    previous = view
+    view = {"version": version, "base_fingerprint": view["base_fingerprint"], "segments": {"compact": name}}
+    _atomic_write_json(view_path(csv_path), view)
+    _remove_unreferenced(seg_dir, [name, *old])
+    # Contenu inchangé : l'index des identifiants suit simplement la nouvelle version
+    manifest = os.path.join(ids_dir(csv_path), "ids.json")
+    if os.path.exists(manifest):
+        with open(manifest, encoding="utf-8") as f:
+            ids = json.load(f)
+        if ids.get("view_version") == previous["version"]:
+            _write_id_manifest(csv_path, view, ids["months"])
+    print(f"[INFO] {len(old)} segments compactés en {name} ({table.num_rows:,} lignes)")
+    return view
+
+
+def load_dataset(csv_path: str, columns: list = None) -> pd.DataFrame:
+    """
+    Charge le dataset sous forme de DataFrame typé (catégorielles conservées).
+    Repli sur pd.read_csv si pyarrow n'est pas disponible.
+    """
+    with stage("load_dataset", DATASET_READ):
+        if pa is None:
+            df = _read_source(csv_path)
+            return df[[c for c in columns if c in df.columns]] if columns is not None else df
+        return read_table(csv_path, columns).to_pandas()
+
+
+def read_columns(csv_path: str) -> list:
+    """Liste des colonnes du dataset, sans charger les données."""
+    if pa is None:
+        return list(pd.read_csv(csv_path, nrows=0).columns)
+    with pa.memory_map(ensure_store(csv_path), "r") as source:
+        return ipc.open_file(source).schema.names
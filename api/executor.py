@@ -0,0 +1,145 @@
+"""
+Exécuteur d'inférence borné.
+
+Les appels predict (CPU) passent par un pool de threads dimensionné sur les
+cœurs disponibles, et non par le threadpool par défaut de Starlette (taille
+non maîtrisée). Chaque modèle prédit sur un seul thread (n_jobs=1, BLAS
+limité) : le parallélisme vient uniquement du pool, sans sur-souscription.
+
+Au-delà de `max_queue` tâches en attente, run lève QueueFullError
+(-> 429 côté API). Profondeur de file et temps d'attente sont mesurés.
+"""
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+
+class QueueFullError(RuntimeError):
+    """File d'attente de l'exécuteur pleine (contre-pression)."""
+
+
+def available_cores() -> int:
+    """Cœurs réellement utilisables (affinité CPU / quotas conteneur)."""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def limit_model_threads(models: dict, n_jobs: int = 1, blas_threads: int = 1):
+    """
+    Fixe n_jobs des estimateurs (forêts, pipelines) et limite les threads
+    BLAS/OpenMP : un appel predict = un thread du pool.
+    """
+    for model in models.values():
+        if model is None:
+            continue
+        for est in [model, *getattr(model, "named_steps", {}).values()]:
+            if hasattr(est, "n_jobs"):
+                est.n_jobs = n_jobs
+    try:
+        from threadpoolctl import threadpool_limits
+
+        threadpool_limits(blas_threads)
+    except ImportError:
+        pass
+
+
+class InferenceExecutor:
+    """Pool de threads borné avec file d'attente limitée et métriques."""
+
+    def __init__(self, workers: int = None, max_queue: int = 64, window: int = 2048):
+        self.workers = workers or available_cores()
+        self.max_queue = max_queue
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+        self._lock = threading.Lock()
+        self._pending = 0  # tâches soumises non terminées (en file + en cours)
+        self._running = 0
+        self._waits = deque(maxlen=window)
+        self._runs = deque(maxlen=window)
+        self.counters = {"submitted": 0, "completed": 0, "rejected": 0, "failed": 0, "max_queue_depth": 0}
+
+    @property
+    def queue_depth(self) -> int:
+        """Tâches en attente d'un thread libre."""
+        return max(self._pending - self._running, 0)
+
+    def _reserve(self, block: bool = False):
+        """Réserve une place (workers + max_queue au total) ; attend si block, sinon refuse."""
+        while True:
+            with self._lock:
+                if self._pending < self.workers + self.max_queue:
+                    self._pending += 1
+                    self.counters["submitted"] += 1
+                    self.counters["max_queue_depth"] = max(self.counters["max_queue_depth"], self.queue_depth)
+                    return
+                if not block:
+                    self.counters["rejected"] += 1
+                    raise QueueFullError(f"File d'inférence pleine ({self.max_queue} tâches en attente)")
+            time.sleep(0.005)
+
+    def _wrap(self, fn, args, kwargs):
+        enqueued = time.perf_counter()
+
+        def _task():
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+                self._waits.append(started - enqueued)
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    self._pending -= 1
+                    self._runs.append(time.perf_counter() - started)
+                    self.counters["completed" if ok else "failed"] += 1
+
+        return _task
+
+    async def run(self, fn, *args, **kwargs):
+        """Exécute fn dans le pool (depuis un handler async). Lève QueueFullError si saturé."""
+        self._reserve()
+        return await asyncio.wrap_future(self._pool.submit(self._wrap(fn, args, kwargs)))
+
+    def run_blocking(self, fn, *args, **kwargs):
+        """
+        Variante synchrone (générateurs de streaming) : attend une place dans
+        la file au lieu de la refuser.
+        """
+        self._reserve(block=True)
+        return self._pool.submit(self._wrap(fn, args, kwargs)).result()
+
+    def stats(self) -> dict:
+        """Profondeur de file, compteurs et percentiles (ms) d'attente / exécution."""
+        with self._lock:
+            waits, runs = np.array(self._waits), np.array(self._runs)
+            out = {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "queue_depth": self.queue_depth,
+                "running": self._running,
+                **self.counters,
+            }
+
+        def _pct(values):
+            if not len(values):
+                return None
+            p50, p99 = np.percentile(values, [50, 99]) * 1000
+            return {"p50_ms": round(float(p50), 2), "p99_ms": round(float(p99), 2),
+                    "max_ms": round(float(values.max()) * 1000, 2)}
+
+        out["wait"] = _pct(waits)
+        out["run"] = _pct(runs)
+        return out
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
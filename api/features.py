@@ -0,0 +1,221 @@
+# ============================================================
+# 🧬 Encodage des variables partagé entre les modèles
+# ============================================================
+"""
+Les pipelines DPE et MPR embarquent chacun leur étape `preprocess`, et le
+modèle CONSO passe par preproc_conso : un même lot était donc encodé trois
+fois. Ce module reconstitue chaque ColumnTransformer ajusté (imputation,
+standardisation, one-hot) en opérations NumPy vectorisées, à partir de
+dictionnaires catégorie -> indice précalculés depuis `categories_`.
+
+Deux prétraitements aux paramètres ajustés identiques ont la même signature :
+SharedFeatures encode alors le lot une seule fois et sert la même matrice à
+tous les modèles concernés.
+
+L'encodage rapide est vérifié contre `transform` de sklearn à la construction ;
+si la structure n'est pas reconnue ou si le résultat diffère, le
+prétraitement sklearn est utilisé tel quel (toujours une fois par signature).
+"""
+import weakref
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from api.metrics import stage
+
+
+def _unwrap(prep):
+    """Pipeline d'une seule étape -> l'étape elle-même."""
+    while hasattr(prep, "steps") and len(prep.steps) == 1:
+        prep = prep.steps[0][1]
+    return prep
+
+
+class FeatureEncoder:
+    """Encodage d'un prétraitement ajusté (ColumnTransformer), identique à prep.transform."""
+
+    def __init__(self, prep):
+        prep = _unwrap(prep)
+        self._prep = weakref.ref(prep)  # pas de référence forte : cache indexé par prep
+        self.signature = joblib.hash(prep)
+        self.categories = {}  # colonne -> {catégorie: indice}
+        self._blocks = None
+        try:
+            self._blocks = self._compile(prep)
+            self.n_features_out = sum(b["width"] for b in self._blocks)
+            for block in self._blocks:
+                if block["onehot"] is not None:
+                    self.categories.update(zip(block["columns"], block["onehot"]))
+            if not self._verify():
+                print(f"[WARN] Encodage rapide différent de sklearn ({type(self.prep).__name__}) : transform conservé")
+                self._blocks = None
+        except (TypeError, ValueError, AttributeError):
+            self._blocks = None
+
+    @property
+    def prep(self):
+        return self._prep()
+
+    @property
+    def fast(self) -> bool:
+        return self._blocks is not None
+
+    # ---------- Compilation du ColumnTransformer ----------
+    @staticmethod
+    def _compile(ct) -> list:
+        """Blocs (colonnes, imputation, standardisation, one-hot) dans l'ordre de sortie de ct."""
+        if not hasattr(ct, "transformers_"):
+            raise TypeError("prétraitement non reconnu")
+        blocks = []
+        for name, trans, cols in ct.transformers_:
+            cols = [cols] if isinstance(cols, str) else list(cols)
+            if trans == "drop" or not cols:
+                continue
+            if not all(isinstance(c, str) for c in cols):
+                raise TypeError("colonnes non nommées")
+            block = {"columns": cols, "fill": None, "mean": None, "scale": None, "onehot": None}
+            steps = [("passthrough", trans)] if isinstance(trans, str) else (
+                trans.steps if hasattr(trans, "steps") else [(name, trans)]
+            )
+            for _, step in steps:
+                kind = type(step).__name__
+                if step == "passthrough" or step is None:
+                    continue
+                if (kind == "SimpleImputer" and not step.add_indicator and _is_nan(step.missing_values)
+                        and block["mean"] is None and block["scale"] is None and block["onehot"] is None):
+                    block["fill"] = np.asarray(step.statistics_)
+                elif kind == "StandardScaler" and block["onehot"] is None:
+                    block["mean"] = step.mean_ if step.with_mean else None
+                    block["scale"] = step.scale_ if step.with_std else None
+                elif (kind == "OneHotEncoder" and step.drop_idx_ is None and step.handle_unknown == "ignore"
+                      and not getattr(step, "_infrequent_enabled", False) and step.dtype in (np.float64, float)):
+                    block["onehot"] = [{c: i for i, c in enumerate(cats)} for cats in step.categories_]
+                else:
+                    raise TypeError(f"étape non reconnue : {kind}")
+            if block["onehot"] is not None:
+                block["width"] = sum(len(m) for m in block["onehot"])
+            else:
+                block["width"] = len(cols)
+            blocks.append(block)
+        return blocks
+
+    def _encode(self, df: pd.DataFrame) -> np.ndarray:
+        n = len(df)
+        out = np.zeros((n, self.n_features_out), dtype=np.float64)
+        offset = 0
+        for block in self._blocks:
+            if block["onehot"] is None:
+                X = df[block["columns"]].to_numpy(dtype=np.float64)
+                if block["fill"] is not None:
+                    X = np.where(np.isnan(X), block["fill"].astype(np.float64), X)
+                if block["mean"] is not None:
+                    X = X - block["mean"]
+                if block["scale"] is not None:
+                    X = X / block["scale"]
+                out[:, offset:offset + X.shape[1]] = X
+                offset += X.shape[1]
+                continue
+            for j, (col, mapping) in enumerate(zip(block["columns"], block["onehot"])):
+                values = df[col].to_numpy(dtype=object)
+                if block["fill"] is not None:
+                    missing = values != values  # NaN uniquement, comme SimpleImputer
+                    if missing.any():
+                        values = np.where(missing, block["fill"][j], values)
+                codes = pd.Series(values, dtype=object).map(mapping).to_numpy(dtype=np.float64)
+                rows = np.flatnonzero(~np.isnan(codes))
+                out[rows, offset + codes[rows].astype(np.intp)] = 1.0  # catégorie inconnue : ligne à 0
+                offset += len(mapping)
+        return out
+
+    def _verify(self, seed: int = 0) -> bool:
+        """Compare l'encodage rapide à prep.transform sur un lot couvrant chaque catégorie, les inconnues et les NaN."""
+        rng = np.random.default_rng(seed)
+        n = max([len(m) for b in self._blocks if b["onehot"] for m in b["onehot"]] + [8]) + 2
+        sample = {}
+        for block in self._blocks:
+            for j, col in enumerate(block["columns"]):
+                if block["onehot"] is None:
+                    values = rng.normal(scale=1000, size=n)
+                    if block["fill"] is not None:
+                        values[0] = np.nan
+                    sample[col] = values
+                    continue
+                cats = list(block["onehot"][j])
+                values = [cats[i % len(cats)] for i in range(n - 2)] + ["__inconnue__", np.nan]
+                if block["fill"] is None:
+                    values[-1] = cats[0]
+                sample[col] = np.asarray(values, dtype=object)
+        df = pd.DataFrame(sample)
+        expected = self.prep.transform(df)
+        if hasattr(expected, "toarray"):
+            expected = expected.toarray()
+        return np.array_equal(np.asarray(expected, dtype=np.float64), self._encode(df))
+
+    # ---------- API ----------
+    def transform(self, df: pd.DataFrame):
+        return self._encode(df) if self.fast else self.prep.transform(df)
+
+
+def _is_nan(value) -> bool:
+    return isinstance(value, float) and np.isnan(value)
+
+
+# ------------------------------------------------------------
+# 🔗 Découpage des modèles et matrice partagée
+# ------------------------------------------------------------
+_ENCODERS = weakref.WeakKeyDictionary()
+_SPLITS = weakref.WeakKeyDictionary()
+
+
+def feature_encoder(prep) -> FeatureEncoder:
+    """FeatureEncoder d'un prétraitement ajusté (construit une fois par objet)."""
+    encoder = _ENCODERS.get(prep)
+    if encoder is None:
+        encoder = _ENCODERS[prep] = FeatureEncoder(prep)
+    return encoder
+
+
+def split_encoder(model) -> tuple:
+    """
+    (FeatureEncoder ou None, estimateur final) tels que
+    estimateur.predict(encoder.transform(df)) == model.predict(df).
+    """
+    split = _SPLITS.get(model)
+    if split is None:
+        if hasattr(model, "forest") and hasattr(model, "prep"):  # api.forest.CompiledModel
+            prep, estimator = model.prep, model.forest
+        elif hasattr(model, "steps") and len(model.steps) > 1:
+            prep, estimator = _unwrap(model[:-1]), model.steps[-1][1]
+        else:
+            prep, estimator = None, model
+        # prep gardé avec le découpage : model[:-1] est un nouvel objet, référencé faiblement ailleurs
+        split = _SPLITS[model] = (feature_encoder(prep) if prep is not None else None, estimator, prep)
+    return split[:2]
+
+
+class SharedFeatures:
+    """Matrices d'un lot, encodées une seule fois par prétraitement distinct (signature)."""
+
+    def __init__(self, df: pd.DataFrame):
+        self.df = df
+        self._matrices = {}
+
+    def encode(self, encoder: FeatureEncoder):
+        if encoder.signature not in self._matrices:
+            with stage("preprocess"):
+                self._matrices[encoder.signature] = encoder.transform(self.df)
+        return self._matrices[encoder.signature]
+
+    def predict(self, model, prep=None, label: str = "model"):
+        """
+        model.predict(df), ou model.predict(prep.transform(df)) si prep est fourni.
+        Encodage et predict sont chronométrés séparément (étapes preprocess et predict_<label>).
+        """
+        if prep is not None:
+            X, estimator = self.encode(feature_encoder(prep)), model
+        else:
+            encoder, estimator = split_encoder(model)
+            X = self.encode(encoder) if encoder is not None else self.df
+        with stage(f"predict_{label}"):
+            return estimator.predict(X)
@@ -0,0 +1,303 @@
+# ============================================================
+# 🌲 Moteur d'inférence compilé pour les RandomForest
+# ============================================================
+"""
+Aplatit les arbres d'une RandomForest (classification ou régression) en
+tableaux NumPy contigus (variable, seuil, enfants, valeurs des feuilles) et
+évalue tous les arbres d'un coup sur un lot de lignes, sans la validation et
+l'ordonnancement joblib de sklearn appliqués arbre par arbre.
+
+Les prédictions sont identiques bit à bit à celles du pipeline picklé :
+mêmes conversions (X en float32, comparaison en float64), même normalisation
+des feuilles et même ordre d'accumulation des arbres que sklearn. La
+compilation est vérifiée contre sklearn ; en cas d'écart le modèle sklearn
+est conservé.
+
+Les tableaux sont écrits en .npy dans MODELS_CACHE_DIR et
+relus en memory-map : contrairement aux arbres sklearn (recopiés à chaque
+unpickle), ils sont partagés entre processus via le cache disque.
+
+Usage (depuis la racine du projet) :
+    python -m api.forest export
+"""
+import argparse
+import os
+import shutil
+
+import joblib
+import numpy as np
+
+from api.config import MODELS_CACHE_DIR
+
+# Nombre max de (lignes x arbres) évalués à la fois (mémoire bornée)
+CHUNK_CELLS = 1 << 18
+
+
+def _sklearn_version() -> tuple:
+    import sklearn
+
+    return tuple(int(p) for p in sklearn.__version__.split(".")[:2] if p.isdigit())
+
+
+# Depuis sklearn 1.4, tree_.value des classifieurs contient déjà des fractions
+# et predict_proba ne renormalise plus (renormaliser décalerait le dernier bit)
+_VALUES_ARE_FRACTIONS = _sklearn_version() >= (1, 4)
+
+
+class CompiledForest:
+    """Forêt aplatie : tous les noeuds de tous les arbres dans des tableaux communs."""
+
+    def __init__(self, arrays: dict):
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.missing_left = arrays["missing_left"]
+        self.leaf_value = arrays["leaf_value"]
+        self.roots = arrays["roots"]
+        self.max_depth = int(arrays["max_depth"])
+        self.n_features_in_ = int(arrays["n_features_in"])
+        self.classes_ = arrays["classes"] if arrays["classes"].size else None
+        self.n_trees = len(self.roots)
+
+    @classmethod
+    def from_estimator(cls, forest) -> "CompiledForest":
+        """Compile une RandomForestClassifier / RandomForestRegressor ajustée (une seule sortie)."""
+        if getattr(forest, "n_outputs_", 1) != 1 or not hasattr(forest, "estimators_"):
+            raise TypeError(f"Forêt non compilable : {type(forest).__name__}")
+        is_classifier = hasattr(forest, "classes_")
+
+        parts = {k: [] for k in ("feature", "threshold", "left", "right", "missing_left", "leaf_value")}
+        roots, offset, max_depth = [], 0, 0
+        for est in forest.estimators_:
+            tree = est.tree_
+            n = tree.node_count
+            is_leaf = tree.children_left == -1
+            # Feuilles : boucle sur elles-mêmes (variable 0) pour un parcours sans branchement
+            own = np.arange(n) + offset
+            parts["feature"].append(np.where(is_leaf, 0, tree.feature).astype(np.intp))
+            parts["threshold"].append(np.asarray(tree.threshold, dtype=np.float64))
+            parts["left"].append(np.where(is_leaf, own, tree.children_left + offset).astype(np.intp))
+            parts["right"].append(np.where(is_leaf, own, tree.children_right + offset).astype(np.intp))
+            missing = getattr(tree, "missing_go_to_left", np.zeros(n, dtype=np.uint8))
+            parts["missing_left"].append(np.asarray(missing, dtype=bool))
+
+            value = tree.value[:, 0, :]  # (noeuds, classes) ou (noeuds, 1)
+            if is_classifier:
+                value = value[:, : est.n_classes_]
+            if is_classifier and not _VALUES_ARE_FRACTIONS:
+                # Même normalisation que DecisionTreeClassifier.predict_proba (sklearn < 1.4)
+                normalizer = value.sum(axis=1)[:, np.newaxis]
+                normalizer[normalizer == 0.0] = 1.0
+                value = value / normalizer
+            parts["leaf_value"].append(np.asarray(value, dtype=np.float64))
+
+            roots.append(offset)
+            offset += n
+            max_depth = max(max_depth, tree.max_depth)
+
+        arrays = {k: np.concatenate(v) for k, v in parts.items()}
+        arrays.update(
+            roots=np.asarray(roots, dtype=np.intp),
+            max_depth=np.int64(max_depth),
+            n_features_in=np.int64(forest.n_features_in_),
+            # Types natifs (str -> unicode fixe) : relisible en memory-map, sans pickle
+            classes=np.asarray(forest.classes_.tolist()) if is_classifier else np.array([]),
+        )
+        return cls(arrays)
+
+    def arrays(self) -> dict:
+        return {
+            "feature": self.feature, "threshold": self.threshold, "left": self.left,
+            "right": self.right, "missing_left": self.missing_left, "leaf_value": self.leaf_value,
+            "roots": self.roots, "max_depth": np.int64(self.max_depth),
+            "n_features_in": np.int64(self.n_features_in_),
+            "classes": self.classes_ if self.classes_ is not None else np.array([]),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays().values())
+
+    def _leaves(self, X: np.ndarray) -> np.ndarray:
+        """Indice de la feuille atteinte, pour chaque ligne et chaque arbre : (lignes, arbres)."""
+        rows = np.arange(len(X))[:, np.newaxis]
+        node = np.broadcast_to(self.roots, (len(X), self.n_trees)).copy()
+        for _ in range(self.max_depth):
+            x = X[rows, self.feature[node]]
+            go_left = np.where(np.isnan(x), self.missing_left[node], x <= self.threshold[node])
+            node = np.where(go_left, self.left[node], self.right[node])
+        return node
+
+    def _accumulate(self, X: np.ndarray) -> np.ndarray:
+        """Somme des valeurs de feuilles, arbre par arbre dans l'ordre (comme sklearn), divisée par n_arbres."""
+        out = np.zeros((len(X), self.leaf_value.shape[1]), dtype=np.float64)
+        step = max(1, CHUNK_CELLS // self.n_trees)
+        for start in range(0, len(X), step):
+            leaves = self._leaves(X[start:start + step])
+            acc = out[start:start + step]
+            for t in range(self.n_trees):
+                acc += self.leaf_value[leaves[:, t]]
+        out /= self.n_trees
+        return out
+
+    @staticmethod
+    def _as_float32(X) -> np.ndarray:
+        # Même conversion que sklearn (DTYPE float32) ; matrice creuse -> dense
+        if hasattr(X, "toarray"):
+            X = X.toarray()
+        return np.ascontiguousarray(X, dtype=np.float32)
+
+    def predict_proba(self, X) -> np.ndarray:
+        return self._accumulate(self._as_float32(X))
+
+    def predict(self, X) -> np.ndarray:
+        values = self._accumulate(self._as_float32(X))
+        if self.classes_ is None:
+            return values[:, 0]
+        return self.classes_.take(np.argmax(values, axis=1), axis=0)
+
+
+class CompiledModel:
+    """
+    Remplaçant de Pipeline(preprocess, model) ou d'une forêt seule : même
+    prétraitement sklearn, forêt compilée. Expose predict, classes_ et
+    named_steps comme le pipeline d'origine.
+    """
+
+    def __init__(self, forest: CompiledForest, prep=None):
+        self.forest = forest
+        self.prep = prep
+        self.classes_ = forest.classes_
+        self.named_steps = {**(dict(prep.named_steps) if prep is not None else {}), "model": forest}
+
+    def _transform(self, X):
+        return self.prep.transform(X) if self.prep is not None else X
+
+    def predict(self, X):
+        return self.forest.predict(self._transform(X))
+
+    def predict_proba(self, X):
+        return self.forest.predict_proba(self._transform(X))
+
+
+def split_model(model):
+    """(prétraitement ou None, forêt) si le modèle est une forêt ou un pipeline terminé par une forêt."""
+    if hasattr(model, "steps"):
+        final = model.steps[-1][1]
+        return (model[:-1] if len(model.steps) > 1 else None), final
+    return None, model
+
+
+def compile_model(model) -> CompiledModel:
+    prep, forest = split_model(model)
+    return CompiledModel(CompiledForest.from_estimator(forest), prep)
+
+
+def verify(model, compiled: CompiledModel, n: int = 512, seed: int = 0) -> bool:
+    """
+    Compare sklearn et le moteur compilé sur des entrées synthétiques
+    couvrant les seuils des arbres (y compris valeurs égales aux seuils).
+    """
+    _, forest = split_model(model)
+    if hasattr(forest, "n_jobs"):
+        forest.n_jobs = 1  # accumulation des arbres dans l'ordre (sinon ordre des threads)
+    cf = compiled.forest
+    rng = np.random.default_rng(seed)
+    X = np.zeros((n, cf.n_features_in_), dtype=np.float32)
+    internal = cf.left != np.arange(len(cf.left))
+    for j in range(cf.n_features_in_):
+        thresholds = cf.threshold[internal & (cf.feature == j)]
+        if thresholds.size:
+            picks = rng.choice(thresholds, n)
+            X[:, j] = picks + rng.choice([-1.0, 0.0, 1.0], n) * rng.random(n) * (np.abs(picks) + 1)
+        else:
+            X[:, j] = rng.normal(size=n)
+    if cf.classes_ is not None:
+        ok = np.array_equal(forest.predict_proba(X), cf.predict_proba(X))
+    else:
+        ok = np.array_equal(forest.predict(X), cf.predict(X))
+    return ok and np.array_equal(forest.predict(X), cf.predict(X))
+
+
+# ------------------------------------------------------------
+# 💾 Artefacts compilés (cache disque, memory-map)
+# ------------------------------------------------------------
+def artifact_paths(copy_path: str) -> tuple:
+    """(dossier .forest de tableaux .npy, .prep.joblib) à côté de la copie mappable du modèle."""
+    base = copy_path[: -len(".joblib")] if copy_path.endswith(".joblib") else copy_path
+    return f"{base}.forest", f"{base}.prep.joblib"
+
+
+def save_compiled(compiled: CompiledModel, copy_path: str):
+    """
+    Un .npy par tableau (seul format relu en memory-map par NumPy). Publication
+    atomique, une seule fois : le dossier est renommé, le .joblib lié (os.link).
+    """
+    forest_dir, prep_path = artifact_paths(copy_path)
+    os.makedirs(MODELS_CACHE_DIR, exist_ok=True)
+
+    tmp = f"{prep_path}.{os.getpid()}.tmp"
+    joblib.dump(compiled.prep, tmp)
+    try:
+        os.link(tmp, prep_path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+
+    tmp_dir = f"{forest_dir}.{os.getpid()}.tmp"
+    os.makedirs(tmp_dir, exist_ok=True)
+    for name, array in compiled.forest.arrays().items():
+        np.save(os.path.join(tmp_dir, f"{name}.npy"), array)
+    try:
+        os.rename(tmp_dir, forest_dir)
+    except OSError:  # déjà publié par un autre processus
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def load_compiled(copy_path: str):
+    """Moteur compilé depuis le cache disque (tableaux en memory-map), ou None s'il n'existe pas."""
+    forest_dir, prep_path = artifact_paths(copy_path)
+    if not (os.path.isdir(forest_dir) and os.path.exists(prep_path)):
+        return None
+    arrays = {
+        name[: -len(".npy")]: np.load(os.path.join(forest_dir, name), mmap_mode="r")
+        for name in os.listdir(forest_dir) if name.endswith(".npy")
+    }
+    return CompiledModel(CompiledForest(arrays), joblib.load(prep_path, mmap_mode="r"))
+
+
+def compile_and_save(model, copy_path: str):
+    """Compile, vérifie contre sklearn puis enregistre ; None si non compilable ou non identique."""
+    try:
+        compiled = compile_model(model)
+    except TypeError:
+        return None
+    if not verify(model, compiled):
+        print(f"[WARN] Forêt compilée non identique à sklearn : {os.path.basename(copy_path)} (sklearn conservé)")
+        return None
+    save_compiled(compiled, copy_path)
+    print(f"✅ Forêt compilée : {os.path.basename(copy_path)} ({compiled.forest.nbytes / 2**20:.1f} Mo)")
+    return load_compiled(copy_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["export"])
+    parser.parse_args()
+
+    from api.models_loader import load_model_mmap, mmap_copy_path
+    from api.registry import VersionedRegistry
+
+    model_set = VersionedRegistry(mmap=True).current()
+    for key, path in model_set.paths.items():
+        model = load_model_mmap(path)
+        if model is None:
+            continue
+        if compile_and_save(model, mmap_copy_path(path)) is None:
+            print(f"[INFO] {key} : non compilé (pas une forêt, ou écart avec sklearn)")
+
+
+if __name__ == "__main__":
+    main()
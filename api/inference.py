@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+
+from api.features import SharedFeatures
+from api.metrics import stage
+from api.normalization import normalizer_for
+
+# Valeurs interprétées comme "oui" pour logement_traversant
+TRUE_VALUES = ["oui", "true", "1"]
+
+# Variables explicatives communes aux modèles DPE, MPR et CONSO
+FEATURES = [
+    "annee_construction",
+    "surface_habitable_logement",
+    "type_batiment",
+    "type_energie_principale_chauffage",
+    "classe_inertie_batiment",
+    "qualite_isolation_murs",
+    "qualite_isolation_menuiseries",
+    "classe_altitude",
+    "logement_traversant",
+]
+
+# Colonnes produites par predict_frame
+OUTPUTS = ["DPE", "Conso_kWh_m2", "MPR"]
+
+
+def prepare_features(df: pd.DataFrame, models: dict = None, with_unknown: bool = False):
+    """
+    Normalise un lot de logements (catégories ramenées au vocabulaire des
+    encodeurs de `models`, cf. api.normalization) et convertit
+    logement_traversant en 0/1, en une seule passe vectorisée sur toutes les lignes.
+    with_unknown=True retourne aussi, par ligne, les catégories inconnues des modèles.
+    """
+    with stage("normalize"):
+        df, unknown = normalizer_for(models).apply(df)
+    if "logement_traversant" in df.columns:
+        df["logement_traversant"] = (
+            df["logement_traversant"].astype(str).str.strip().str.lower()
+            .isin(TRUE_VALUES).astype(int)
+        )
+    return (df, unknown) if with_unknown else df
+
+
+def predict_frame(df: pd.DataFrame, models: dict) -> dict:
+    """
+    Exécute chaque modèle une seule fois sur toutes les lignes de df ; les
+    prétraitements identiques (DPE, MPR, CONSO) n'encodent le lot qu'une fois.
+    Retourne un dict de listes alignées sur les lignes : "DPE", "Conso_kWh_m2", "MPR".
+    """
+    n = len(df)
+    out = {key: [None] * n for key in OUTPUTS}
+    shared = SharedFeatures(df)
+
+    model_dpe = models.get("dpe")
+    if model_dpe is not None:
+        out["DPE"] = [str(v) for v in shared.predict(model_dpe, label="dpe")]
+
+    model_conso = models.get("conso")
+    if model_conso is not None:
+        preproc_conso = models.get("preproc_conso")
+        y = shared.predict(model_conso, prep=preproc_conso, label="conso")
+        out["Conso_kWh_m2"] = np.round(np.asarray(y, dtype=float), 2).tolist()
+
+    model_mpr = models.get("mpr")
+    if model_mpr is not None:
+        out["MPR"] = np.asarray(shared.predict(model_mpr, label="mpr")).astype(int).tolist()
+
+    return out
+
+
+def predict_rows(df: pd.DataFrame, models: dict) -> list:
+    """
+    Prédit un lot en mode vectorisé ; en cas d'échec du lot, repasse ligne
+    à ligne pour isoler les lignes fautives. Retourne une liste de dicts
+    (une entrée par ligne, dans l'ordre) avec une clé "error".
+    """
+    try:
+        preds = predict_frame(df, models)
+        return [
+            {key: preds[key][i] for key in preds} | {"error": None}
+            for i in range(len(df))
+        ]
+    except Exception:
+        rows = []
+        for i in range(len(df)):
+            try:
+                preds = predict_frame(df.iloc[[i]], models)
+                rows.append({key: preds[key][0] for key in preds} | {"error": None})
+            except Exception as e:
+                rows.append({key: None for key in OUTPUTS} | {"error": str(e)})
+        return rows
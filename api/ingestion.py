@@ -0,0 +1,320 @@
+"""
+Ingestion paginée et concurrente des DPE depuis les API ADEME (data-fair).
+
+- suit les liens "next" jusqu'à épuisement de chaque requête ;
+- découpe la période en tranches de dates récupérées en parallèle
+  (pool de threads borné, session HTTP poolée avec retries) ;
+- enregistre sa progression (point de reprise) après chaque page :
+  une exécution interrompue reprend là où elle s'était arrêtée.
+
+Utilisé par /refresh_data (refresh_partitions, en tâche de fond) et par le
+notebook collect_data_api.ipynb. Chaque département alimente sa propre
+partition (cf. api.partitions) : la requête ADEME est déjà filtrée par
+département, rien n'est fusionné entre départements.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from api.config import ADEME_ENDPOINTS, INGESTION_DIR, INGESTION_PAGE_SIZE, INGESTION_START, INGESTION_WORKERS
+from api.datastore import ID_COLUMN, append_rows, read_columns, read_metadata
+from api.partitions import (
+    available_departments, normalize_department, partition_path, postal_prefixes, served_departments,
+)
+from api.spatial import update_index
+
+_local = threading.local()
+
+
+def get_session(pool_size: int = INGESTION_WORKERS) -> requests.Session:
+    """Session HTTP par thread, avec pool de connexions et retries (429 / 5xx)."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        retries = Retry(
+            total=5,
+            connect=3,
+            read=3,
+            backoff_factor=0.6,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET"],
+        )
+        adapter = HTTPAdapter(max_retries=retries, pool_connections=pool_size, pool_maxsize=pool_size)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _local.session = session
+    return session
+
+
+def date_slices(start: str, end: str = None, freq: str = "MS") -> list:
+    """
+    Découpe [start, end] en tranches (par défaut mensuelles).
+    Si end est None, la dernière tranche est ouverte ("*") pour inclure
+    les DPE reçus après le lancement.
+    """
+    start_ts = pd.Timestamp(start)
+    end_ts = pd.Timestamp(end) if end else pd.Timestamp.today().normalize()
+    bounds = [start_ts] + [b for b in pd.date_range(start_ts, end_ts, freq=freq) if b > start_ts]
+
+    slices = []
+    for i, lower in enumerate(bounds):
+        if i + 1 < len(bounds):
+            upper = (bounds[i + 1] - pd.Timedelta(days=1)).strftime("%Y-%m-%d")
+        else:
+            upper = end_ts.strftime("%Y-%m-%d") if end else "*"
+        slices.append((lower.strftime("%Y-%m-%d"), upper))
+    return slices
+
+
+def first_page_params(prefix: str, lower: str, upper: str, page_size: int = INGESTION_PAGE_SIZE) -> dict:
+    """Paramètres de la première page d'une tranche (préfixe de code postal + dates)."""
+    return {
+        "q": f"{prefix}*",
+        "q_fields": "code_postal_ban",
+        "qs": f"date_reception_dpe:[{lower} TO {upper}]",
+        "size": page_size,
+        "sort": "date_reception_dpe",
+    }
+
+
+class Checkpoint:
+    """
+    Point de reprise d'une ingestion : état de chaque tranche (curseur "next",
+    lignes reçues, terminée ou non) + fichiers NDJSON des lignes déjà reçues.
+    """
+
+    def __init__(self, directory: str, run_key: str):
+        self.dir = os.path.join(directory, run_key)
+        self.path = os.path.join(self.dir, "checkpoint.json")
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+        self.state = {}
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                self.state = json.load(f)
+
+    def slice_state(self, slice_id: str) -> dict:
+        return self.state.get(slice_id, {"done": False, "next": None, "rows": 0, "pages": 0, "total": None})
+
+    def spool_path(self, slice_id: str) -> str:
+        return os.path.join(self.dir, f"{slice_id}.ndjson")
+
+    def record_page(self, slice_id: str, results: list, next_url: str, total: int = None):
+        """Ajoute une page au spool puis enregistre le curseur (écriture atomique)."""
+        with open(self.spool_path(slice_id), "a", encoding="utf-8") as f:
+            for row in results:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+        with self._lock:
+            st = self.slice_state(slice_id)
+            st.update(
+                rows=st["rows"] + len(results), pages=st["pages"] + 1,
+                next=next_url, done=not next_url, total=total if total is not None else st["total"],
+            )
+            self.state[slice_id] = st
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(self.state, f)
+            os.replace(tmp, self.path)
+
+    def frame(self, slice_id: str) -> pd.DataFrame:
+        path = self.spool_path(slice_id)
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return pd.DataFrame()
+        return pd.read_json(path, lines=True, dtype=False)
+
+    def clear(self):
+        """Supprime le point de reprise (ingestion terminée et intégrée)."""
+        for name in os.listdir(self.dir):
+            os.remove(os.path.join(self.dir, name))
+        os.rmdir(self.dir)
+
+
+def fetch_slice(url: str, params: dict, slice_id: str, checkpoint: Checkpoint,
+                progress=None, delay: float = 0.0):
+    """
+    Récupère toutes les pages d'une tranche en suivant "next", en reprenant
+    au dernier curseur enregistré si la tranche avait été interrompue.
+    """
+    st = checkpoint.slice_state(slice_id)
+    if st["done"]:
+        return st
+
+    session = get_session()
+    if st["next"]:
+        r = session.get(st["next"], timeout=120)
+    else:
+        r = session.get(url, params=params, timeout=120)
+
+    while True:
+        r.raise_for_status()
+        js = r.json()
+        results = js.get("results", [])
+        next_url = js.get("next") if results else None
+        checkpoint.record_page(slice_id, results, next_url, js.get("total"))
+        if progress:
+            progress(slice_id=slice_id, rows=len(results), total=js.get("total"))
+        if not next_url:
+            return checkpoint.slice_state(slice_id)
+        if delay:
+            time.sleep(delay)  # pause douce pour éviter le throttling
+        r = session.get(next_url, timeout=120)
+
+
+def run_key(dept: str, start: str, end: str, endpoints: dict) -> str:
+    """Identifiant stable d'une ingestion (même paramètres => même point de reprise)."""
+    raw = json.dumps([dept, start, end, sorted(endpoints.items())])
+    return f"dpe_{dept}_{hashlib.sha1(raw.encode()).hexdigest()[:12]}"
+
+
+def ingest(dept: str, start: str, end: str = None, endpoints: dict = None, freq: str = "MS",
+           workers: int = INGESTION_WORKERS, checkpoint_dir: str = INGESTION_DIR,
+           progress=None, delay: float = 0.0, page_size: int = INGESTION_PAGE_SIZE):
+    """
+    Ingestion complète d'un département entre start et end (None = jusqu'à
+    aujourd'hui, borne ouverte). Retourne (frames, checkpoint) où frames est
+    un dict {label: DataFrame} ; appeler checkpoint.clear() une fois les
+    données intégrées.
+    """
+    endpoints = endpoints or ADEME_ENDPOINTS
+    checkpoint = Checkpoint(checkpoint_dir, run_key(dept, start, end, endpoints))
+    slices = date_slices(start, end, freq)
+    # Corse : plusieurs préfixes de codes postaux (200, 201 pour 2A...), une tranche par préfixe
+    prefixes = postal_prefixes(normalize_department(dept))
+
+    def slice_id(label: str, prefix: str, lower: str) -> str:
+        return f"{label}_{lower}" if prefix == dept else f"{label}_{prefix}_{lower}"
+
+    tasks = {}
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for label, url in endpoints.items():
+            for prefix in prefixes:
+                for lower, upper in slices:
+                    params = first_page_params(prefix, lower, upper, page_size)
+                    future = pool.submit(fetch_slice, url, params, slice_id(label, prefix, lower), checkpoint,
+                                         progress, delay)
+                    tasks[future] = label
+        for future in as_completed(tasks):
+            future.result()  # propage la première erreur (le point de reprise est conservé)
+
+    frames = {}
+    for label in endpoints:
+        parts = [checkpoint.frame(slice_id(label, prefix, lower)) for prefix in prefixes for lower, _ in slices]
+        parts = [p for p in parts if not p.empty]
+        frames[label] = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame()
+    return frames, checkpoint
+
+
+def refresh_dataset(csv_path: str, dept: str = "73", progress=None) -> dict:
+    """
+    Met à jour le dataset local avec les DPE (existants + neufs) reçus depuis
+    sa dernière date : ingestion, harmonisation des colonnes puis ajout
+    incrémental dédupliqué. `progress` reçoit chaque page (cf. fetch_slice).
+    """
+    if not os.path.exists(csv_path):
+        raise FileNotFoundError("Dataset local introuvable.")
+
+    # --- Métadonnées du dataset local (sans relire les données) ---
+    last_date_str = read_metadata(csv_path)["last_update"]
+    st_cols = read_columns(csv_path)  # Schéma de référence
+    print(f"[INFO] {len(st_cols)} colonnes attendues dans le dataset final.")
+
+    # --- Ingestion paginée et concurrente (reprend un éventuel run interrompu) ---
+    frames, checkpoint = ingest(dept, last_date_str, progress=progress)
+
+    new_frames = []
+    for label, df_new in frames.items():
+        if df_new.empty:
+            print(f"[INFO] Aucun nouveau DPE pour {label}")
+            continue
+        df_new["Logement"] = "Ancien" if label == "existants" else "Neuf"
+
+        # --- Harmonisation des colonnes ---
+        # Garde uniquement les colonnes déjà présentes dans le dataset local
+        df_new = df_new.reindex(columns=st_cols, fill_value=pd.NA)
+        new_frames.append(df_new)
+        print(f"[INFO] {len(df_new)} nouvelles lignes récupérées pour {label}.")
+
+    # --- Vérification ---
+    if not new_frames:
+        checkpoint.clear()
+        return {"status": "no_update", "new_rows": 0, "message": "Aucune donnée nouvelle détectée."}
+
+    # --- Ajout incrémental (segments dédupliqués sur numero_dpe, vue atomique) ---
+    # La borne [last_date TO *] refait venir le dernier jour : les doublons sont écartés ici.
+    summary = append_rows(csv_path, pd.concat(new_frames, ignore_index=True))
+    checkpoint.clear()
+    if summary["new_rows"] == 0:
+        return {"status": "no_update", "new_rows": 0, "message": "Aucune donnée nouvelle détectée."}
+
+    return {
+        "status": "ok",
+        "new_rows": summary["new_rows"],
+        "updated_until": read_metadata(csv_path)["last_update"],
+    }
+
+
+def create_partition(dept: str, start: str = INGESTION_START, reference: str = None, progress=None) -> dict:
+    """
+    Crée la partition d'un département absent : ingestion complète depuis
+    `start`, colonnes alignées sur la partition `reference` (CSV d'un autre
+    département), écriture atomique du CSV puis construction du store.
+    """
+    frames, checkpoint = ingest(dept, start, progress=progress)
+    columns = read_columns(reference) if reference else None
+
+    parts = []
+    for label, df_new in frames.items():
+        if df_new.empty:
+            continue
+        df_new["Logement"] = "Ancien" if label == "existants" else "Neuf"
+        parts.append(df_new.reindex(columns=columns, fill_value=pd.NA) if columns else df_new)
+    if not parts:
+        checkpoint.clear()
+        return {"status": "no_update", "new_rows": 0, "message": f"Aucun DPE trouvé pour le département {dept}."}
+
+    df = pd.concat(parts, ignore_index=True)
+    if ID_COLUMN in df.columns:
+        df = df.drop_duplicates(subset=[ID_COLUMN], keep="last")
+
+    path = partition_path(dept, create=True)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    checkpoint.clear()
+    print(f"[INFO] Partition {dept} créée : {len(df):,} lignes")
+    return {"status": "created", "new_rows": int(len(df)), "updated_until": read_metadata(path)["last_update"]}
+
+
+def refresh_partitions(departments: list = None, progress=None) -> dict:
+    """
+    Rafraîchit chaque partition demandée (défaut : départements servis), l'une
+    après l'autre ; un département sans partition est créé depuis INGESTION_START.
+    """
+    departments = [normalize_department(d) for d in departments] if departments else served_departments()
+    existing = available_departments()
+    reference = partition_path(existing[0]) if existing else None
+
+    results = {}
+    for dept in departments:
+        if dept in existing:
+            results[dept] = refresh_dataset(partition_path(dept), dept, progress=progress)
+        else:
+            results[dept] = create_partition(dept, reference=reference, progress=progress)
+        if results[dept]["new_rows"]:
+            # Index spatial mis à jour tout de suite (seules les nouvelles lignes sont lues)
+            try:
+                update_index(partition_path(dept))
+            except Exception as e:
+                print(f"[WARN] Index spatial du {dept} non mis à jour ({e}) : reconstruit à la prochaine requête")
+
+    new_rows = sum(r["new_rows"] for r in results.values())
+    return {"status": "ok" if new_rows else "no_update", "new_rows": new_rows, "departments": results}
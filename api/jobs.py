@@ -0,0 +1,227 @@
+"""
+Tâches de fond (rafraîchissement des données ADEME).
+
+- chaque tâche a un identifiant et un état persisté en JSON sous
+  STORE_DIR/jobs/<id>.json : lisible par n'importe quel worker uvicorn ;
+- un fichier verrou créé en O_EXCL empêche deux rafraîchissements
+  concurrents (même entre processus) d'écrire sur DATA_PATH ;
+- la tâche tourne dans un thread dédié : la requête HTTP répond aussitôt.
+"""
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime
+
+from api.config import JOBS_DIR
+
+FINAL_STATUSES = ("done", "failed")
+
+
+def _now() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def lock_path(name: str) -> str:
+    return os.path.join(JOBS_DIR, f"{name}.lock")
+
+
+def save_job(job: dict):
+    """Écriture atomique de l'état d'une tâche."""
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = job_path(job["id"])
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(job, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def read_job(job_id: str) -> dict:
+    """État d'une tâche, ou None si l'identifiant est inconnu."""
+    if not job_id.isalnum():
+        return None
+    try:
+        with open(job_path(job_id), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+# ------------------------------------------------------------
+# 🔒 Verrou inter-processus
+# ------------------------------------------------------------
+def _pid_alive(pid: int) -> bool:
+    if os.name != "posix":
+        return True  # pas de vérification fiable : le verrou est conservé
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def acquire_lock(name: str, job_id: str) -> bool:
+    """
+    Crée le fichier verrou de façon atomique (O_EXCL). Un verrou laissé par un
+    processus mort est supprimé puis repris. Retourne False si déjà détenu.
+    """
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    path = lock_path(name)
+    for _ in range(2):
+        try:
+            fd = os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            holder = lock_holder(name)
+            if holder and not _pid_alive(holder["pid"]):
+                print(f"[WARN] Verrou '{name}' orphelin (pid {holder['pid']}), suppression.")
+                _remove_stale_lock(name, holder)
+                continue
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"pid": os.getpid(), "job_id": job_id, "since": _now()}, f)
+        return True
+    return False
+
+
+def _read_holder(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _remove_stale_lock(name: str, holder: dict):
+    """
+    Supprime le verrou orphelin `holder`. Deux processus peuvent le constater
+    en même temps : le verrou est d'abord renommé (un seul y parvient), puis
+    supprimé seulement s'il contient toujours l'ancien détenteur. Sinon c'est
+    le verrou neuf d'un autre processus, remis en place.
+    """
+    path = lock_path(name)
+    stale = f"{path}.{os.getpid()}.{uuid.uuid4().hex[:8]}.stale"
+    try:
+        os.rename(path, stale)
+    except FileNotFoundError:
+        return  # déjà supprimé par un autre processus
+    if _read_holder(stale) != holder:
+        try:
+            os.link(stale, path)
+        except FileExistsError:
+            pass
+    os.remove(stale)
+
+
+def lock_holder(name: str) -> dict:
+    """Contenu du verrou ({pid, job_id, since}) ou None s'il est libre."""
+    return _read_holder(lock_path(name))
+
+
+def release_lock(name: str):
+    try:
+        os.remove(lock_path(name))
+    except FileNotFoundError:
+        pass
+
+
+# ------------------------------------------------------------
+# 📈 Suivi de progression
+# ------------------------------------------------------------
+class JobProgress:
+    """
+    Agrège les pages reçues (callback progress d'ingest) et persiste
+    l'état de la tâche au plus toutes les `interval` secondes.
+    L'ETA est estimée sur le débit observé et le total annoncé par l'API
+    pour les tranches déjà entamées.
+    """
+
+    def __init__(self, job: dict, interval: float = 1.0):
+        self.job = job
+        self.interval = interval
+        self.started = time.monotonic()
+        self.totals = {}
+        self._last_save = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, slice_id: str, rows: int, total: int = None):
+        with self._lock:
+            progress = self.job["progress"]
+            progress["pages"] += 1
+            progress["rows_fetched"] += rows
+            if total is not None:
+                self.totals[slice_id] = total
+            progress["rows_expected"] = sum(self.totals.values()) or None
+            progress["eta_s"] = self._eta(progress)
+            if time.monotonic() - self._last_save >= self.interval:
+                self._last_save = time.monotonic()
+                save_job(self.job)
+
+    def _eta(self, progress: dict):
+        fetched, expected = progress["rows_fetched"], progress["rows_expected"]
+        if not fetched or not expected:
+            return None
+        elapsed = time.monotonic() - self.started
+        return round(max(expected - fetched, 0) * elapsed / fetched, 1)
+
+    def update(self, **fields):
+        with self._lock:
+            self.job["progress"].update(fields)
+            save_job(self.job)
+
+
+# ------------------------------------------------------------
+# 🚀 Lancement
+# ------------------------------------------------------------
+def start_job(kind: str, target, lock: str = None) -> tuple:
+    """
+    Crée une tâche et lance target(progress) dans un thread.
+    Si `lock` est fourni et déjà détenu, aucune tâche n'est créée et
+    (None, job_id en cours) est retourné ; sinon (job, None).
+    """
+    job_id = uuid.uuid4().hex
+    if lock and not acquire_lock(lock, job_id):
+        holder = lock_holder(lock) or {}
+        return None, holder.get("job_id")
+
+    job = {
+        "id": job_id,
+        "kind": kind,
+        "status": "queued",
+        "created_at": _now(),
+        "started_at": None,
+        "finished_at": None,
+        "progress": {"pages": 0, "rows_fetched": 0, "rows_expected": None, "rows_appended": 0, "eta_s": None},
+        "result": None,
+        "error": None,
+    }
+    save_job(job)
+    progress = JobProgress(job)
+
+    def _run():
+        try:
+            job.update(status="running", started_at=_now())
+            save_job(job)
+            result = target(progress)
+            with progress._lock:
+                job.update(status="done", result=result)
+                job["progress"]["eta_s"] = 0
+        except Exception as e:
+            traceback.print_exc()
+            with progress._lock:
+                job.update(status="failed", error=str(e))
+        finally:
+            job["finished_at"] = _now()
+            save_job(job)
+            if lock:
+                release_lock(lock)
+
+    threading.Thread(target=_run, name=f"job-{kind}-{job_id[:8]}", daemon=True).start()
+    return job, None
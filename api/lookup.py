@@ -0,0 +1,413 @@
+# ============================================================
+# 🧮 Table de prédictions précalculées (grille catégorielle)
+# ============================================================
+"""
+Hors variables numériques (année de construction, surface), toutes les
+entrées des modèles sont des catégories en petit nombre. Ce module précalcule
+les sorties DPE / CONSO / MPR sur la grille complète :
+
+    catégories connues des encodeurs x logement_traversant (0/1)
+    x années (LOOKUP_YEARS) x surfaces (LOOKUP_SURFACES)
+
+et les range dans des tableaux NumPy compacts (un .npy par sortie, relus en
+memory-map), indexés en base mixte : l'indice d'une ligne est calculé
+directement à partir des codes de ses variables, sans recherche (O(1)).
+
+Une ligne dont toutes les valeurs (après prepare_features) tombent exactement
+sur la grille est servie depuis la table ; les autres passent par les modèles.
+La table est liée au jeu de modèles actif (clé du registre) : après une
+bascule de version, elle est ignorée jusqu'à sa reconstruction. Les modèles
+sans version déclarée (version "config") sont suivis par l'empreinte de leur
+fichier, enregistrée dans meta.json : un modèle écrasé sur place écarte la table.
+
+Usage (depuis la racine du projet) :
+    python -m api.lookup build
+    python -m api.lookup report
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from api.config import LOOKUP_DIR, LOOKUP_SURFACES, LOOKUP_YEARS
+from api.inference import FEATURES, OUTPUTS, predict_frame, prepare_features
+from api.metrics import stage
+from api.normalization import normalizer_for
+from api.registry import model_fingerprint
+
+# Variables numériques de la grille (les autres sont catégorielles)
+NUMERIC = ["annee_construction", "surface_habitable_logement", "logement_traversant"]
+# Sortie produite par chaque modèle
+MODEL_OUTPUTS = {"dpe": "DPE", "conso": "Conso_kWh_m2", "mpr": "MPR"}
+# Lignes prédites à la fois pendant la construction
+BUILD_CHUNK_ROWS = 200000
+
+
+def grid_axes(models, years: tuple = LOOKUP_YEARS, surfaces: tuple = LOOKUP_SURFACES) -> dict:
+    """Valeurs de chaque variable sur la grille, dans l'ordre de FEATURES."""
+    vocab = normalizer_for(models).vocabulary
+
+    start, stop, step = years
+    s_start, s_stop, s_step = surfaces
+    axes = {
+        "annee_construction": list(range(start, stop + 1, step)),
+        "surface_habitable_logement": [float(v) for v in range(s_start, s_stop + 1, s_step)],
+        "logement_traversant": [0, 1],
+    }
+    for col in FEATURES:
+        if col in axes:
+            continue
+        if not vocab.get(col):
+            raise ValueError(f"Catégories introuvables dans les encodeurs pour {col}")
+        axes[col] = list(vocab[col])
+    return {col: axes[col] for col in FEATURES}
+
+
+# ------------------------------------------------------------
+# 📖 Lecture de la table
+# ------------------------------------------------------------
+class LookupTable:
+    """Table construite par build_table, relue en memory-map."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.features = self.meta["features"]
+        self.sizes = [len(self.meta["axes"][col]) for col in self.features]
+        self.rows = int(np.prod(self.sizes))
+        # Pas de base mixte : dernier axe le plus rapide (ordre C, comme np.ravel_multi_index)
+        self.strides = np.cumprod([1] + self.sizes[:0:-1])[::-1].astype(np.int64)
+        self.index = {
+            col: pd.Index(np.asarray(values, dtype=np.float64) if col in NUMERIC else values)
+            for col, values in self.meta["axes"].items()
+        }
+        self.arrays = {
+            out: np.load(os.path.join(path, f"{out}.npy"), mmap_mode="r") for out in self.meta["outputs"]
+        }
+        self.dpe_labels = np.asarray(self.meta["dpe_labels"], dtype=object)
+
+    def changed_models(self) -> list:
+        """Modèles "config" dont le fichier a changé depuis la construction de la table."""
+        return [
+            key for key, entry in self.meta.get("model_files", {}).items()
+            if model_fingerprint(entry["path"]) != entry["fingerprint"]
+        ]
+
+    def locate(self, df: pd.DataFrame, nearest: tuple = ()) -> tuple:
+        """
+        (présence sur la grille, indice à plat) pour chaque ligne de df (déjà passé
+        par prepare_features). Les variables de `nearest` sont ramenées au noeud le
+        plus proche au lieu d'exiger une valeur exacte.
+        """
+        codes = np.empty((len(df), len(self.features)), dtype=np.int64)
+        for j, col in enumerate(self.features):
+            if col not in df.columns:
+                return np.zeros(len(df), dtype=bool), np.zeros(len(df), dtype=np.int64)
+            index = self.index[col]
+            if col in NUMERIC:
+                values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+                if col in nearest:
+                    axis = index.to_numpy()
+                    pos = np.clip(np.searchsorted(axis, values), 1, len(axis) - 1)
+                    pos -= (values - axis[pos - 1]) < (axis[pos] - values)
+                    codes[:, j] = np.where(np.isnan(values), -1, pos)
+                    continue
+            else:
+                values = df[col].to_numpy(dtype=object)
+            codes[:, j] = index.get_indexer(values)
+        hit = (codes >= 0).all(axis=1)
+        return hit, np.where(hit, codes @ self.strides, 0)
+
+    def values(self, flat: np.ndarray) -> dict:
+        """Sorties stockées aux indices `flat`, au format de predict_frame."""
+        out = {key: [None] * len(flat) for key in OUTPUTS}
+        if "DPE" in self.arrays:
+            out["DPE"] = self.dpe_labels[self.arrays["DPE"][flat]].tolist()
+        if "Conso_kWh_m2" in self.arrays:
+            out["Conso_kWh_m2"] = (self.arrays["Conso_kWh_m2"][flat] / 100).tolist()
+        if "MPR" in self.arrays:
+            out["MPR"] = self.arrays["MPR"][flat].astype(int).tolist()
+        return out
+
+    def grid_frame(self, flat: np.ndarray) -> pd.DataFrame:
+        """Lignes de la grille aux indices `flat` (variables au format de prepare_features)."""
+        codes = np.unravel_index(flat, self.sizes)
+        data = {}
+        for col, code in zip(self.features, codes):
+            axis = self.meta["axes"][col]
+            dtype = np.float64 if col == "surface_habitable_logement" else (np.int64 if col in NUMERIC else object)
+            data[col] = np.asarray(axis, dtype=dtype)[code]
+        return pd.DataFrame(data)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in self.arrays.values())
+
+
+# ------------------------------------------------------------
+# 🏗️ Construction (tâche hors ligne)
+# ------------------------------------------------------------
+def table_path(model_set_key: str, directory: str = LOOKUP_DIR) -> str:
+    return os.path.join(directory, model_set_key)
+
+
+def build_table(model_set, years: tuple = LOOKUP_YEARS, surfaces: tuple = LOOKUP_SURFACES,
+                directory: str = LOOKUP_DIR, progress=None, report_rows: int = 2000) -> dict:
+    """
+    Prédit toute la grille avec le jeu de modèles `model_set` et publie la table
+    (dossier renommé d'un bloc). progress(lignes faites, total) est appelé
+    après chaque bloc. Retourne les métadonnées, rapport de précision inclus.
+    """
+    t0 = time.perf_counter()
+    models = model_set.models
+    axes = grid_axes(models, years, surfaces)
+    sizes = [len(axes[col]) for col in FEATURES]
+    total = int(np.prod(sizes))
+    outputs = [out for key, out in MODEL_OUTPUTS.items() if models.get(key) is not None]
+    print(f"[INFO] Table de prédictions : {total:,} lignes ({' x '.join(map(str, sizes))}), sorties {outputs}")
+
+    os.makedirs(directory, exist_ok=True)
+    final = table_path(model_set.key, directory)
+    tmp = f"{final}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    dtypes = {"DPE": np.uint8, "Conso_kWh_m2": np.int32, "MPR": np.int8}
+    arrays = {
+        out: np.lib.format.open_memmap(os.path.join(tmp, f"{out}.npy"), mode="w+", dtype=dtypes[out], shape=(total,))
+        for out in outputs
+    }
+    meta = {
+        "model_set": model_set.key,
+        "versions": model_set.versions,
+        "model_files": {
+            key: {"path": model_set.paths[key], "fingerprint": fingerprint}
+            for key, fingerprint in getattr(model_set, "fingerprints", {}).items()
+        },
+        "features": FEATURES,
+        "axes": axes,
+        "outputs": outputs,
+        "dpe_labels": [],
+        "rows": total,
+        "years": list(years),
+        "surfaces": list(surfaces),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    grid = LookupTable(tmp)
+
+    labels = meta["dpe_labels"]
+    for start in range(0, total, BUILD_CHUNK_ROWS):
+        stop = min(start + BUILD_CHUNK_ROWS, total)
+        preds = predict_frame(grid.grid_frame(np.arange(start, stop)), models)
+        if "DPE" in arrays:
+            uniq, inverse = np.unique(np.asarray(preds["DPE"], dtype=str), return_inverse=True)
+            labels.extend(u for u in uniq.tolist() if u not in labels)
+            arrays["DPE"][start:stop] = np.asarray([labels.index(u) for u in uniq])[inverse]
+        if "Conso_kWh_m2" in arrays:
+            # Valeurs arrondies à 0.01 par predict_frame : stockées exactement en centièmes
+            arrays["Conso_kWh_m2"][start:stop] = np.rint(np.asarray(preds["Conso_kWh_m2"]) * 100)
+        if "MPR" in arrays:
+            arrays["MPR"][start:stop] = preds["MPR"]
+        if progress:
+            progress(stop, total)
+    for array in arrays.values():
+        array.flush()
+    del arrays, grid
+
+    meta.update(built_at=datetime.now().isoformat(timespec="seconds"), build_s=round(time.perf_counter() - t0, 1))
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    report = accuracy_report(LookupTable(tmp), models, report_rows)
+    with open(os.path.join(tmp, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    # Publication : l'ancienne table (même jeu de modèles) est écartée puis supprimée
+    old = f"{final}.{os.getpid()}.old"
+    if os.path.exists(final):
+        os.rename(final, old)
+    os.rename(tmp, final)
+    shutil.rmtree(old, ignore_errors=True)
+    print(f"✅ Table de prédictions publiée : {final} ({meta['build_s']} s)")
+    return {**meta, "report": report}
+
+
+# ------------------------------------------------------------
+# 📏 Rapport de précision (table vs modèles)
+# ------------------------------------------------------------
+def _compare(stored: dict, live: dict) -> dict:
+    """Accord DPE / MPR et écarts absolus CONSO entre deux sorties au format de predict_frame."""
+    def present(key):
+        return len(live[key]) > 0 and stored[key][0] is not None and live[key][0] is not None
+
+    out = {"rows": len(live["DPE"])}
+    for key in ("DPE", "MPR"):
+        if present(key):
+            out[f"{key}_agreement"] = round(float(np.mean(np.asarray(stored[key]) == np.asarray(live[key]))), 4)
+    if present("Conso_kWh_m2"):
+        err = np.abs(np.asarray(stored["Conso_kWh_m2"]) - np.asarray(live["Conso_kWh_m2"]))
+        out["Conso_mae"] = round(float(err.mean()), 3)
+        out["Conso_p95_abs_err"] = round(float(np.percentile(err, 95)), 3)
+        out["Conso_max_abs_err"] = round(float(err.max()), 3)
+    return out
+
+
+def accuracy_report(table: LookupTable, models, rows: int = 2000, departments=None, seed: int = 0) -> dict:
+    """
+    - grid_nodes : noeuds tirés au hasard, table vs modèles (accord attendu : 100 %) ;
+    - dataset : logements réels des partitions `departments` (défaut : servies),
+      part servie exactement par la table et erreur qu'introduirait l'arrondi
+      de l'année / surface au noeud le plus proche.
+    """
+    rng = np.random.default_rng(seed)
+    flat = np.sort(rng.choice(table.rows, min(rows, table.rows), replace=False))
+    report = {
+        "model_set": table.meta["model_set"],
+        "grid_nodes": _compare(table.values(flat), predict_frame(table.grid_frame(flat), models)),
+    }
+
+    try:
+        from api.partitions import load_partitions, served_departments
+
+        real = load_partitions(departments or served_departments(), columns=FEATURES)
+        real = prepare_features(real.sample(min(rows, len(real)), random_state=seed).reset_index(drop=True), models)
+    except Exception as e:
+        report["dataset"] = {"error": str(e)}
+        return report
+    hit, _ = table.locate(real)
+    near, near_flat = table.locate(real, nearest=("annee_construction", "surface_habitable_logement"))
+    report["dataset"] = {
+        "rows": len(real),
+        "exact_hit_rate": round(float(hit.mean()), 4) if len(real) else None,
+        "in_vocabulary_rate": round(float(near.mean()), 4) if len(real) else None,
+        "nearest_node": (
+            _compare(table.values(near_flat[near]), predict_frame(real[near], models)) if near.any() else None
+        ),
+    }
+    return report
+
+
+# ------------------------------------------------------------
+# ⚡ Service : table si présente pour le jeu actif, modèles sinon
+# ------------------------------------------------------------
+class LookupTables:
+    """Table du jeu de modèles actif (rechargée si reconstruite) et compteurs de service."""
+
+    def __init__(self, directory: str = LOOKUP_DIR, enabled: bool = True, check_interval: float = 5.0):
+        self.directory = directory
+        self.enabled = enabled
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._current = (None, None, None)  # (clé du jeu, empreinte de meta.json, table)
+        self._last_check = {}
+        self.counters = {"hits": 0, "misses": 0}
+
+    def get(self, model_set_key: str):
+        """Table construite pour ce jeu de modèles, ou None (vérifiée au plus toutes les check_interval s)."""
+        if not self.enabled:
+            return None
+        key, fingerprint, table = self._current
+        now = time.monotonic()
+        if key == model_set_key and now - self._last_check.get(key, 0) < self.check_interval:
+            return table
+        with self._lock:
+            self._last_check[model_set_key] = now
+            meta = os.path.join(table_path(model_set_key, self.directory), "meta.json")
+            try:
+                st = os.stat(meta)
+                current = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                current = None
+            if key != model_set_key or current != fingerprint:
+                try:
+                    table = LookupTable(os.path.dirname(meta)) if current else None
+                except Exception as e:
+                    print(f"[WARN] Table de prédictions illisible ({e}) : modèles utilisés")
+                    table = None
+                self._current = (model_set_key, current, table)
+            table = self._current[2]
+            changed = table.changed_models() if table is not None else []
+            if changed:
+                # Fichiers réécrits depuis la construction : la table ne correspond plus aux modèles
+                print(f"[WARN] Modèles modifiés depuis la table ({', '.join(changed)}) : table écartée")
+                self._current = (model_set_key, current, None)
+            return self._current[2]
+
+    def predict_rows(self, df: pd.DataFrame, model_set_key: str, live, outputs=OUTPUTS) -> list:
+        """
+        Comme predict_rows : lignes sur la grille lues dans la table, les autres
+        prédites par live(sous-ensemble de df). `outputs` limite les sorties renvoyées.
+        """
+        table = self.get(model_set_key)
+        if table is None or df.empty:
+            return live(df)
+        with stage("lookup"):
+            hit, flat = table.locate(df)
+            stored = table.values(flat[hit])
+        n_hits = int(hit.sum())
+        with self._lock:
+            self.counters["hits"] += n_hits
+            self.counters["misses"] += len(df) - n_hits
+        if not n_hits:
+            return live(df)
+
+        results = [None] * len(df)
+        for j, i in enumerate(np.flatnonzero(hit)):
+            results[i] = {key: stored[key][j] if key in outputs else None for key in OUTPUTS} | {"error": None}
+        missing = np.flatnonzero(~hit)
+        if missing.size:
+            for i, pred in zip(missing, live(df.iloc[missing])):
+                results[i] = pred
+        return results
+
+    def stats(self) -> dict:
+        key, _, table = self._current
+        lookups = self.counters["hits"] + self.counters["misses"]
+        out = {
+            "enabled": self.enabled,
+            "model_set": key,
+            "loaded": table is not None,
+            **self.counters,
+            "hit_rate": round(self.counters["hits"] / lookups, 4) if lookups else None,
+        }
+        if table is not None:
+            out.update(rows=table.rows, size_mb=round(table.nbytes / 2**20, 1), built_at=table.meta.get("built_at"))
+            try:
+                with open(os.path.join(table.path, "report.json"), encoding="utf-8") as f:
+                    out["report"] = json.load(f)
+            except OSError:
+                out["report"] = None
+        return out
+
+
+# ------------------------------------------------------------
+# 🖥️ CLI
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["build", "report"])
+    parser.add_argument("--rows", type=int, default=2000, help="Lignes comparées dans le rapport de précision")
+    args = parser.parse_args()
+
+    from api.config import FOREST_ENGINE, MODELS_MMAP
+    from api.registry import VersionedRegistry
+
+    model_set = VersionedRegistry(mmap=MODELS_MMAP, compiled=FOREST_ENGINE).current()
+    if args.command == "build":
+        result = build_table(model_set, report_rows=args.rows)
+        print(json.dumps(result["report"], ensure_ascii=False, indent=2))
+    else:
+        path = table_path(model_set.key)
+        if not os.path.exists(path):
+            raise SystemExit(f"[❌] Aucune table pour le jeu de modèles {model_set.key} : lancer `build`")
+        print(json.dumps(accuracy_report(LookupTable(path), model_set.models, args.rows), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,21 +2,50 @@
 # 🔌 API Modèles Énergie — main.py (SISE_Enedis)
 # ============================================================
 
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
 import pandas as pd
-import joblib, os
+import os, shutil, tempfile, threading, time
 
-from api.config import MODEL_DPE_PATH, MODEL_CONSO_PATH
-from api.models_loader import load_model
+from api.config import (
+    BATCH_MAX_ROWS, SCORING_CHUNK_ROWS, INFERENCE_WORKERS, INFERENCE_QUEUE_SIZE,
+    MICROBATCH_ENABLED, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS,
+    PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL, MODELS_MMAP, MODEL_WARMUP, MODEL_MANIFEST_PATH,
+    FOREST_ENGINE, LOOKUP_DIR, LOOKUP_ENABLED, PROFILER_ENABLED, PROFILER_INTERVAL_MS,
+)
+from api.registry import VersionedRegistry
 from api.schemas import InputFeatures
-from api.utils import normalize_input
-import requests
+from api.utils import parse_batch_body, etag_response
+from api.inference import FEATURES, OUTPUTS, prepare_features, predict_frame
+from api.partitions import (
+    DEPARTMENT_PATTERN, available_departments, normalize_department, partitions_metadata, served_departments,
+    split_codes,
+)
+from api.batching import MicroBatcher
+from api.cache import PredictionCache, cached_predict_rows
+from api.executor import InferenceExecutor, QueueFullError, limit_model_threads
+from api.ingestion import refresh_partitions
+from api.lookup import MODEL_OUTPUTS, LookupTables, build_table
+from api.normalization import unknown_category_counts
+from api.metrics import METRICS, REQUESTS, REQUEST_LATENCY, SamplingProfiler, stage
+from api.jobs import read_job, start_job
+from api.scoring import MEDIA_TYPES, detect_format, read_columns, stream_scores
+from api.spatial import SpatialIndexes
 
 # ------------------------------------------------------------
 # ⚙️ Initialisation FastAPI
 # ------------------------------------------------------------
+class TimedJSONResponse(JSONResponse):
+    """Réponse JSON dont la sérialisation est chronométrée (étape serialization)."""
+
+    def render(self, content) -> bytes:
+        with stage("serialization"):
+            return super().render(content)
+
 app = FastAPI(
+    default_response_class=TimedJSONResponse,
     title="API Modèles Énergie",
     description=(
         "API pour prédire l’étiquette DPE et la consommation (kWh/m²/an) "
@@ -34,17 +63,118 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Compteur et histogramme de latence par route (gabarit, ex. /jobs/{job_id}) et méthode."""
+    if not METRICS.enabled:
+        return await call_next(request)
+    t0 = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        REQUESTS.inc(path, request.method, str(status_code))
+        REQUEST_LATENCY.observe(path, request.method, value=time.perf_counter() - t0)
+
 # ------------------------------------------------------------
 # 📦 Chargement des modèles et préprocesseur
 # ------------------------------------------------------------
-model_dpe = load_model(MODEL_DPE_PATH)
-model_conso = load_model(MODEL_CONSO_PATH)
+WARMUP_ROW = {
+    "annee_construction": 1990, "surface_habitable_logement": 80.0, "type_batiment": "maison",
+    "type_energie_principale_chauffage": "Électricité", "classe_inertie_batiment": "Moyenne",
+    "qualite_isolation_murs": "moyenne", "qualite_isolation_menuiseries": "moyenne",
+    "classe_altitude": "400-800m", "logement_traversant": "oui",
+}
+
+def _warm_up(models):
+    predict_frame(prepare_features(pd.DataFrame([WARMUP_ROW]), models), models)
+
+# Registre versionné (models/manifest.json) : chargement paresseux en memory-map,
+# bascule à chaud quand le manifest change. Chaque requête utilise le jeu obtenu
+# par REGISTRY.current() jusqu'à sa fin ; chaque modèle prédit sur un seul thread.
+REGISTRY = VersionedRegistry(
+    MODEL_MANIFEST_PATH,
+    mmap=MODELS_MMAP,
+    compiled=FOREST_ENGINE,
+    on_load=lambda model: limit_model_threads({"model": model}),
+    warm_up=_warm_up,
+)
+
+if MODEL_WARMUP:
+    # En arrière-plan : l'API répond dès le démarrage, la 1re requête attend au pire le chargement
+    threading.Thread(
+        target=REGISTRY.current().models.warm_up, args=(_warm_up,), name="models-warmup", daemon=True,
+    ).start()
+
+# ------------------------------------------------------------
+# 🧵 Exécuteur d'inférence (pool borné, 1 thread par predict)
+# ------------------------------------------------------------
+INFERENCE = InferenceExecutor(INFERENCE_WORKERS or None, INFERENCE_QUEUE_SIZE)
+
+@app.exception_handler(QueueFullError)
+async def queue_full_handler(request: Request, exc: QueueFullError):
+    """Contre-pression : file d'inférence pleine -> 429 (réessayer plus tard)."""
+    return JSONResponse(status_code=429, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+# ------------------------------------------------------------
+# 🗃️ Cache des prédictions (clé = variables normalisées)
+# ------------------------------------------------------------
+PREDICTION_CACHE = PredictionCache(
+    PREDICTION_CACHE_SIZE, PREDICTION_CACHE_TTL,
+    model_key=lambda: REGISTRY.current().key,  # vidé à chaque bascule du registre
+)
+
+# Table précalculée (python -m api.lookup build ou POST /lookup/build) : lignes sur la grille servies sans modèle
+LOOKUP = LookupTables(LOOKUP_DIR, enabled=LOOKUP_ENABLED)
+
+def _predict_with(rows: list, keys: tuple = None) -> list:
+    """Prédit (table précalculée, puis cache) sur le jeu de modèles actif ; keys restreint les modèles utilisés."""
+    model_set = REGISTRY.current()
+    models = model_set.models.view(keys) if keys else model_set.models
+    namespace = f"{'-'.join(keys) if keys else 'all'}@{model_set.key}"  # version dans la clé de cache
+    outputs = [out for key, out in MODEL_OUTPUTS.items() if not keys or key in keys]
+
+    def _live(df):
+        return cached_predict_rows(df, models, PREDICTION_CACHE, namespace)
+
+    # Catégories ramenées au vocabulaire des modèles ; valeurs inconnues signalées par ligne
+    df, unknown = prepare_features(pd.DataFrame(rows), models, with_unknown=True)
+    preds = LOOKUP.predict_rows(df, model_set.key, _live, outputs)
+    return [pred | {"unknown_categories": u} for pred, u in zip(preds, unknown)]
+
+# Seuls DPE et CONSO sont renvoyés par /predict_all : MPR n'est ni chargé ni calculé.
+SINGLE_MODELS = ("dpe", "conso", "preproc_conso")
+
+def _predict_one(row: dict) -> dict:
+    # logement_traversant arrive en "oui"/"non" -> converti en 0/1 par prepare_features
+    pred = _predict_with([row], SINGLE_MODELS)[0]
+    if pred["error"]:
+        raise ValueError(pred["error"])
+    return {"DPE": pred["DPE"], "Conso_kWh_m2": pred["Conso_kWh_m2"]}
+
+# ------------------------------------------------------------
+# 📦 Micro-batching des prédictions unitaires (optionnel)
+# ------------------------------------------------------------
+def _predict_many(rows: list) -> list:
+    return _predict_with(rows, SINGLE_MODELS)
 
-PREPROC_PATH = os.path.join(os.path.dirname(MODEL_CONSO_PATH), "preprocessor_conso.pkl")
-preproc_conso = joblib.load(PREPROC_PATH) if os.path.exists(PREPROC_PATH) else None
+BATCHER = (
+    MicroBatcher(_predict_many, INFERENCE.run, MICROBATCH_MAX_SIZE, MICROBATCH_MAX_WAIT_MS, INFERENCE_QUEUE_SIZE)
+    if MICROBATCH_ENABLED else None
+)
 
-DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "data", "donnees_dpe_73_clean.csv")
-DATA_PATH = os.path.abspath(DATA_PATH)
+async def _predict_single(row: dict) -> dict:
+    """Prédiction d'une ligne : regroupée avec les requêtes concurrentes si le micro-batching est actif."""
+    if BATCHER is None:
+        return await INFERENCE.run(_predict_one, row)
+    pred = await BATCHER.submit(row)
+    if pred["error"]:
+        raise ValueError(pred["error"])
+    return {"DPE": pred["DPE"], "Conso_kWh_m2": pred["Conso_kWh_m2"]}
 
 # ------------------------------------------------------------
 # 🧭 Routes générales (GET)
@@ -55,72 +185,233 @@ def root():
     return {"message": "Bienvenue sur l'API Modèles Énergie 🔋"}
 
 @app.get("/status")
-def status():
-    """Vérifie le statut et le chargement des modèles"""
-    return {
+def status(request: Request):
+    """Vérifie le statut et le chargement des modèles (+ résumé du dataset)"""
+    model_set = REGISTRY.current()
+    models = model_set.models
+    payload = {
         "status": "ok",
         "models": {
-            "DPE": model_dpe is not None,
-            "Conso": model_conso is not None,
-            "Preprocessor_CONSO": preproc_conso is not None
-        }
+            "DPE": models.available("dpe"),
+            "Conso": models.available("conso"),
+            "MPR": models.available("mpr"),
+            "Preprocessor_CONSO": models.available("preproc_conso")
+        },
+        "model_versions": model_set.versions,
+        "model_loading": models.stats(),
+        "dataset": None,
+        "inference": INFERENCE.stats(),
+        "batching": BATCHER.stats() if BATCHER else None,
+        "cache": PREDICTION_CACHE.stats(),
+        "lookup": LOOKUP.stats(),
+        "spatial": SPATIAL.stats(),
     }
+    # Compteurs des seuls normaliseurs déjà construits : /status ne charge aucun modèle
+    unknown = unknown_category_counts(models)
+    if unknown is not None:
+        payload["unknown_categories"] = unknown
+    try:
+        meta = partitions_metadata()
+        payload["dataset"] = {
+            key: meta[key] for key in ("source", "departments", "last_update", "rows", "sources", "content_hash")
+        }
+    except Exception as e:
+        payload["dataset"] = {"error": str(e)}
+    return etag_response(request, payload)
 
 @app.get("/last_update")
-def get_last_update():
+def get_last_update(
+    request: Request,
+    departements: str = Query(None, description="Départements (séparés par des virgules, ex. 73,74)"),
+    code_postal: str = Query(None, description="Préfixes de code postal (séparés par des virgules, ex. 731,74)"),
+):
     """
     Retourne la date la plus récente de réception DPE
     (utile pour vérifier les nouvelles données à importer).
+    Servie depuis les métadonnées des seules partitions concernées, avec ETag = hash du contenu.
     """
     try:
-        df = pd.read_csv(DATA_PATH)
-        if "date_reception_dpe" not in df.columns:
+        meta = partitions_metadata(departements, code_postal)
+        if not meta["departments"]:
+            raise HTTPException(status_code=404, detail="Aucune partition ne correspond à la requête.")
+        if meta.get("last_update") is None:
             raise ValueError("Colonne 'date_reception_dpe' absente du dataset")
-        last_date = pd.to_datetime(df["date_reception_dpe"], errors="coerce").max()
-        return {"last_update": str(last_date.date())}
+        return etag_response(request, {"last_update": meta["last_update"]}, etag=meta["content_hash"])
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lecture dataset : {e}")
 
+@app.get("/partitions")
+def list_partitions(request: Request):
+    """Partitions départementales servies (volumétrie, date max) et partitions présentes sur disque."""
+    meta = partitions_metadata()
+    payload = {"served": meta["partitions"], "available": available_departments(), "rows": meta["rows"]}
+    return etag_response(request, payload, etag=meta["content_hash"])
+
+# ------------------------------------------------------------
+# 📍 Requêtes géographiques (index spatial des partitions servies)
+# ------------------------------------------------------------
+# Index construit ou mis à jour à la première requête qui suit un rafraîchissement
+SPATIAL = SpatialIndexes()
+
+def _parse_bbox(bbox: str) -> tuple:
+    try:
+        south, west, north, east = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="bbox attendu : sud,ouest,nord,est (4 nombres).")
+    if not (-90 <= south <= north <= 90 and -180 <= west <= east <= 180):
+        raise HTTPException(status_code=400, detail="bbox invalide (sud <= nord, ouest <= est, en degrés).")
+    return south, west, north, east
+
+@app.get("/geo/distribution")
+def geo_distribution(
+    lat: float = Query(None, ge=-90, le=90, description="Latitude du centre"),
+    lon: float = Query(None, ge=-180, le=180, description="Longitude du centre"),
+    rayon_m: float = Query(2000, gt=0, le=200000, description="Rayon autour du centre (m)"),
+    bbox: str = Query(None, description="Fenêtre sud,ouest,nord,est (à la place de lat / lon)"),
+    departements: str = Query(None, description="Départements (séparés par des virgules, défaut : servis)"),
+):
+    """
+    Effectif, répartition des étiquettes DPE et conso moyenne des logements
+    situés à moins de rayon_m du point (lat, lon), ou dans la fenêtre bbox.
+    """
+    if bbox is None and (lat is None or lon is None):
+        raise HTTPException(status_code=400, detail="Préciser lat et lon, ou bbox.")
+    with stage("spatial"):
+        if bbox is not None:
+            area = _parse_bbox(bbox)
+            result = SPATIAL.distribution(bbox=area, departments=departements)
+            return {"bbox": list(area), **result}
+        result = SPATIAL.distribution(center=(lat, lon), meters=rayon_m, departments=departements)
+    return {"lat": lat, "lon": lon, "rayon_m": rayon_m, **result}
+
+@app.get("/geo/nearest")
+def geo_nearest(
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(10, ge=1, le=1000, description="Nombre de logements"),
+    rayon_max_m: float = Query(None, gt=0, description="Distance max (m)"),
+    departements: str = Query(None, description="Départements (séparés par des virgules, défaut : servis)"),
+):
+    """Les k logements les plus proches du point (coordonnées, étiquette, conso, distance en m)."""
+    with stage("spatial"):
+        results = SPATIAL.nearest(lat, lon, k, rayon_max_m, departments=departements)
+    return {"lat": lat, "lon": lon, "k": k, "results": results}
+
+@app.get("/models")
+def list_models():
+    """
+    Versions des modèles chargés (manifest : version, date d'entraînement, sha256),
+    temps de chargement et empreinte mémoire ; inclut les jeux remplacés encore
+    utilisés par des requêtes en cours.
+    """
+    return REGISTRY.describe()
+
+@app.post("/models/reload")
+def reload_models():
+    """Relit models/manifest.json et bascule à chaud si les versions actives ont changé."""
+    swapped = REGISTRY.reload()
+    return {"swapped": swapped, **REGISTRY.describe()}
+
 # ------------------------------------------------------------
 # 🔮 Prédictions (POST & GET)
 # ------------------------------------------------------------
 @app.post("/predict_all")
-def predict_all(data: InputFeatures):
+async def predict_all(data: InputFeatures):
     """
     Retourne l’étiquette DPE prédite et la consommation estimée (kWh/m²/an).
     """
     try:
-        df = pd.DataFrame([data.dict()])
-        df = normalize_input(df)
-
-        # logement_traversant arrive en "oui"/"non" -> convertir en 0/1 pour les modèles si nécessaire
-        if "logement_traversant" in df.columns:
-            df["logement_traversant"] = df["logement_traversant"].apply(
-                lambda x: 1 if str(x).strip().lower() in ["oui", "true", "1"] else 0
-            )
-
-        # --- DPE ---
-        dpe_pred = model_dpe.predict(df)[0] if model_dpe is not None else None
-
-        # --- Conso ---
-        conso_pred = None
-        if model_conso is not None:
-            if preproc_conso is not None:
-                X_trans = preproc_conso.transform(df)
-                conso_pred = model_conso.predict(X_trans)[0]
-            else:
-                conso_pred = model_conso.predict(df)[0]
-
-        return {
-            "DPE": str(dpe_pred),
-            "Conso_kWh_m2": round(float(conso_pred), 2) if conso_pred is not None else None
-        }
-
+        return await _predict_single(data.dict())
+    except QueueFullError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur lors de la prédiction : {e}")
 
+@app.post("/predict_batch")
+async def predict_batch(request: Request):
+    """
+    Prédiction par lot : tableau JSON ou NDJSON (application/x-ndjson) d'objets InputFeatures.
+    Chaque modèle est appelé une seule fois sur l'ensemble des lignes valides ;
+    les résultats sont renvoyés dans l'ordre d'entrée, avec une erreur par ligne si besoin.
+    """
+    try:
+        items = parse_batch_body(await request.body(), request.headers.get("content-type", ""))
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Corps de requête invalide : {e}")
+
+    if len(items) > BATCH_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"Lot trop volumineux ({len(items)} > {BATCH_MAX_ROWS} lignes)")
+
+    # --- Validation ligne à ligne (les lignes invalides n'arrêtent pas le lot) ---
+    results = [None] * len(items)
+    valid_idx, valid_rows = [], []
+    with stage("validation"):
+        for i, item in enumerate(items):
+            try:
+                valid_rows.append(InputFeatures.model_validate(item).dict())
+                valid_idx.append(i)
+            except ValidationError as e:
+                results[i] = {"index": i} | {key: None for key in OUTPUTS} | {
+                    "error": f"Validation : {e.errors(include_url=False)}", "unknown_categories": None}
+
+    # --- Inférence vectorisée sur toutes les lignes valides ---
+    if valid_rows:
+        def _run():
+            return _predict_with(valid_rows)
+        preds = await INFERENCE.run(_run)
+        for i, pred in zip(valid_idx, preds):
+            results[i] = {"index": i} | pred
+
+    return {
+        "count": len(results),
+        "errors": sum(r["error"] is not None for r in results),
+        "results": results,
+    }
+
+@app.post("/predict_file")
+def predict_file(
+    file: UploadFile = File(...),
+    output_format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    chunk_rows: int = Query(SCORING_CHUNK_ROWS, ge=100, le=500000),
+    keep: str = Query(None, description="Colonnes d'entrée à conserver (séparées par des virgules)"),
+):
+    """
+    Scoring d'un fichier CSV ou Parquet (schéma de donnees_dpe_73_clean.csv).
+    Le fichier est lu par blocs de chunk_rows lignes ; chaque bloc passe dans les
+    modèles DPE, CONSO et MPR puis est renvoyé en flux (CSV ou NDJSON).
+    La mémoire utilisée reste bornée quelle que soit la taille du fichier.
+    """
+    input_format = detect_format(file.filename)
+
+    # Copie sur disque : l'UploadFile est fermé avant la fin du streaming
+    suffix = ".parquet" if input_format == "parquet" else ".csv"
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        tmp_path = tmp.name
+
+    try:
+        columns = read_columns(tmp_path, input_format)
+    except Exception as e:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=400, detail=f"Fichier illisible : {e}")
+
+    keep_cols = [c.strip() for c in keep.split(",")] if keep else None
+    missing = [c for c in FEATURES + (keep_cols or []) if c not in columns]
+    if missing:
+        os.remove(tmp_path)
+        raise HTTPException(status_code=422, detail=f"Colonnes manquantes dans le fichier : {missing}")
+
+    return StreamingResponse(
+        stream_scores(tmp_path, input_format, output_format, REGISTRY.current().models, chunk_rows, keep_cols,
+                      run=INFERENCE.run_blocking),
+        media_type=MEDIA_TYPES[output_format],
+        headers={"Content-Disposition": f"attachment; filename=scores.{output_format}"},
+    )
+
 @app.get("/predict_sample")
-def predict_sample(
+async def predict_sample(
     annee_construction: int = Query(1990),
     surface_habitable_logement: float = Query(80.0),
     type_batiment: str = Query("maison"),
@@ -147,100 +438,111 @@ def predict_sample(
             "zone_climatique": "H1"
         }
 
-        df = pd.DataFrame([sample])
-        df = normalize_input(df)
-        df["logement_traversant"] = 1  # cohérent avec la logique du modèle
-
-        dpe_pred = model_dpe.predict(df)[0]
-        if preproc_conso is not None:
-            X_trans = preproc_conso.transform(df)
-            conso_pred = model_conso.predict(X_trans)[0]
-        else:
-            conso_pred = model_conso.predict(df)[0]
-
-        return {"DPE": str(dpe_pred), "Conso_kWh_m2": round(float(conso_pred), 2)}
+        return await _predict_single(sample)  # logement_traversant "oui" -> 1
+    except QueueFullError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Erreur GET prédiction : {e}")
 
-@app.post("/refresh_data")
-def refresh_data():
+@app.post("/refresh_data", status_code=202)
+def refresh_data(
+    departements: str = Query(None, description="Départements à rafraîchir (défaut : départements servis) ; "
+                                                "une partition absente est créée"),
+):
     """
-    Met à jour le dataset local en récupérant les DPE (existants + neufs)
-    plus récents que la dernière date locale, depuis les APIs ADEME.
+    Lance en tâche de fond la mise à jour des partitions départementales (DPE
+    existants + neufs plus récents que la dernière date locale, depuis les APIs ADEME).
+    Retourne immédiatement l'identifiant de la tâche, à suivre via /jobs/{job_id}.
+    Un seul rafraîchissement à la fois (409 si une tâche est déjà en cours).
     """
-    import pyproj
-
-    if not os.path.exists(DATA_PATH):
+    departments = [normalize_department(d) for d in split_codes(departements)] or served_departments()
+    invalid = [d for d in departments if not DEPARTMENT_PATTERN.match(d)]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Départements invalides : {', '.join(invalid)}")
+    if not departments:
         raise HTTPException(status_code=404, detail="Dataset local introuvable.")
 
-    # --- Lecture dataset local ---
-    try:
-        df_local = pd.read_csv(DATA_PATH)
-        last_date = pd.to_datetime(df_local["date_reception_dpe"], errors="coerce").max()
-        last_date_str = last_date.strftime("%Y-%m-%d")
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur lecture dataset local : {e}")
-
-    st_cols = list(df_local.columns)  # Schéma de référence
-    print(f"[INFO] {len(st_cols)} colonnes attendues dans le dataset final.")
-
-    # --- Paramètres communs API ADEME ---
-    DEPT = "73"
-    PAGE_SIZE = 1200
-    ADEME_ENDPOINTS = {
-        "existants": "https://data.ademe.fr/data-fair/api/v1/datasets/dpe03existant/lines",
-        "neufs": "https://data.ademe.fr/data-fair/api/v1/datasets/dpe02neuf/lines"
-    }
-
-    new_frames = []
-    total_new_rows = 0
-
-    for label, url in ADEME_ENDPOINTS.items():
-        print(f"\n--- Téléchargement {label.upper()} ---")
-        params = {
-            "q": f"{DEPT}*",
-            "q_fields": "code_postal_ban",
-            "qs": f"date_reception_dpe:[{last_date_str} TO *]",
-            "size": PAGE_SIZE,
-            "sort": "date_reception_dpe"
-        }
+    def _refresh(progress):
+        result = refresh_partitions(departments, progress=progress)
+        progress.update(rows_appended=result["new_rows"])
+        return result
+
+    job, running_id = start_job("refresh_data", _refresh, lock="refresh_data")
+    if job is None:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Un rafraîchissement est déjà en cours.", "job_id": running_id},
+        )
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+@app.post("/lookup/build", status_code=202)
+def build_lookup():
+    """
+    Lance en tâche de fond le précalcul des prédictions sur la grille catégorielle
+    (jeu de modèles actif), suivi via /jobs/{job_id}. Rapport de précision dans le résultat.
+    """
+    model_set = REGISTRY.current()
+
+    def _build(progress):
+        result = build_table(model_set, progress=lambda done, total: progress.update(rows_done=done, rows_total=total))
+        return {key: result[key] for key in ("model_set", "rows", "outputs", "build_s", "report")}
+
+    job, running_id = start_job("lookup_build", _build, lock="lookup_build")
+    if job is None:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Une construction de la table est déjà en cours.", "job_id": running_id},
+        )
+    return {"job_id": job["id"], "status": job["status"], "status_url": f"/jobs/{job['id']}"}
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    """
+    État d'une tâche de fond : status (queued / running / done / failed),
+    progression (pages, lignes reçues / attendues / ajoutées, ETA en secondes)
+    et résultat final.
+    """
+    job = read_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Tâche inconnue.")
+    return job
 
-        try:
-            r = requests.get(url, params=params, timeout=120)
-            r.raise_for_status()
-            data = r.json()
-            results = data.get("results", [])
-            if not results:
-                print(f"[INFO] Aucun nouveau DPE pour {label}")
-                continue
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Erreur API ADEME ({label}) : {e}")
-
-        df_new = pd.DataFrame(results)
-        df_new["Logement"] = "Ancien" if label == "existants" else "Neuf"
-        total_new_rows += len(df_new)
-
-        # --- Harmonisation des colonnes ---
-        # Garde uniquement les colonnes déjà présentes dans le dataset local
-        df_new = df_new.reindex(columns=st_cols, fill_value=pd.NA)
-        new_frames.append(df_new)
-        print(f"[INFO] {len(df_new)} nouvelles lignes récupérées pour {label}.")
-
-    # --- Vérification ---
-    if not new_frames:
-        return {"status": "no_update", "message": "Aucune donnée nouvelle détectée."}
-
-    df_new_all = pd.concat(new_frames, ignore_index=True)
-
-    # --- Fusion & Sauvegarde ---
-    df_final = pd.concat([df_local, df_new_all], ignore_index=True)
-    df_final.to_csv(DATA_PATH, index=False)
+# ------------------------------------------------------------
+# 📈 Métriques et profilage
+# ------------------------------------------------------------
+@METRICS.collector
+def _runtime_metrics():
+    """Jauges lues dans les stats existantes (exécuteur, micro-batching, cache, table précalculée)."""
+    families = []
+    sources = {"inference": INFERENCE.stats(), "batching": BATCHER.stats() if BATCHER else {},
+               "cache": PREDICTION_CACHE.stats(), "lookup": LOOKUP.stats()}
+    for prefix, stats in sources.items():
+        for key, value in stats.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                families.append((f"api_{prefix}_{key}", "gauge", f"{prefix} : {key}", [({}, value)]))
+    return families
+
+PROFILER = SamplingProfiler(PROFILER_INTERVAL_MS / 1000) if PROFILER_ENABLED else None
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Métriques au format texte Prometheus (requêtes, étapes de prédiction, chargements)."""
+    return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/profile", response_class=PlainTextResponse)
+def debug_profile(seconds: float = Query(10.0, gt=0, le=120)):
+    """
+    Profil échantillonné de tous les threads pendant `seconds` (PROFILER_ENABLED=1),
+    au format "collapsed" (flamegraph.pl, speedscope). À lancer pendant un test de charge.
+    """
+    if PROFILER is None:
+        raise HTTPException(status_code=404, detail="Profileur désactivé (PROFILER_ENABLED=1 pour l'activer).")
+    try:
+        result = PROFILER.profile(seconds)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return PlainTextResponse(SamplingProfiler.collapsed(result), headers={"X-Samples": str(result["samples"])})
 
-    return {
-        "status": "ok",
-        "new_rows": int(total_new_rows),
-        "updated_until": str(df_final["date_reception_dpe"].max())[:10]
-    }
 # ------------------------------------------------------------
 # 🚀 Run local
 # ------------------------------------------------------------
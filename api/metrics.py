@@ -0,0 +1,235 @@
+# ============================================================
+# 📈 Métriques (format texte Prometheus) et profileur échantillonné
+# ============================================================
+"""
+Registre de métriques en mémoire, exposé par GET /metrics au format texte
+Prometheus 0.0.4 (sans dépendance : compteurs, jauges et histogrammes).
+
+- api_requests_total / api_request_duration_seconds : par route et méthode ;
+- api_stage_duration_seconds : étapes d'une prédiction (validation,
+  normalisation, prétraitement, predict de chaque modèle, table
+  précalculée, sérialisation) ;
+- api_model_load_seconds, api_dataset_read_seconds : chargements.
+
+Les modules instrumentent leur code avec `with stage("preprocess"): ...`.
+Le profileur échantillonné (PROFILER_ENABLED=1) relève les piles de tous
+les threads à intervalle fixe et les agrège au format "collapsed"
+(flamegraph.pl, speedscope).
+"""
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+from api.config import METRICS_ENABLED
+
+# Bornes (s) des histogrammes de latence
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _header(self) -> list:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, *labels, value: float):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, *labels, value: float):
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def render(self) -> list:
+        with self._lock:
+            items = sorted((k, ([*v[0]], v[1], v[2])) for k, v in self._values.items())
+        lines = self._header()
+        for labels, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                le = f'le="{_number(float(bound))}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}")
+            inf = 'le="+Inf"'
+            lines.append(f"{self.name}_bucket{_labels(self.label_names, labels, inf)} {count}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Métriques déclarées + collecteurs appelés au rendu (jauges lues dans les stats existantes)."""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._metrics = []
+        self._collectors = []
+
+    def _add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labels=()) -> Counter:
+        return self._add(Counter(name, help_text, labels))
+
+    def gauge(self, name, help_text, labels=()) -> Gauge:
+        return self._add(Gauge(name, help_text, labels))
+
+    def histogram(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help_text, labels, buckets))
+
+    def collector(self, fn):
+        """fn() -> [(nom, type, aide, [(dict labels, valeur)])] ; erreurs ignorées au rendu."""
+        self._collectors.append(fn)
+        return fn
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines += metric.render()
+        for fn in self._collectors:
+            try:
+                families = fn()
+            except Exception as e:
+                print(f"[WARN] Collecteur de métriques en échec : {e}")
+                continue
+            for name, kind, help_text, samples in families:
+                lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+                for labels, value in samples:
+                    if value is not None:
+                        lines.append(f"{name}{_labels(tuple(labels), tuple(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ------------------------------------------------------------
+# 📊 Registre global et métriques de l'API
+# ------------------------------------------------------------
+METRICS = MetricsRegistry(enabled=METRICS_ENABLED)
+
+REQUESTS = METRICS.counter("api_requests_total", "Requêtes HTTP traitées", ("route", "method", "status"))
+REQUEST_LATENCY = METRICS.histogram(
+    "api_request_duration_seconds", "Durée des requêtes HTTP (s)", ("route", "method"))
+STAGE_LATENCY = METRICS.histogram(
+    "api_stage_duration_seconds", "Durée des étapes de prédiction (s)", ("stage",))
+MODEL_LOAD = METRICS.gauge("api_model_load_seconds", "Durée du dernier chargement de chaque modèle (s)", ("model",))
+DATASET_READ = METRICS.histogram(
+    "api_dataset_read_seconds", "Durée des lectures du dataset (s)", ("operation",))
+
+
+@contextmanager
+def stage(name: str, histogram: Histogram = STAGE_LATENCY):
+    """Chronomètre le bloc et l'enregistre dans `histogram` sous l'étiquette name."""
+    if not METRICS.enabled:
+        yield
+        return
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        histogram.observe(name, value=time.perf_counter() - t0)
+
+
+# ------------------------------------------------------------
+# 🔬 Profileur échantillonné (opt-in)
+# ------------------------------------------------------------
+class SamplingProfiler:
+    """
+    Relève toutes les `interval` s la pile de chaque thread (hors le sien) et
+    compte les piles identiques. Coût nul hors fenêtre de profilage.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def _stack(self, frame) -> str:
+        names = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{frame.f_lineno})")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def profile(self, seconds: float) -> dict:
+        """Échantillonne pendant `seconds` ; un seul profilage à la fois (ValueError sinon)."""
+        if not self._lock.acquire(blocking=False):
+            raise ValueError("Un profilage est déjà en cours")
+        try:
+            me = threading.get_ident()
+            counts, samples = {}, 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for ident, frame in sys._current_frames().items():
+                    if ident != me:
+                        key = self._stack(frame)
+                        counts[key] = counts.get(key, 0) + 1
+                samples += 1
+                time.sleep(self.interval)
+            return {"samples": samples, "stacks": counts}
+        finally:
+            self._lock.release()
+
+    @staticmethod
+    def collapsed(result: dict) -> str:
+        """Format "pile;appelée N" trié par fréquence (flamegraph.pl / speedscope)."""
+        items = sorted(result["stacks"].items(), key=lambda kv: -kv[1])
+        return "\n".join(f"{stack} {n}" for stack, n in items) + "\n"
@@ -1,6 +1,15 @@
+import glob
 import os
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+
 import joblib
 
+from api.config import MODELS_CACHE_DIR
+from api.metrics import MODEL_LOAD
+
 def load_model(path: str):
     """Charge un modèle depuis le chemin spécifié."""
     if not os.path.exists(path):
@@ -13,3 +22,217 @@ def load_model(path: str):
     except Exception as e:
         print(f"[❌] Erreur chargement modèle {path}: {e}")
         return None
+
+
+def process_rss_mb() -> float:
+    """Mémoire résidente du processus (Mo), ou None si non mesurable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss / 2**20
+    except ImportError:
+        return None
+
+
+def mmap_copy_path(path: str) -> str:
+    """Copie non compressée d'un modèle, nommée d'après l'empreinte du .pkl source."""
+    st = os.stat(path)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return os.path.join(MODELS_CACHE_DIR, f"{stem}.{st.st_size}-{st.st_mtime_ns}.joblib")
+
+
+_copy_lock = threading.Lock()
+
+
+def _write_copy(path: str, copy: str):
+    """
+    Écrit la copie non compressée. Une copie publiée n'est jamais réécrite :
+    joblib rouvre le fichier par son nom pour chaque tableau mappé, un
+    remplacement pendant une lecture mélangerait deux fichiers. Le premier
+    processus qui publie (os.link, échoue si la copie existe) l'emporte.
+    """
+    model = joblib.load(path)
+    os.makedirs(MODELS_CACHE_DIR, exist_ok=True)
+    tmp = f"{copy}.{os.getpid()}.tmp"
+    joblib.dump(model, tmp)  # sans compression : mappable
+    try:
+        os.link(tmp, copy)
+        print(f"✅ Copie mappable créée : {os.path.basename(copy)}")
+    except FileExistsError:
+        pass  # publiée entre-temps par un autre processus
+    finally:
+        os.remove(tmp)
+
+    # Anciennes copies du même modèle (fichier source remplacé) et artefacts dérivés
+    stem = os.path.splitext(os.path.basename(path))[0]
+    current = os.path.basename(copy)[: -len(".joblib")] + "."
+    for old in glob.glob(os.path.join(MODELS_CACHE_DIR, glob.escape(stem) + ".*")):
+        if os.path.basename(old).startswith(current) or old.endswith(".tmp"):
+            continue
+        try:
+            if os.path.isdir(old):
+                shutil.rmtree(old)
+            else:
+                os.remove(old)
+        except OSError:
+            pass  # encore ouverte ailleurs (Windows) : supprimée plus tard
+
+
+def load_model_mmap(path: str):
+    """
+    Charge un modèle en memory-map (mmap_mode="r"). Les .pkl compressés ne
+    pouvant pas être mappés, une copie non compressée est écrite une fois
+    dans MODELS_CACHE_DIR puis réutilisée par tous les processus : plus de
+    décompression au démarrage, tableaux numpy partagés via le cache disque.
+    """
+    if not os.path.exists(path):
+        print(f"[⚠️] Modèle introuvable : {path}")
+        return None
+    try:
+        copy = mmap_copy_path(path)
+        with _copy_lock:
+            if not os.path.exists(copy):
+                _write_copy(path, copy)
+        model = joblib.load(copy, mmap_mode="r")
+        print(f"✅ Modèle chargé (mmap) : {os.path.basename(path)}")
+        return model
+    except Exception as e:
+        print(f"[❌] Erreur chargement modèle {path}: {e}")
+        return None
+
+
+def load_model_compiled(path: str):
+    """
+    Forêt compilée (api.forest) si le modèle s'y prête : relue depuis le cache
+    disque si elle existe (sans charger les arbres sklearn), sinon compilée,
+    vérifiée et enregistrée. Retombe sur le modèle sklearn (mmap) sinon.
+    """
+    from api.forest import compile_and_save, load_compiled
+
+    if not os.path.exists(path):
+        print(f"[⚠️] Modèle introuvable : {path}")
+        return None
+    copy = mmap_copy_path(path)
+    try:
+        compiled = load_compiled(copy)
+        if compiled is not None:
+            print(f"✅ Modèle chargé (forêt compilée) : {os.path.basename(path)}")
+            return compiled
+    except Exception as e:
+        print(f"[WARN] Forêt compilée illisible pour {os.path.basename(path)} : {e}")
+    model = load_model_mmap(path)
+    if model is None:
+        return None
+    with _copy_lock:
+        compiled = compile_and_save(model, copy)
+    return compiled if compiled is not None else model
+
+
+class ModelRegistry(Mapping):
+    """
+    Registre de modèles chargés à la demande : registry["dpe"] charge le
+    modèle au premier accès (une seule fois, même sous accès concurrents),
+    puis le garde en mémoire. `on_load(model)` est appelé après chargement ;
+    compiled=True sert les forêts via le moteur compilé (api.forest).
+    """
+
+    def __init__(self, paths: dict, mmap: bool = True, on_load=None, compiled: bool = False):
+        self.paths = dict(paths)
+        self.mmap = mmap
+        self.compiled = compiled
+        self.on_load = on_load
+        self._models = {}
+        self._info = {}
+        self._locks = {key: threading.Lock() for key in self.paths}
+
+    def __getitem__(self, key):
+        if key not in self.paths:
+            raise KeyError(key)
+        if key not in self._models:
+            with self._locks[key]:
+                if key not in self._models:
+                    self._load(key)
+        return self._models[key]
+
+    def __iter__(self):
+        return iter(self.paths)
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _load(self, key: str):
+        path = self.paths[key]
+        rss_before = process_rss_mb()
+        t0 = time.perf_counter()
+        if self.compiled:
+            model = load_model_compiled(path)
+        else:
+            model = load_model_mmap(path) if self.mmap else load_model(path)
+        if model is not None and self.on_load:
+            self.on_load(model)
+        rss_after = process_rss_mb()
+        MODEL_LOAD.set(key, value=time.perf_counter() - t0)
+        self._info[key] = {
+            "load_s": round(time.perf_counter() - t0, 3),
+            "rss_delta_mb": round(rss_after - rss_before, 1) if rss_before is not None else None,
+            "mmap": self.mmap,
+            "engine": type(model).__name__ if model is not None else None,
+        }
+        self._models[key] = model
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self._models
+
+    def available(self, key: str) -> bool:
+        """Modèle chargé avec succès, ou fichier présent (pas encore chargé)."""
+        if key in self._models:
+            return self._models[key] is not None
+        return os.path.exists(self.paths[key])
+
+    def view(self, keys) -> Mapping:
+        """Sous-ensemble paresseux du registre (mêmes instances de modèles)."""
+        registry = self
+
+        class _View(Mapping):
+            base = registry
+
+            def __getitem__(self, key):
+                if key not in keys:
+                    raise KeyError(key)
+                return registry[key]
+
+            def __iter__(self):
+                return iter(keys)
+
+            def __len__(self):
+                return len(keys)
+
+        return _View()
+
+    def warm_up(self, predict=None):
+        """Charge tous les modèles puis exécute predict(self) (premier appel à froid)."""
+        t0 = time.perf_counter()
+        for key in self.paths:
+            self[key]
+        if predict is not None:
+            try:
+                predict(self)
+            except Exception as e:
+                print(f"[WARN] Warm-up : prédiction échouée ({e})")
+        print(f"[INFO] Warm-up des modèles terminé ({time.perf_counter() - t0:.2f} s).")
+
+    def stats(self) -> dict:
+        """Par modèle : chargé ou non, temps de chargement, mémoire résidente ajoutée."""
+        out = {"process_rss_mb": round(process_rss_mb() or 0, 1) or None}
+        for key, path in self.paths.items():
+            out[key] = {
+                "file": os.path.basename(path),
+                "loaded": self.is_loaded(key) and self._models[key] is not None,
+                **self._info.get(key, {}),
+            }
+        return out
@@ -0,0 +1,173 @@
+# ============================================================
+# 🔤 Normalisation des entrées (vocabulaire des modèles)
+# ============================================================
+"""
+Aligne les valeurs catégorielles reçues sur les catégories exactes vues à
+l'entraînement : "MAISON", "Electricite", "400–800m" ou "bois - bûches"
+deviennent "maison", "Électricité", "400-800m", "Bois – Bûches".
+
+Le vocabulaire est lu dans les encodeurs ajustés des modèles (DPE, MPR,
+préprocesseur CONSO). Pour chaque colonne, deux dictionnaires sont
+précalculés une fois : valeur exacte -> catégorie, puis forme "pliée"
+(casse, accents, tirets, apostrophes, espaces) -> catégorie. Un lot est
+normalisé par colonne sur ses valeurs distinctes (pd.factorize), avec une
+recherche en O(1) par valeur. Les valeurs absentes du vocabulaire sont
+conservées (après strip) et signalées ligne par ligne.
+"""
+import threading
+import unicodedata
+import weakref
+
+import numpy as np
+import pandas as pd
+
+# Modèles dont les encodeurs définissent le vocabulaire
+VOCABULARY_MODELS = ("dpe", "mpr", "preproc_conso")
+
+# Tirets, apostrophes et espaces typographiques -> forme ASCII
+_TYPOGRAPHY = str.maketrans({
+    "\u2013": "-", "\u2014": "-", "\u2011": "-", "\u2010": "-", "\u2212": "-",
+    "\u2019": "'", "\u2018": "'", "`": "'", "\u00a0": " ", "\u202f": " ",
+})
+
+
+def fold(value: str) -> str:
+    """Forme de comparaison : sans accents ni casse, tirets / apostrophes unifiés, espaces réduits."""
+    value = unicodedata.normalize("NFKD", value.translate(_TYPOGRAPHY))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return " ".join(value.lower().replace(" - ", "-").split())
+
+
+def encoder_vocabulary(obj) -> dict:
+    """{colonne: catégories} lues dans les encodeurs ajustés (OneHotEncoder, OrdinalEncoder...) d'un modèle."""
+    vocab = {}
+
+    def walk(node, columns):
+        if hasattr(node, "transformers_"):
+            for _, trans, cols in node.transformers_:
+                cols = [cols] if isinstance(cols, str) else cols
+                if not isinstance(trans, str) and all(isinstance(c, str) for c in cols):
+                    walk(trans, list(cols))
+        elif hasattr(node, "named_steps"):
+            for step in node.named_steps.values():
+                walk(step, columns)
+        elif hasattr(node, "categories_") and columns:
+            for col, cats in zip(columns, node.categories_):
+                vocab.setdefault(col, set()).update(c for c in cats if isinstance(c, str))
+
+    walk(obj, None)
+    return vocab
+
+
+def models_vocabulary(models) -> dict:
+    """Union des vocabulaires des modèles DPE, MPR et du préprocesseur CONSO : {colonne: catégories triées}."""
+    vocab = {}
+    for key in VOCABULARY_MODELS:
+        model = models.get(key) if models is not None else None
+        if model is not None:
+            for col, cats in encoder_vocabulary(model).items():
+                vocab.setdefault(col, set()).update(cats)
+    return {col: sorted(cats) for col, cats in vocab.items()}
+
+
+class Normalizer:
+    """Dictionnaires canoniques précalculés pour un vocabulaire {colonne: catégories}."""
+
+    def __init__(self, vocabulary: dict):
+        self.vocabulary = vocabulary
+        self._exact = {col: {cat: cat for cat in cats} for col, cats in vocabulary.items()}
+        self._folded = {}
+        for col, cats in vocabulary.items():
+            folded, ambiguous = {}, set()
+            for cat in cats:
+                key = fold(cat)
+                if key in folded and folded[key] != cat:
+                    ambiguous.add(key)  # deux catégories de même forme pliée : correspondance exacte exigée
+                folded[key] = cat
+            self._folded[col] = {k: v for k, v in folded.items() if k not in ambiguous}
+        self._lock = threading.Lock()
+        self.unknown_counts = {}
+
+    def canonical(self, col: str, value):
+        """Catégorie attendue pour value (chaîne), ou None si inconnue."""
+        match = self._exact[col].get(value)
+        if match is None:
+            match = self._folded[col].get(fold(value))
+        return match
+
+    def apply(self, df: pd.DataFrame) -> tuple:
+        """
+        (df normalisé, inconnues) : chaque colonne texte est nettoyée (strip) et,
+        si elle a un vocabulaire, ramenée à ses catégories. `inconnues` donne,
+        pour chaque ligne, {colonne: valeur reçue} hors vocabulaire, ou None.
+        """
+        unknown = [None] * len(df)
+        for col in df.columns:
+            series = df[col]
+            if series.dtype != object:
+                continue
+            codes, uniques = pd.factorize(series, use_na_sentinel=True)
+            if not len(uniques):
+                continue
+            values = [v.strip() if isinstance(v, str) else v for v in uniques]
+            if col in self._exact:
+                mapped = [self.canonical(col, v) if isinstance(v, str) else v for v in values]
+                missing = np.asarray([m is None for m in mapped])
+                values = [v if m is None else m for v, m in zip(values, mapped)]
+                rows = np.flatnonzero(missing[codes] & (codes >= 0)) if missing.any() else ()
+                for i in rows:
+                    unknown[i] = (unknown[i] or {}) | {col: uniques[codes[i]]}
+                if len(rows):
+                    with self._lock:
+                        self.unknown_counts[col] = self.unknown_counts.get(col, 0) + len(rows)
+            lookup = np.empty(len(values), dtype=object)
+            lookup[:] = values
+            df[col] = np.where(codes >= 0, lookup[np.maximum(codes, 0)], series.to_numpy(dtype=object))
+        return df, unknown
+
+
+# ------------------------------------------------------------
+# 🔗 Normaliseur d'un jeu de modèles
+# ------------------------------------------------------------
+_NORMALIZERS = {}  # (id(registre), clés de la vue ou None) -> Normalizer, retiré quand le registre est libéré
+
+
+def _cache_key(models) -> tuple:
+    """(registre complet, clé de cache) : une vue du registre a son propre vocabulaire (ses seuls modèles)."""
+    base = getattr(models, "base", models)  # vue d'un registre -> registre complet
+    return base, (id(base), tuple(models) if base is not models else None)
+
+
+def normalizer_for(models) -> Normalizer:
+    """
+    Normaliseur construit depuis les encodeurs de `models` (une fois par jeu
+    de modèles ou vue ; seuls les modèles de la vue sont chargés). Sans
+    modèles : nettoyage (strip) seulement.
+    """
+    if models is None:
+        return Normalizer({})
+    base, key = _cache_key(models)
+    normalizer = _NORMALIZERS.get(key)
+    if normalizer is None:
+        normalizer = Normalizer(models_vocabulary(models))
+        try:
+            weakref.finalize(base, _NORMALIZERS.pop, key, None)
+        except TypeError:  # dict simple : non référençable faiblement, pas de cache
+            return normalizer
+        _NORMALIZERS[key] = normalizer
+    return normalizer
+
+
+def unknown_category_counts(models):
+    """
+    Valeurs hors vocabulaire par colonne, cumulées sur les normaliseurs déjà
+    construits du jeu de modèles (registre et vues) ; None si aucun ne l'est.
+    """
+    base_id = _cache_key(models)[1][0]
+    counts, found = {}, False
+    for (registry_id, _), normalizer in list(_NORMALIZERS.items()):
+        if registry_id == base_id:
+            found = True
+            for col, n in normalizer.unknown_counts.items():
+                counts[col] = counts.get(col, 0) + n
+    return counts if found else None
@@ -0,0 +1,186 @@
+# ============================================================
+# 🗂️ Partitions départementales du dataset DPE
+# ============================================================
+"""
+Le dataset est découpé par département : chaque partition est un dataset
+autonome (CSV source, store Arrow, segments incrémentaux et métadonnées, cf.
+api.datastore) nommé donnees_dpe_<dept>_clean.csv, rangé dans
+PARTITIONS_DIR. L'emplacement historique data/donnees_dpe_73_clean.csv reste
+reconnu comme partition du 73 tant que la partition n'a pas été déplacée.
+
+Une requête (départements et/ou préfixes de code_postal_ban) est routée vers
+les seules partitions concernées : un processus ne charge jamais que les
+départements qu'il sert (DEPARTMENTS), et parmi eux ceux que la requête
+touche. Les colonnes sont lues à la demande (memory-map), et les
+métadonnées agrégées sans lire les données.
+"""
+import hashlib
+import os
+import re
+
+import pandas as pd
+
+from api.config import DATA_DIR, DEPARTMENTS, PARTITIONS_DIR
+from api.datastore import dataset_version, load_dataset, pa, read_metadata, read_table
+
+POSTCODE_COLUMN = "code_postal_ban"
+DEPARTMENT_PATTERN = re.compile(r"^(\d{2,3}|2[AB])$")
+FILE_PATTERN = re.compile(r"^donnees_dpe_(\d{2,3}|2[AB])_clean\.csv$")
+
+# Préfixes de codes postaux des départements qui ne suivent pas la règle "2 premiers chiffres"
+POSTAL_PREFIXES = {"2A": ("200", "201"), "2B": ("202", "203", "204", "205", "206")}
+
+
+def normalize_department(code) -> str:
+    """'1' -> '01', '2a' -> '2A', '971' -> '971'."""
+    code = str(code).strip().upper()
+    return code.zfill(2) if code.isdigit() and len(code) < 2 else code
+
+
+def department_of(postcode) -> str:
+    """Département d'un code postal (Corse : 2A / 2B, outre-mer : 3 chiffres)."""
+    cp = str(postcode).strip().split(".")[0].zfill(5)
+    if cp.startswith("20"):
+        return "2A" if cp[:3] in POSTAL_PREFIXES["2A"] else "2B"
+    return cp[:3] if cp.startswith("97") else cp[:2]
+
+
+def postal_prefixes(dept: str) -> tuple:
+    return POSTAL_PREFIXES.get(dept, (dept,))
+
+
+def partition_file(dept: str) -> str:
+    return f"donnees_dpe_{dept}_clean.csv"
+
+
+def partition_path(dept: str, create: bool = False) -> str:
+    """
+    CSV source de la partition. L'emplacement historique (data/) est utilisé
+    s'il existe et que la partition n'a pas été créée dans PARTITIONS_DIR ;
+    create=True renvoie toujours le chemin dans PARTITIONS_DIR.
+    """
+    dept = normalize_department(dept)
+    path = os.path.join(PARTITIONS_DIR, partition_file(dept))
+    legacy = os.path.join(DATA_DIR, partition_file(dept))
+    if not create and not os.path.exists(path) and os.path.exists(legacy):
+        return legacy
+    return path
+
+
+def available_departments() -> list:
+    """Départements dont la partition existe (PARTITIONS_DIR ou emplacement historique)."""
+    found = set()
+    for directory in (PARTITIONS_DIR, DATA_DIR):
+        if os.path.isdir(directory):
+            found.update(m.group(1) for m in map(FILE_PATTERN.match, os.listdir(directory)) if m)
+    return sorted(found)
+
+
+def served_departments() -> list:
+    """Partitions servies par ce processus (DEPARTMENTS, "*" = toutes celles présentes)."""
+    available = available_departments()
+    if "*" in DEPARTMENTS:
+        return available
+    return [d for d in map(normalize_department, DEPARTMENTS) if d in available]
+
+
+def split_codes(value) -> list:
+    """'73, 74' ou ['73', '74'] -> ['73', '74'] (None ou vide -> [])."""
+    if value is None:
+        return []
+    items = value.split(",") if isinstance(value, str) else value
+    return [str(v).strip() for v in items if str(v).strip()]
+
+
+def route(departments=None, postcodes=None, candidates: list = None) -> list:
+    """
+    Départements à lire pour une requête : parmi `candidates` (défaut :
+    partitions servies), ceux demandés explicitement et/ou dont les codes
+    postaux peuvent commencer par l'un des préfixes `postcodes`.
+    """
+    selected = served_departments() if candidates is None else list(candidates)
+    departments = [normalize_department(d) for d in split_codes(departments)]
+    if departments:
+        selected = [d for d in selected if d in departments]
+    prefixes = split_codes(postcodes)
+    if prefixes:
+        selected = [
+            d for d in selected
+            if any(pp.startswith(p) or p.startswith(pp) for p in prefixes for pp in postal_prefixes(d))
+        ]
+    return selected
+
+
+def _postcode_strings(values) -> pd.Series:
+    """Codes postaux en texte sur 5 caractères (lus comme entiers depuis le CSV : 1000 -> "01000")."""
+    return pd.Series(values).astype(str).str.split(".").str[0].str.zfill(5)
+
+
+def _filter_postcodes(df: pd.DataFrame, prefixes: list) -> pd.DataFrame:
+    """Lignes dont code_postal_ban commence par l'un des préfixes (testé sur les modalités distinctes)."""
+    codes = df[POSTCODE_COLUMN]
+    if isinstance(codes.dtype, pd.CategoricalDtype):
+        keep = _postcode_strings(codes.cat.categories).str.startswith(tuple(prefixes)).to_numpy()
+        idx = codes.cat.codes.to_numpy()
+        mask = (idx >= 0) & keep[idx]
+    else:
+        mask = (codes.notna() & _postcode_strings(codes).str.startswith(tuple(prefixes))).to_numpy()
+    return df[mask].reset_index(drop=True)
+
+
+def load_partitions(departments=None, postcodes=None, columns: list = None) -> pd.DataFrame:
+    """
+    DataFrame des seules partitions concernées par la requête (cf. route),
+    restreint aux colonnes demandées puis aux codes postaux demandés.
+    """
+    depts = route(departments, postcodes)
+    prefixes = split_codes(postcodes)
+    read_cols = columns
+    if columns is not None and prefixes and POSTCODE_COLUMN not in columns:
+        read_cols = list(columns) + [POSTCODE_COLUMN]
+    if not depts:
+        return pd.DataFrame(columns=columns or [])
+
+    if pa is None:
+        frames = [load_dataset(partition_path(d), read_cols) for d in depts]
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+    else:
+        tables = [read_table(partition_path(d), read_cols) for d in depts]
+        # Partitions au schéma légèrement différent (colonne absente, type élargi) : promotion permissive
+        table = tables[0] if len(tables) == 1 else pa.concat_tables(tables, promote_options="permissive")
+        df = table.to_pandas()
+
+    if prefixes and POSTCODE_COLUMN in df.columns:
+        df = _filter_postcodes(df, prefixes)
+    if read_cols is not columns:
+        df = df.drop(columns=[POSTCODE_COLUMN])
+    return df
+
+
+def partitions_version(departments=None, postcodes=None) -> tuple:
+    """Versions O(1) des partitions concernées (clé de cache côté Streamlit)."""
+    return tuple((d, dataset_version(partition_path(d))) for d in route(departments, postcodes))
+
+
+def partitions_metadata(departments=None, postcodes=None) -> dict:
+    """
+    Métadonnées agrégées des partitions concernées, sans lire les données :
+    volumétrie, date max, effectifs par source, hash combiné et détail par département.
+    """
+    depts = route(departments, postcodes)
+    metas = {d: read_metadata(partition_path(d)) for d in depts}
+    dates = [m["last_update"] for m in metas.values() if m.get("last_update")]
+    sources = {}
+    for meta in metas.values():
+        for source, count in meta.get("sources", {}).items():
+            sources[source] = sources.get(source, 0) + count
+    combined = hashlib.sha256("".join(f"{d}:{m.get('content_hash')}" for d, m in metas.items()).encode())
+    return {
+        "source": ", ".join(m["source"] for m in metas.values()),
+        "departments": depts,
+        "last_update": max(dates) if dates else None,
+        "rows": sum(m["rows"] for m in metas.values()),
+        "sources": sources,
+        "content_hash": combined.hexdigest(),
+        "partitions": {d: {"rows": m["rows"], "last_update": m.get("last_update")} for d, m in metas.items()},
+    }
@@ -0,0 +1,298 @@
+# ============================================================
+# 🗂️ Registre versionné des modèles (manifest + hot-swap)
+# ============================================================
+"""
+Source unique des modèles utilisés par l'API et l'application Streamlit.
+
+models/manifest.json décrit, pour chaque modèle (dpe, conso, mpr,
+preproc_conso), ses versions (fichier, variables attendues, date
+d'entraînement, sha256) et la version active. Sans manifest, les chemins de
+api/config.py servent de version unique ("config") : l'empreinte du fichier
+(taille + date de modification) entre alors dans la clé du jeu, si bien qu'un
+modèle réentraîné et écrasé sur place est aussi rechargé à chaud.
+
+Changer la version active (CLI ci-dessous) est pris en compte sans
+redémarrage : le nouveau jeu de modèles est chargé et vérifié en arrière-plan
+puis substitué d'un bloc. Les requêtes en cours terminent sur l'ancien jeu,
+qu'elles ont obtenu via current().
+
+Usage (depuis la racine du projet) :
+    python -m api.registry init
+    python -m api.registry register dpe models/model_DPE_latest.pkl --version 2025-10 --trained-at 2025-10-01
+    python -m api.registry activate dpe 2025-10
+    python -m api.registry list
+"""
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from api.config import (
+    MODEL_CONSO_PATH, MODEL_DPE_PATH, MODEL_MANIFEST_PATH, MODEL_MPR_PATH, PREPROC_CONSO_PATH,
+)
+from api.datastore import file_sha256, source_fingerprint
+from api.models_loader import ModelRegistry, mmap_copy_path
+
+# Modèles gérés et fichier par défaut (sans manifest)
+DEFAULT_PATHS = {
+    "dpe": MODEL_DPE_PATH,
+    "conso": MODEL_CONSO_PATH,
+    "mpr": MODEL_MPR_PATH,
+    "preproc_conso": PREPROC_CONSO_PATH,
+}
+
+
+def _mtime_iso(path: str) -> str:
+    return datetime.fromtimestamp(os.path.getmtime(path)).isoformat(timespec="seconds")
+
+
+def model_fingerprint(path: str) -> str:
+    """Empreinte O(1) d'un fichier de modèle (taille:mtime), None s'il est absent."""
+    try:
+        return source_fingerprint(path)
+    except OSError:
+        return None
+
+
+# ------------------------------------------------------------
+# 📄 Manifest
+# ------------------------------------------------------------
+def read_manifest(path: str = MODEL_MANIFEST_PATH) -> dict:
+    """
+    Manifest versionné. Les modèles qu'il ne décrit pas (ou tous, sans
+    manifest) prennent le fichier de api/config.py, en version "config".
+    """
+    manifest = {"active": {}, "versions": {}}
+    if os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    for key, default in DEFAULT_PATHS.items():
+        if key not in manifest["active"]:
+            manifest["active"][key] = "config"
+            manifest["versions"].setdefault(key, {})["config"] = {
+                "file": os.path.abspath(default), "features": None, "trained_at": None, "sha256": None,
+            }
+    return manifest
+
+
+def write_manifest(manifest: dict, path: str = MODEL_MANIFEST_PATH):
+    """Écriture atomique : un lecteur voit l'ancien ou le nouveau manifest, jamais un fichier partiel."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, path)
+
+
+def resolve(entry: dict, manifest_path: str = MODEL_MANIFEST_PATH) -> str:
+    """Chemin absolu du fichier d'une version (relatif au dossier du manifest)."""
+    return os.path.join(os.path.dirname(os.path.abspath(manifest_path)), entry["file"])
+
+
+def describe_file(path: str, trained_at: str = None) -> dict:
+    """Entrée de manifest pour un fichier de modèle : variables attendues, date, sha256."""
+    import joblib
+
+    model = joblib.load(path)
+    features = getattr(model, "feature_names_in_", None)
+    return {
+        "features": [str(f) for f in features] if features is not None else None,
+        "trained_at": trained_at or _mtime_iso(path),
+        "sha256": file_sha256(path),
+        "registered_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def register(key: str, path: str, version: str = None, trained_at: str = None,
+             activate: bool = False, manifest_path: str = MODEL_MANIFEST_PATH) -> str:
+    """Ajoute une version d'un modèle au manifest (et l'active si demandé)."""
+    if key not in DEFAULT_PATHS:
+        raise ValueError(f"Modèle inconnu : {key} (attendu : {list(DEFAULT_PATHS)})")
+    manifest = {"active": {}, "versions": {}}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    entry = describe_file(path, trained_at)
+    version = version or entry["sha256"][:12]
+    entry["file"] = os.path.relpath(os.path.abspath(path), os.path.dirname(os.path.abspath(manifest_path)))
+    manifest["versions"].setdefault(key, {})[version] = entry
+    if activate or key not in manifest["active"]:
+        manifest["active"][key] = version
+    write_manifest(manifest, manifest_path)
+    return version
+
+
+def activate(key: str, version: str, manifest_path: str = MODEL_MANIFEST_PATH):
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if version not in manifest["versions"].get(key, {}):
+        raise ValueError(f"Version inconnue pour {key} : {version}")
+    manifest["active"][key] = version
+    write_manifest(manifest, manifest_path)
+
+
+# ------------------------------------------------------------
+# 🔁 Jeux de modèles et substitution à chaud
+# ------------------------------------------------------------
+class ModelSet:
+    """Jeu de modèles figé (une version par modèle), chargé à la demande."""
+
+    def __init__(self, manifest: dict, manifest_path: str, mmap: bool = True, on_load=None,
+                 compiled: bool = False):
+        self.versions = dict(manifest["active"])
+        self.entries = {key: manifest["versions"][key][v] for key, v in self.versions.items()}
+        self.paths = {key: resolve(e, manifest_path) for key, e in self.entries.items()}
+        # Versions "config" : sans sha256 déclaré, le contenu du fichier est suivi par son empreinte
+        self.fingerprints = {
+            key: model_fingerprint(path) for key, path in self.paths.items() if self.versions[key] == "config"
+        }
+        raw = json.dumps(sorted((key, v, self.fingerprints.get(key)) for key, v in self.versions.items()))
+        self.key = hashlib.sha1(raw.encode()).hexdigest()[:12]
+        self.models = ModelRegistry(self.paths, mmap=mmap, on_load=on_load, compiled=compiled)
+        self.created_at = datetime.now().isoformat(timespec="seconds")
+
+    def verify(self):
+        """Vérifie les sha256 déclarés ; lève ValueError en cas d'écart."""
+        for key, entry in self.entries.items():
+            if entry.get("sha256") and os.path.exists(self.paths[key]):
+                if file_sha256(self.paths[key]) != entry["sha256"]:
+                    raise ValueError(f"Checksum invalide pour {key} ({self.paths[key]})")
+
+    def describe(self) -> dict:
+        loading = self.models.stats()
+        out = {"key": self.key, "created_at": self.created_at, "models": {}}
+        for key, entry in self.entries.items():
+            path = self.paths[key]
+            try:
+                footprint = os.path.getsize(mmap_copy_path(path)) / 2**20
+            except OSError:
+                footprint = None
+            out["models"][key] = {
+                "version": self.versions[key],
+                "file": os.path.basename(path),
+                "trained_at": entry.get("trained_at"),
+                "sha256": entry.get("sha256"),
+                "fingerprint": self.fingerprints.get(key),
+                "n_features": len(entry["features"]) if entry.get("features") else None,
+                "footprint_mb": round(footprint, 1) if footprint is not None else None,
+                **{k: v for k, v in loading[key].items() if k != "file"},
+            }
+        return out
+
+
+class VersionedRegistry:
+    """
+    Donne le jeu de modèles actif (current()) et le remplace à chaud quand le
+    manifest ou un fichier de version "config" change : chargement + vérification + warm-up en arrière-plan,
+    puis substitution atomique de la référence.
+    """
+
+    def __init__(self, manifest_path: str = MODEL_MANIFEST_PATH, mmap: bool = True,
+                 on_load=None, warm_up=None, check_interval: float = 5.0, compiled: bool = False):
+        self.manifest_path = manifest_path
+        self.mmap = mmap
+        self.compiled = compiled
+        self.on_load = on_load
+        self.warm_up = warm_up
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._swapping = False
+        self._last_check = time.monotonic()
+        self._current = ModelSet(read_manifest(manifest_path), manifest_path, mmap, on_load, compiled)
+        self._fingerprint = self._watch_fingerprint()
+        self._retired = weakref.WeakSet()  # jeux remplacés encore utilisés par des requêtes
+        self.swaps = 0
+        self.last_error = None
+
+    def _watch_fingerprint(self) -> tuple:
+        """Empreintes du manifest et des fichiers de versions "config" du jeu actif."""
+        paths = [self._current.paths[key] for key in sorted(self._current.fingerprints)]
+        return (model_fingerprint(self.manifest_path), *map(model_fingerprint, paths))
+
+    def current(self) -> ModelSet:
+        """Jeu actif ; déclenche (au plus toutes les check_interval s) la détection d'un manifest ou d'un fichier modifié."""
+        now = time.monotonic()
+        if now - self._last_check >= self.check_interval and not self._swapping:
+            self._last_check = now
+            if self._watch_fingerprint() != self._fingerprint:
+                threading.Thread(target=self.reload, name="models-reload", daemon=True).start()
+        return self._current
+
+    def reload(self) -> bool:
+        """Charge le manifest courant et bascule si les versions actives ont changé."""
+        with self._lock:
+            self._swapping = True
+            try:
+                self._fingerprint = self._watch_fingerprint()
+                candidate = ModelSet(
+                    read_manifest(self.manifest_path), self.manifest_path, self.mmap, self.on_load, self.compiled,
+                )
+                if candidate.key == self._current.key:
+                    return False
+                candidate.verify()
+                candidate.models.warm_up(self.warm_up)
+                old, self._current = self._current, candidate
+                self._fingerprint = self._watch_fingerprint()
+                self._retired.add(old)
+                self.swaps += 1
+                self.last_error = None
+                print(f"[INFO] Modèles basculés : {old.versions} -> {candidate.versions}")
+                return True
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[❌] Bascule des modèles refusée : {e}")
+                return False
+            finally:
+                self._swapping = False
+
+    def describe(self) -> dict:
+        current = self._current
+        return {
+            "manifest": self.manifest_path if os.path.exists(self.manifest_path) else None,
+            "active": current.describe(),
+            "retired_in_use": [s.describe() for s in list(self._retired) if s is not current],
+            "swaps": self.swaps,
+            "last_error": self.last_error,
+        }
+
+
+# ------------------------------------------------------------
+# 🖥️ CLI
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("init", help="Crée le manifest depuis les chemins de api/config.py")
+    p_reg = sub.add_parser("register", help="Ajoute une version d'un modèle")
+    p_reg.add_argument("key", choices=list(DEFAULT_PATHS))
+    p_reg.add_argument("path")
+    p_reg.add_argument("--version")
+    p_reg.add_argument("--trained-at")
+    p_reg.add_argument("--activate", action="store_true")
+    p_act = sub.add_parser("activate", help="Change la version active d'un modèle")
+    p_act.add_argument("key", choices=list(DEFAULT_PATHS))
+    p_act.add_argument("version")
+    sub.add_parser("list", help="Affiche le manifest")
+    args = parser.parse_args()
+
+    if args.command == "init":
+        for key, path in DEFAULT_PATHS.items():
+            if os.path.exists(path):
+                version = register(key, path, activate=True)
+                print(f"✅ {key} : {os.path.basename(path)} (version {version})")
+            else:
+                print(f"[⚠️] Modèle introuvable : {path}")
+    elif args.command == "register":
+        version = register(args.key, args.path, args.version, args.trained_at, args.activate)
+        print(f"✅ {args.key} version {version} enregistrée")
+    elif args.command == "activate":
+        activate(args.key, args.version)
+        print(f"✅ {args.key} : version active = {args.version}")
+    print(json.dumps(read_manifest(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
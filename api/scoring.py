@@ -0,0 +1,78 @@
+import os
+
+import pandas as pd
+
+from api.inference import FEATURES, OUTPUTS, prepare_features, predict_rows
+from api.metrics import stage
+
+# Formats de sortie supportés par /predict_file
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def detect_format(filename: str) -> str:
+    """Retourne "parquet" ou "csv" selon l'extension du fichier envoyé."""
+    ext = os.path.splitext(filename or "")[1].lower()
+    return "parquet" if ext in (".parquet", ".pq") else "csv"
+
+
+def read_columns(path: str, input_format: str) -> list:
+    """Lit uniquement l'en-tête / le schéma du fichier."""
+    if input_format == "parquet":
+        import pyarrow.parquet as pq
+
+        return pq.read_schema(path).names
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def iter_chunks(path: str, input_format: str, chunk_rows: int):
+    """
+    Lit le fichier par blocs de chunk_rows lignes (mémoire bornée quelle que
+    soit la taille du fichier).
+    """
+    if input_format == "parquet":
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, low_memory=False)
+
+
+def score_chunk(chunk: pd.DataFrame, models: dict, keep: list = None) -> pd.DataFrame:
+    """Ajoute les colonnes DPE / Conso / MPR (et error) à un bloc de lignes."""
+    X = prepare_features(chunk[FEATURES].copy(), models)
+    preds = pd.DataFrame(predict_rows(X, models), index=chunk.index)
+
+    out = chunk[keep] if keep else chunk
+    return pd.concat([out, preds[OUTPUTS + ["error"]]], axis=1)
+
+
+def stream_scores(path: str, input_format: str, output_format: str, models: dict,
+                  chunk_rows: int, keep: list = None, run=None):
+    """
+    Générateur de réponse : lit, prédit et sérialise bloc par bloc,
+    puis supprime le fichier temporaire reçu.
+    `run(fn, *args)` exécute la prédiction d'un bloc (ex. exécuteur d'inférence).
+    """
+    run = run or (lambda fn, *args: fn(*args))
+    try:
+        first = True
+        for chunk in iter_chunks(path, input_format, chunk_rows):
+            if chunk.empty:
+                continue
+            scored = run(score_chunk, chunk, models, keep)
+            with stage("serialization"):
+                if output_format == "ndjson":
+                    records = scored.to_json(orient="records", lines=True, force_ascii=False, date_format="iso")
+                    payload = records.rstrip("\n") + "\n"
+                else:
+                    payload = scored.to_csv(index=False, header=first)
+            yield payload
+            first = False
+        if first and output_format != "ndjson":
+            # Fichier sans ligne de données : la réponse garde l'en-tête des colonnes
+            columns = (keep or read_columns(path, input_format)) + OUTPUTS + ["error"]
+            yield pd.DataFrame(columns=columns).to_csv(index=False)
+    finally:
+        os.remove(path)
@@ -0,0 +1,556 @@
+# ============================================================
+# 📍 Index spatial des logements (fenêtre, rayon, plus proches voisins)
+# ============================================================
+"""
+Index en grille régulière sur latitude / longitude, une par partition
+départementale : chaque logement géolocalisé reçoit la clé de sa cellule
+
+    ligne = (lat + 90) // SPATIAL_CELL_DEG, colonne = (lon + 180) // SPATIAL_CELL_DEG
+    clé = ligne * nb_colonnes + colonne
+
+et les points sont rangés par clé croissante. Les cellules d'une même ligne
+sont contiguës : une fenêtre se lit avec deux recherches dichotomiques par
+ligne de cellules, puis un filtre exact sur les coordonnées. Le rayon ajoute
+une distance haversine sur les candidats, les k plus proches voisins élargissent
+le rayon jusqu'à en trouver k. Étiquette et conso sont copiées dans l'index :
+une requête ne relit jamais le dataset.
+
+L'index est rangé à côté du store Arrow (STORE_DIR/<partition>/spatial/v<n>,
+tableaux .npy relus en memory-map) et suit la vue du datastore : après un
+rafraîchissement, seules les lignes ajoutées à chaque segment depuis la
+dernière version sont lues et fusionnées (insertion triée). Un nouvel export
+complet (CSV source modifié) ou une vue incohérente déclenche une reconstruction.
+
+Usage (depuis la racine du projet) :
+    python -m api.spatial build [--departements 73,74]
+    python -m api.spatial around LAT LON [--rayon 2000] [--k 10]
+"""
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+
+from api.clusters import LABELS, label_codes
+from api.config import SPATIAL_CELL_DEG, STORE_DIR
+from api.datastore import dataset_version, read_view, view_tables
+from api.jobs import acquire_lock, release_lock
+from api.partitions import normalize_department, partition_path, served_departments, split_codes
+
+LAT_COLUMN, LON_COLUMN = "latitude", "longitude"
+LABEL_COLUMN, CONSO_COLUMN = "etiquette_dpe", "conso_5_usages_par_m2_ef"
+ARRAYS = ["keys", "lat", "lon", "xyz", "label", "conso"]
+# Agrégats par cellule non vide (les cellules entièrement couvertes par une requête ne sont pas relues point par point)
+CELL_ARRAYS = ["cells", "cell_start", "cell_count", "cell_mix", "cell_conso_sum", "cell_conso_n"]
+# Versions conservées après une publication (la nouvelle + la précédente, encore lue par les processus en retard)
+KEEP_VERSIONS = 2
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEG = EARTH_RADIUS_M * np.pi / 180
+
+
+def haversine_m(lat0: float, lon0: float, lat, lon) -> np.ndarray:
+    """Distance (m) entre (lat0, lon0) et chaque point."""
+    lat0, lon0 = np.radians(lat0), np.radians(lon0)
+    lat, lon = np.radians(lat), np.radians(lon)
+    a = np.sin((lat - lat0) / 2) ** 2 + np.cos(lat0) * np.cos(lat) * np.sin((lon - lon0) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def unit_vectors(lat, lon) -> np.ndarray:
+    """Points sur la sphère unité (n x 3) : distance haversine <-> distance de corde, sans trigonométrie par requête."""
+    lat, lon = np.radians(lat), np.radians(lon)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _chord2(meters: float) -> float:
+    """Carré de la corde correspondant à la distance `meters` (sphère unité)."""
+    return (2 * np.sin(min(meters / EARTH_RADIUS_M, np.pi) / 2)) ** 2
+
+
+def circle_bbox(lat: float, lon: float, meters: float) -> tuple:
+    """Fenêtre (sud, ouest, nord, est) englobant le cercle de rayon `meters`."""
+    angle = meters / EARTH_RADIUS_M
+    dlat = np.degrees(angle)
+    # Écart de longitude max sur le cercle (sphère) ; le cercle contient un pôle au-delà
+    ratio = np.sin(angle) / max(np.cos(np.radians(lat)), 1e-12)
+    dlon = np.degrees(np.arcsin(ratio)) if angle < np.pi / 2 and ratio < 1 else 180.0
+    return float(lat - dlat), float(lon - dlon), float(lat + dlat), float(lon + dlon)
+
+
+def _grid(cell_deg: float) -> int:
+    """Nombre de colonnes de la grille."""
+    return int(np.ceil(360.0 / cell_deg)) + 1
+
+
+def cell_keys(lat, lon, cell_deg: float = SPATIAL_CELL_DEG) -> np.ndarray:
+    row = np.floor((np.asarray(lat) + 90.0) / cell_deg).astype("int64")
+    col = np.floor((np.asarray(lon) + 180.0) / cell_deg).astype("int64")
+    return row * _grid(cell_deg) + col
+
+
+def _ranges(lo: np.ndarray, hi: np.ndarray) -> np.ndarray:
+    """Concaténation vectorisée des plages [lo, hi)."""
+    lens = hi - lo
+    return np.repeat(lo - np.cumsum(lens) + lens, lens) + np.arange(lens.sum())
+
+
+def cell_aggregates(arrays: dict) -> dict:
+    """Effectif, répartition A..G et conso (somme, effectif) de chaque cellule non vide."""
+    cells, starts, counts = np.unique(arrays["keys"], return_index=True, return_counts=True)
+    n = len(cells)
+    cell_id = np.repeat(np.arange(n), counts)
+    label, conso = arrays["label"], arrays["conso"]
+    known, finite = label >= 0, np.isfinite(conso)
+    mix = np.bincount(cell_id[known] * len(LABELS) + label[known], minlength=n * len(LABELS))
+    return {
+        "cells": cells,
+        "cell_start": starts.astype("int64"),
+        "cell_count": counts.astype("int32"),
+        "cell_mix": mix.reshape(n, len(LABELS)).astype("int32"),
+        "cell_conso_sum": np.bincount(cell_id[finite], weights=conso[finite], minlength=n),
+        "cell_conso_n": np.bincount(cell_id[finite], minlength=n).astype("int32"),
+    }
+
+
+def _points(table, offset: int = 0, cell_deg: float = SPATIAL_CELL_DEG) -> dict:
+    """Tableaux de l'index (triés par clé) pour les lignes [offset:] d'une table Arrow."""
+    table = table.slice(offset)
+    names = table.column_names
+    missing = np.full(table.num_rows, np.nan)
+    column = lambda name: table.column(name).to_pandas() if name in names else None
+    numeric = lambda name: missing if name not in names else column(name).to_numpy("float64", na_value=np.nan)
+    lat, lon, conso = numeric(LAT_COLUMN), numeric(LON_COLUMN), numeric(CONSO_COLUMN)
+    labels = label_codes(column(LABEL_COLUMN), table.num_rows)
+
+    valid = np.isfinite(lat) & np.isfinite(lon) & (np.abs(lat) <= 90) & (np.abs(lon) <= 180)
+    keys = cell_keys(lat[valid], lon[valid], cell_deg)
+    order = np.argsort(keys, kind="stable")
+    return {
+        "keys": keys[order],
+        "lat": lat[valid][order],
+        "lon": lon[valid][order],
+        "xyz": unit_vectors(lat[valid][order], lon[valid][order]),
+        "label": labels[valid][order].astype("int8"),
+        "conso": conso[valid][order].astype("float32"),
+    }
+
+
+# ------------------------------------------------------------
+# 🔎 Index chargé (memory-map) et requêtes
+# ------------------------------------------------------------
+class SpatialIndex:
+    """Index d'une partition, relu depuis son dossier (tableaux .npy en memory-map)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        # Vues ndarray simples sur les memory-maps (l'indexation d'un np.memmap est nettement plus lente)
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r").view(np.ndarray)
+            for name in ARRAYS + CELL_ARRAYS
+        }
+        self.keys, self.lat, self.lon, self.xyz = arrays["keys"], arrays["lat"], arrays["lon"], arrays["xyz"]
+        self.label, self.conso = arrays["label"], arrays["conso"]
+        self.cells = {name: arrays[name] for name in CELL_ARRAYS}
+        self.cell_deg = self.meta["cell_deg"]
+        self.cols = _grid(self.cell_deg)
+
+    @property
+    def rows(self) -> int:
+        return len(self.keys)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(a.nbytes for a in (self.keys, self.lat, self.lon, self.xyz, self.label, self.conso, *self.cells.values()))
+
+    def intersects(self, bbox: tuple) -> bool:
+        extent = self.meta.get("extent")
+        if extent is None:
+            return False
+        south, west, north, east = bbox
+        return not (north < extent[0] or south > extent[2] or east < extent[1] or west > extent[3])
+
+    def bbox(self, south: float, west: float, north: float, east: float) -> np.ndarray:
+        """Positions (dans l'index) des logements de la fenêtre (bornes incluses)."""
+        if not self.rows or not self.intersects((south, west, north, east)):
+            return np.empty(0, dtype="int64")
+        idx = _ranges(*self._row_ranges(self.keys, (south, west, north, east)))
+        lat, lon = self.lat[idx], self.lon[idx]
+        return idx[(lat >= south) & (lat <= north) & (lon >= west) & (lon <= east)]
+
+    def _row_ranges(self, keys: np.ndarray, bbox: tuple) -> tuple:
+        """Plages [lo, hi) de `keys` (triées) couvrant la fenêtre : une par ligne de cellules."""
+        south, west, north, east = bbox
+        d = self.cell_deg
+        r0, r1 = int((max(south, -90.0) + 90.0) // d), int((min(north, 90.0) + 90.0) // d)
+        c0, c1 = int((max(west, -180.0) + 180.0) // d), int((min(east, 180.0) + 180.0) // d)
+        lines = np.arange(r0, r1 + 1, dtype="int64") * self.cols
+        return np.searchsorted(keys, lines + c0), np.searchsorted(keys, lines + c1 + 1)
+
+    def _aggregate(self, bbox: tuple, covered, keep) -> dict:
+        """
+        Agrégats des logements d'une zone incluse dans `bbox` : covered(sud, ouest,
+        nord, est) -> cellules entièrement dans la zone (lues dans les agrégats
+        par cellule), keep(positions) -> points retenus dans les cellules de bord.
+        """
+        if not self.rows or not self.intersects(bbox):
+            return self._summary(0, np.zeros(len(LABELS), dtype="int64"), 0.0, 0)
+        pos = _ranges(*self._row_ranges(self.cells["cells"], bbox))
+        keys = self.cells["cells"][pos]
+        d = self.cell_deg
+        south = (keys // self.cols) * d - 90.0
+        west = (keys % self.cols) * d - 180.0
+        full = covered(south, west, south + d, west + d)
+
+        inner = pos[full]
+        mix = self.cells["cell_mix"][inner].sum(axis=0, dtype="int64")
+        count = int(self.cells["cell_count"][inner].sum())
+        conso_sum = float(self.cells["cell_conso_sum"][inner].sum())
+        conso_n = int(self.cells["cell_conso_n"][inner].sum())
+
+        edge = pos[~full]
+        start = self.cells["cell_start"][edge]
+        idx = _ranges(start, start + self.cells["cell_count"][edge])
+        idx = idx[keep(idx)]
+        labels, conso = self.label[idx], self.conso[idx]
+        mix = mix + np.bincount(labels[labels >= 0], minlength=len(LABELS))
+        finite = np.isfinite(conso)
+        return self._summary(count + len(idx), mix, conso_sum + float(conso[finite].sum()), conso_n + int(finite.sum()))
+
+    @staticmethod
+    def _summary(count: int, mix: np.ndarray, conso_sum: float, conso_n: int) -> dict:
+        return {"count": count, "dpe": dict(zip(LABELS, mix.tolist())), "conso_sum": conso_sum, "conso_n": conso_n}
+
+    def summary_bbox(self, south: float, west: float, north: float, east: float) -> dict:
+        """Effectif, répartition A..G et conso (somme, effectif) des logements de la fenêtre."""
+        return self._aggregate(
+            (south, west, north, east),
+            lambda s, w, n, e: (s >= south) & (n <= north) & (w >= west) & (e <= east),
+            lambda idx: (self.lat[idx] >= south) & (self.lat[idx] <= north) & (self.lon[idx] >= west) & (self.lon[idx] <= east),
+        )
+
+    def summary_within(self, lat: float, lon: float, meters: float) -> dict:
+        """
+        Comme summary_bbox pour le cercle de rayon `meters` : une cellule est
+        entièrement couverte si ses quatre coins sont dans le cercle (la distance
+        au centre est maximale en un coin d'un rectangle lat / lon).
+        """
+        def covered(s, w, n, e):
+            return np.all([haversine_m(lat, lon, a, b) <= meters for a, b in ((s, w), (s, e), (n, w), (n, e))], axis=0)
+        limit = _chord2(meters)
+        return self._aggregate(circle_bbox(lat, lon, meters), covered, lambda idx: self._chord2_to(lat, lon, idx) <= limit)
+
+    def within(self, lat: float, lon: float, meters: float) -> tuple:
+        """(positions, distances en m) des logements à moins de `meters` du point."""
+        idx = self.bbox(*circle_bbox(lat, lon, meters))
+        chord2 = self._chord2_to(lat, lon, idx)
+        keep = chord2 <= _chord2(meters)
+        return idx[keep], 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(np.sqrt(chord2[keep]) / 2, 1.0))
+
+    def _chord2_to(self, lat: float, lon: float, idx: np.ndarray) -> np.ndarray:
+        delta = self.xyz[idx] - unit_vectors(lat, lon)
+        return np.einsum("ij,ij->i", delta, delta)
+
+    def nearest(self, lat: float, lon: float, k: int, max_meters: float = None) -> tuple:
+        """
+        (positions, distances) des k logements les plus proches, triés. Le rayon
+        de recherche double jusqu'à contenir k logements : tout logement plus
+        proche que le k-ième est alors forcément dans le cercle.
+        """
+        limit = max_meters or np.pi * EARTH_RADIUS_M
+        # Rayon de départ estimé d'après la densité de la cellule du point
+        side = self.cell_deg * METERS_PER_DEG
+        cell = int(cell_keys(lat, lon, self.cell_deg))
+        pos = np.searchsorted(self.cells["cells"], cell)
+        found = pos < len(self.cells["cells"]) and self.cells["cells"][pos] == cell
+        density = self.cells["cell_count"][pos] / (side * side * max(np.cos(np.radians(lat)), 1e-6)) if found else 0
+        meters = min(max(np.sqrt(k / (np.pi * density)), 10.0) if density else side, limit)
+        while True:
+            idx, dist = self.within(lat, lon, meters)
+            if len(idx) >= k or meters >= limit or len(idx) == self.rows:
+                break
+            meters = min(meters * 2, limit)
+        if len(idx) > k:
+            top = np.argpartition(dist, k - 1)[:k]
+            idx, dist = idx[top], dist[top]
+        order = np.argsort(dist, kind="stable")
+        return idx[order], dist[order]
+
+    def summary(self, idx: np.ndarray) -> dict:
+        """Effectif, répartition A..G et conso moyenne des logements `idx`."""
+        labels, conso = self.label[idx], self.conso[idx]
+        finite = np.isfinite(conso)
+        mix = np.bincount(labels[labels >= 0], minlength=len(LABELS))
+        return self._summary(int(len(idx)), mix, float(conso[finite].sum()), int(finite.sum()))
+
+    def records(self, idx: np.ndarray, dist: np.ndarray = None) -> list:
+        labels = np.array(LABELS + [None], dtype=object)[self.label[idx]]
+        conso = self.conso[idx].astype("float64").round(1)
+        out = []
+        for i, (lat, lon, label, value) in enumerate(zip(self.lat[idx].tolist(), self.lon[idx].tolist(), labels, conso.tolist())):
+            record = {"latitude": lat, "longitude": lon, "etiquette_dpe": label,
+                      "conso_5_usages_par_m2_ef": None if np.isnan(value) else value}
+            if dist is not None:
+                record["distance_m"] = round(float(dist[i]), 1)
+            out.append(record)
+        return out
+
+
+# ------------------------------------------------------------
+# 💾 Construction et mise à jour incrémentale
+# ------------------------------------------------------------
+def index_root(csv_path: str) -> str:
+    stem = os.path.splitext(os.path.basename(csv_path))[0]
+    return os.path.join(STORE_DIR, stem, "spatial")
+
+
+def _versions(root: str) -> list:
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name[1:]) for name in os.listdir(root) if name[:1] == "v" and name[1:].isdigit())
+
+
+def current_index_path(csv_path: str) -> str:
+    """Dossier de la dernière version publiée, ou None."""
+    versions = _versions(index_root(csv_path))
+    return os.path.join(index_root(csv_path), f"v{versions[-1]}") if versions else None
+
+
+@contextmanager
+def _index_lock(csv_path: str, poll: float = 0.2):
+    """
+    Verrou inter-processus (fichier de api.jobs) d'un index : API, ingestion et
+    CLI peuvent mettre à jour la même partition en même temps. On attend que
+    le détenteur ait publié sa version ; elle est alors relue au lieu d'être recalculée.
+    """
+    name = f"spatial_{os.path.splitext(os.path.basename(csv_path))[0]}"
+    owner = f"spatial-{os.getpid()}-{threading.get_ident()}"
+    while not acquire_lock(name, owner):
+        time.sleep(poll)
+    try:
+        yield
+    finally:
+        release_lock(name)
+
+
+def _segment_rows(tables: dict) -> dict:
+    return {key: table.num_rows for key, table in tables.items() if key != "base"}
+
+
+def _publish(csv_path: str, arrays: dict, meta: dict) -> str:
+    """
+    Écrit une nouvelle version (dossier temporaire renommé d'un bloc) et ne
+    garde que les KEEP_VERSIONS dernières. Si la version existe déjà (écrite
+    par un autre processus), la sienne est abandonnée et le chemin gagnant retourné.
+    """
+    root = index_root(csv_path)
+    os.makedirs(root, exist_ok=True)
+    versions = _versions(root)
+    final = os.path.join(root, f"v{(versions[-1] + 1) if versions else 1}")
+    tmp = f"{final}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    arrays = {name: arrays[name] for name in ARRAYS} | cell_aggregates(arrays)
+    for name in ARRAYS + CELL_ARRAYS:
+        np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(arrays[name]))
+    lat, lon = arrays["lat"], arrays["lon"]
+    meta = {
+        **meta,
+        "rows": int(len(arrays["keys"])),
+        "cell_deg": SPATIAL_CELL_DEG,
+        "extent": [float(lat.min()), float(lon.min()), float(lat.max()), float(lon.max())] if len(lat) else None,
+        "built_at": datetime.now().isoformat(timespec="seconds"),
+    }
+    with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    try:
+        os.rename(tmp, final)
+    except OSError:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not os.path.isdir(final):
+            raise
+        print(f"[WARN] Index spatial {final} déjà publié par un autre processus : version conservée")
+        return final
+    # La version précédente reste en place : un lecteur peut avoir lu current_index_path juste avant
+    # le renommage. Ceux qui ont déjà ouvert une version supprimée continuent de la lire (memory-map).
+    for version in versions[:len(versions) + 1 - KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(root, f"v{version}"), ignore_errors=True)
+    return final
+
+
+def build_index(csv_path: str) -> dict:
+    """Indexe toute la partition (store de base + segments de la vue)."""
+    with _index_lock(csv_path):
+        return _build_index(csv_path)
+
+
+def _build_index(csv_path: str) -> dict:
+    tables = view_tables(csv_path, [LAT_COLUMN, LON_COLUMN, LABEL_COLUMN, CONSO_COLUMN])
+    parts = [_points(table) for table in tables.values()]
+    arrays = {name: np.concatenate([p[name] for p in parts]) for name in ARRAYS}
+    order = np.argsort(arrays["keys"], kind="stable")
+    arrays = {name: values[order] for name, values in arrays.items()}
+    meta = {
+        "base_fingerprint": read_view(csv_path)["base_fingerprint"],
+        "base_rows": tables["base"].num_rows,
+        "segments": _segment_rows(tables),
+        "mode": "full",
+    }
+    path = _publish(csv_path, arrays, meta)
+    print(f"[INFO] Index spatial construit : {path} ({len(order):,} logements géolocalisés)")
+    return meta | {"path": path}
+
+
+def update_index(csv_path: str) -> dict:
+    """
+    Met l'index au niveau de la vue courante du datastore. Les segments ne
+    font que grandir (copy-on-write par concaténation) : seules leurs lignes
+    au-delà du nombre déjà indexé sont lues, puis insérées à leur place dans
+    l'ordre des clés. Une compaction (mêmes lignes, segments fusionnés) ne
+    met à jour que les compteurs ; tout autre écart reconstruit l'index.
+    Les mises à jour d'une même partition sont sérialisées entre processus.
+    """
+    with _index_lock(csv_path):
+        return _update_index(csv_path)
+
+
+def _update_index(csv_path: str) -> dict:
+    path = current_index_path(csv_path)
+    if path is None:
+        return _build_index(csv_path)
+    try:
+        index = SpatialIndex(path)
+    except (OSError, ValueError) as e:
+        print(f"[WARN] Index spatial illisible ({e}) : reconstruction")
+        return _build_index(csv_path)
+
+    meta = index.meta
+    tables = view_tables(csv_path, [LAT_COLUMN, LON_COLUMN, LABEL_COLUMN, CONSO_COLUMN])
+    current = _segment_rows(tables)
+    indexed = meta.get("segments", {})
+    if (meta.get("base_fingerprint") != read_view(csv_path)["base_fingerprint"]
+            or meta.get("base_rows") != tables["base"].num_rows
+            or meta.get("cell_deg") != SPATIAL_CELL_DEG):
+        return _build_index(csv_path)
+    if current == indexed:
+        return meta | {"path": path, "mode": "unchanged"}
+    if any(current.get(key, -1) < rows for key, rows in indexed.items()):
+        if sum(current.values()) == sum(indexed.values()):
+            # Compaction : mêmes lignes, regroupées dans d'autres segments
+            arrays = {name: getattr(index, name) for name in ARRAYS}
+            path = _publish(csv_path, arrays, {**meta, "segments": current, "mode": "compaction"})
+            return meta | {"path": path, "segments": current, "mode": "compaction"}
+        return _build_index(csv_path)
+
+    parts = [_points(tables[key], indexed.get(key, 0)) for key in current if current[key] > indexed.get(key, 0)]
+    delta = {name: np.concatenate([p[name] for p in parts]) for name in ARRAYS}
+    order = np.argsort(delta["keys"], kind="stable")
+    delta = {name: values[order] for name, values in delta.items()}
+    # Insertion triée : chaque nouveau point après les points existants de même clé
+    positions = np.searchsorted(index.keys, delta["keys"], side="right")
+    arrays = {name: np.insert(getattr(index, name), positions, delta[name], axis=0) for name in ARRAYS}
+    path = _publish(csv_path, arrays, {**meta, "segments": current, "mode": "delta"})
+    print(f"[INFO] Index spatial mis à jour : +{len(order):,} logements ({path})")
+    return meta | {"path": path, "segments": current, "mode": "delta", "new_points": int(len(order))}
+
+
+# ------------------------------------------------------------
+# ⚡ Service : index des partitions servies, rechargés à chaque nouvelle version
+# ------------------------------------------------------------
+class SpatialIndexes:
+    """Index spatial de chaque partition, tenu au niveau de la version du dataset."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current = {}  # département -> (version du dataset, index)
+
+    def get(self, dept: str) -> SpatialIndex:
+        csv_path = partition_path(dept)
+        version = dataset_version(csv_path)
+        cached = self._current.get(dept)
+        if cached and cached[0] == version:
+            return cached[1]
+        with self._lock:
+            cached = self._current.get(dept)
+            if not (cached and cached[0] == version):
+                update_index(csv_path)
+                self._current[dept] = (version, SpatialIndex(current_index_path(csv_path)))
+            return self._current[dept][1]
+
+    def indexes(self, departments=None, bbox: tuple = None) -> dict:
+        """Index des départements demandés (défaut : servis) qui recoupent la fenêtre."""
+        depts = [normalize_department(d) for d in split_codes(departments)] or served_departments()
+        depts = [d for d in depts if d in served_departments()]
+        found = {d: self.get(d) for d in depts}
+        return {d: index for d, index in found.items() if bbox is None or index.intersects(bbox)}
+
+    def distribution(self, bbox: tuple = None, center: tuple = None, meters: float = None, departments=None) -> dict:
+        """Répartition DPE des logements d'une fenêtre ou d'un cercle (center, meters)."""
+        area = circle_bbox(center[0], center[1], meters) if center is not None else bbox
+        total = {"count": 0, "dpe": dict.fromkeys(LABELS, 0), "conso_sum": 0.0, "conso_n": 0}
+        for index in self.indexes(departments, area).values():
+            part = index.summary_within(center[0], center[1], meters) if center is not None else index.summary_bbox(*area)
+            total["count"] += part["count"]
+            total["conso_sum"] += part["conso_sum"]
+            total["conso_n"] += part["conso_n"]
+            for label, count in part["dpe"].items():
+                total["dpe"][label] += count
+        labelled = sum(total["dpe"].values())
+        return {
+            "count": total["count"],
+            "dpe": total["dpe"],
+            "dpe_share": {l: round(c / labelled, 4) for l, c in total["dpe"].items()} if labelled else None,
+            "conso_moyenne": round(total["conso_sum"] / total["conso_n"], 1) if total["conso_n"] else None,
+        }
+
+    def nearest(self, lat: float, lon: float, k: int = 10, max_meters: float = None, departments=None) -> list:
+        """k logements les plus proches, toutes partitions confondues, triés par distance."""
+        records = []
+        for index in self.indexes(departments).values():
+            records += index.records(*index.nearest(lat, lon, k, max_meters))
+        return sorted(records, key=lambda r: r["distance_m"])[:k]
+
+    def stats(self) -> dict:
+        return {
+            dept: {"rows": index.rows, "size_mb": round(index.nbytes / 2**20, 1), "built_at": index.meta.get("built_at")}
+            for dept, (_, index) in list(self._current.items())
+        }
+
+
+# ------------------------------------------------------------
+# 🖥️ CLI
+# ------------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="Construit (ou met à jour) l'index des partitions")
+    build.add_argument("--departements", default=None, help="Codes séparés par des virgules (défaut : servis)")
+    build.add_argument("--full", action="store_true", help="Reconstruction complète")
+    around = sub.add_parser("around", help="Répartition DPE et plus proches logements autour d'un point")
+    around.add_argument("lat", type=float)
+    around.add_argument("lon", type=float)
+    around.add_argument("--rayon", type=float, default=2000, help="Rayon en mètres")
+    around.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        for dept in [normalize_department(d) for d in split_codes(args.departements)] or served_departments():
+            result = (build_index if args.full else update_index)(partition_path(dept))
+            print(f"✅ {dept} : {result['mode']} ({result['path']})")
+    else:
+        service = SpatialIndexes()
+        result = {
+            "distribution": service.distribution(center=(args.lat, args.lon), meters=args.rayon),
+            "nearest": service.nearest(args.lat, args.lon, args.k),
+        }
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,36 @@
-import pandas as pd
+def parse_batch_body(body: bytes, content_type: str = "") -> list:
+    """
+    Décode le corps d'une requête batch : tableau JSON ou NDJSON
+    (un objet JSON par ligne, content-type application/x-ndjson).
+    """
+    import json
+
+    text = body.decode("utf-8")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return [json.loads(line) for line in text.splitlines() if line.strip()]
+
+    payload = json.loads(text)
+    if not isinstance(payload, list):
+        raise ValueError("Le corps doit être un tableau JSON d'objets InputFeatures")
+    return payload
 
-def normalize_input(df: pd.DataFrame) -> pd.DataFrame:
+
+def etag_response(request, payload: dict, etag: str = None):
     """
-    Nettoyage / harmonisation des valeurs en entrée.
-    À enrichir selon ton préprocesseur.
+    Réponse JSON avec en-têtes de validation de cache (ETag + Cache-Control).
+    Retourne 304 sans corps si le client possède déjà cette version
+    (en-tête If-None-Match identique).
     """
-    for col in df.select_dtypes(include="object"):
-        df[col] = df[col].str.strip().str.capitalize()
-    return df
+    import hashlib
+    import json
+    from fastapi.responses import JSONResponse, Response
+
+    if etag is None:
+        body = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        etag = hashlib.sha1(body).hexdigest()
+    etag = f'"{etag}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(payload, headers=headers)
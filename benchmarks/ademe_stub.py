@@ -0,0 +1,128 @@
+# ============================================================
+# 🧪 Serveur bouchon de l'API ADEME (data-fair) pour les tests
+# ============================================================
+"""
+Simule les endpoints /dpe03existant/lines et /dpe02neuf/lines de l'ADEME :
+filtres q / q_fields (préfixe de code postal) et qs (plage de dates), tri par
+date, pagination par curseur "after" avec lien "next" absolu. Une proportion
+d'erreurs 503 peut être injectée pour tester les retries et la reprise.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.ademe_stub --rows 20000 --port 8765
+    ADEME_BASE_URL=http://127.0.0.1:8765 uvicorn api.main:app
+"""
+import argparse
+import json
+import random
+import re
+import threading
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+from api.partitions import postal_prefixes
+
+DATASETS = {"dpe03existant": "Ancien", "dpe02neuf": "Neuf"}
+QS_PATTERN = re.compile(r"date_reception_dpe:\[(\S+) TO (\S+)\]")
+
+
+def make_rows(n: int, dept: str = "73", start: str = "2023-01-01", days: int = 900, seed: int = 0) -> list:
+    """Lignes DPE factices triées par date de réception."""
+    rng = random.Random(seed)
+    d0 = date.fromisoformat(start)
+    prefixes = postal_prefixes(dept)  # Corse : 200 / 201 (2A), 202 à 206 (2B)
+    rows = []
+    for i in range(n):
+        prefix = rng.choice(prefixes)
+        rows.append({
+            "numero_dpe": f"{dept}{seed}{i:08d}S",  # unique entre datasets, comme à l'ADEME
+            "date_reception_dpe": (d0 + timedelta(days=rng.randrange(days))).isoformat(),
+            "code_postal_ban": prefix + str(rng.randrange(10 ** (5 - len(prefix)))).zfill(5 - len(prefix)),
+            "type_batiment": rng.choice(["maison", "appartement"]),
+            "etiquette_dpe": rng.choice("ABCDEFG"),
+            "surface_habitable_logement": rng.randint(15, 250),
+            "conso_5_usages_par_m2_ef": round(rng.uniform(40, 450), 1),
+        })
+    rows.sort(key=lambda r: r["date_reception_dpe"])
+    return rows
+
+
+def make_handler(datasets: dict, fail_rate: float = 0.0):
+    """Construit la classe de handler HTTP servant les lignes de chaque dataset."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: dict):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if len(parts) != 2 or parts[0] not in datasets or parts[1] != "lines":
+                return self._send(404, {"error": "not found"})
+            if fail_rate and random.random() < fail_rate:
+                return self._send(503, {"error": "indisponible (simulé)"})
+
+            params = {k: v[0] for k, v in parse_qs(url.query).items()}
+            rows = datasets[parts[0]]
+            prefix = params.get("q", "").rstrip("*")
+            if prefix:
+                rows = [r for r in rows if r["code_postal_ban"].startswith(prefix)]
+            m = QS_PATTERN.search(params.get("qs", ""))
+            if m:
+                lower, upper = m.groups()
+                rows = [r for r in rows if r["date_reception_dpe"] >= lower
+                        and (upper == "*" or r["date_reception_dpe"] <= upper)]
+
+            size = int(params.get("size", 20))
+            after = int(params.get("after", 0))
+            page = rows[after:after + size]
+            next_url = None
+            if after + size < len(rows):
+                host = self.headers.get("Host")
+                next_url = f"http://{host}{url.path}?" + urlencode(params | {"after": after + size})
+            self._send(200, {"total": len(rows), "results": page, "next": next_url})
+
+    return Handler
+
+
+def start_stub_server(rows_per_dataset: int = 5000, port: int = 0, fail_rate: float = 0.0, dept: str = "73"):
+    """
+    Démarre le serveur dans un thread (port 0 = port libre) et retourne
+    (server, base_url). Arrêt : server.shutdown(). dept : un ou plusieurs
+    départements séparés par des virgules (ex. "73,74").
+    """
+    datasets = {}
+    for i, name in enumerate(DATASETS):
+        rows = [r for d in dept.split(",") for r in make_rows(rows_per_dataset, dept=d.strip(), seed=i)]
+        datasets[name] = sorted(rows, key=lambda r: r["date_reception_dpe"])
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(datasets, fail_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Lignes par dataset")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--dept", default="73", help="Département(s), ex. 73,74")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Proportion de réponses 503 simulées")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.rows, args.port, args.fail_rate, args.dept)
+    print(f"Serveur bouchon ADEME : {url} (Ctrl+C pour arrêter)")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
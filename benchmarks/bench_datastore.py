@@ -0,0 +1,56 @@
+# ============================================================
+# ⏱️ Benchmark — pd.read_csv vs store colonnaire (Arrow)
+# ============================================================
+"""
+Compare le temps de chargement et la mémoire occupée par le dataset lu via
+pd.read_csv (chemin historique) et via api.datastore.load_dataset.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_datastore [chemin_csv]
+"""
+import json
+import sys
+import time
+
+import pandas as pd
+
+from api.config import DATA_PATH
+from api.datastore import ensure_store, load_dataset
+
+
+def frame_mb(df: pd.DataFrame) -> float:
+    return round(df.memory_usage(deep=True).sum() / 1e6, 1)
+
+
+def main():
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else DATA_PATH
+
+    t0 = time.perf_counter()
+    df_csv = pd.read_csv(csv_path, low_memory=False)
+    csv_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    ensure_store(csv_path)
+    build_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    df_store = load_dataset(csv_path)
+    store_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    load_dataset(csv_path, columns=["date_reception_dpe"])
+    one_col_s = time.perf_counter() - t0
+
+    print(json.dumps({
+        "rows": len(df_csv),
+        "read_csv_s": round(csv_s, 3),
+        "store_build_s": round(build_s, 3),
+        "store_load_s": round(store_s, 3),
+        "store_one_column_s": round(one_col_s, 4),
+        "read_csv_mb": frame_mb(df_csv),
+        "store_mb": frame_mb(df_store),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
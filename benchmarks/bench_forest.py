@@ -0,0 +1,102 @@
+# ============================================================
+# ⏱️ Benchmark — forêt compilée (api.forest) vs model.predict
+# ============================================================
+"""
+Compare, pour chaque modèle DPE / CONSO / MPR, le pipeline sklearn et le
+moteur compilé : latence d'une ligne (médiane), débit par lot, mémoire
+(RSS ajoutée au chargement, taille des tableaux) et identité des prédictions.
+
+Chaque chargement est mesuré dans un sous-processus neuf pour que la RSS
+de l'un ne fausse pas l'autre.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_forest --rows 5000
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.bench_predict_batch import make_payloads
+
+KEYS = ["dpe", "conso", "mpr"]
+
+
+def _load(key: str, engine: str):
+    from api.forest import compile_model
+    from api.models_loader import load_model
+    from api.registry import VersionedRegistry
+
+    paths = VersionedRegistry(mmap=False).current().paths
+    model = load_model(paths[key])
+    return compile_model(model) if engine == "compiled" else model
+
+
+def measure_load(key: str, engine: str) -> dict:
+    """RSS ajoutée par le chargement (sous-processus dédié)."""
+    code = (
+        "import json, time; from api.models_loader import process_rss_mb; "
+        "import sklearn.ensemble, pandas; before = process_rss_mb(); t0 = time.perf_counter(); "
+        "from benchmarks.bench_forest import _load; m = _load(%r, %r); "
+        "print(json.dumps({'load_s': round(time.perf_counter() - t0, 3), "
+        "'rss_delta_mb': round(process_rss_mb() - before, 1)}))" % (key, engine)
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def bench_model(key: str, X: pd.DataFrame, single: int) -> dict:
+    from api.forest import compile_model
+
+    model = _load(key, "sklearn")
+    if model is None:
+        return {"error": "modèle introuvable"}
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = 1
+    compiled = compile_model(model)
+    if key == "conso":
+        from api.registry import VersionedRegistry
+        from api.models_loader import load_model
+
+        X = load_model(VersionedRegistry(mmap=False).current().paths["preproc_conso"]).transform(X)
+
+    result = {"identical": bool(np.array_equal(model.predict(X), compiled.predict(X)))}
+    for name, engine in (("sklearn", model), ("compiled", compiled)):
+        lat = []
+        for i in range(single):
+            row = X[i:i + 1]
+            t0 = time.perf_counter()
+            engine.predict(row)
+            lat.append(time.perf_counter() - t0)
+        t0 = time.perf_counter()
+        engine.predict(X)
+        batch_s = time.perf_counter() - t0
+        result[name] = {
+            "single_p50_ms": round(float(np.median(lat)) * 1000, 3),
+            "batch_rows_per_s": round(X.shape[0] / batch_s, 1),
+            **measure_load(key, name),
+        }
+    result["compiled"]["arrays_mb"] = round(compiled.forest.nbytes / 2**20, 2)
+    result["single_speedup"] = round(result["sklearn"]["single_p50_ms"] / result["compiled"]["single_p50_ms"], 1)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5000, help="Taille du lot")
+    parser.add_argument("--single", type=int, default=200, help="Nombre de prédictions unitaires chronométrées")
+    args = parser.parse_args()
+
+    from api.inference import FEATURES, prepare_features
+
+    X = prepare_features(pd.DataFrame(make_payloads(args.rows)))[FEATURES]
+    results = {key: bench_model(key, X, args.single) for key in KEYS}
+    print(json.dumps({"rows": args.rows, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
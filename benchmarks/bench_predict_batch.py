@@ -0,0 +1,105 @@
+# ============================================================
+# ⏱️ Benchmark — prédiction ligne à ligne vs /predict_batch
+# ============================================================
+"""
+Compare le débit (lignes/s) du chemin unitaire (une DataFrame d'une ligne
+par prédiction, comme /predict_all) et du chemin vectorisé (/predict_batch).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.bench_predict_batch --rows 2000
+    python -m benchmarks.bench_predict_batch --rows 2000 --url http://127.0.0.1:8000
+"""
+import argparse
+import json
+import random
+import time
+
+SAMPLE_VALUES = {
+    "type_batiment": ["appartement", "maison"],
+    "periode_construction": ["avant 1948", "1975-1977", "1989-2000", "après 2021"],
+    "energie_chauffage": ["Électricité", "Gaz", "Fioul", "Bois"],
+    "qualite_isolation_murs": ["bonne", "insuffisante", "moyenne", "très bonne"],
+    "qualite_isolation_menuiseries": ["bonne", "insuffisante", "moyenne", "très bonne"],
+    "zone_climatique": ["H1", "H2", "H3"],
+    "classe_altitude": ["400-800m", "inférieur à 400m", "supérieur à 800m"],
+    "logement_traversant": ["oui", "non"],
+    "type_energie_principale_chauffage": ["Électricité", "Gaz naturel", "Fioul domestique", "Bois – Bûches"],
+    "classe_inertie_batiment": ["Lourde", "Légère", "Moyenne", "Très lourde"],
+}
+
+
+def make_payloads(n: int, seed: int = 42) -> list:
+    """Génère n logements aléatoires au format InputFeatures."""
+    rng = random.Random(seed)
+    rows = []
+    for _ in range(n):
+        row = {k: rng.choice(v) for k, v in SAMPLE_VALUES.items()}
+        row["annee_construction"] = rng.randint(1900, 2024)
+        row["surface_habitable_logement"] = float(rng.randint(15, 250))
+        rows.append(row)
+    return rows
+
+
+def bench_in_process(payloads: list) -> dict:
+    """Mesure les deux chemins directement sur les modèles chargés en mémoire."""
+    import pandas as pd
+    from api.config import MODEL_DPE_PATH, MODEL_CONSO_PATH, PREPROC_CONSO_PATH
+    from api.models_loader import load_model
+    from api.inference import prepare_features, predict_frame
+
+    models = {
+        "dpe": load_model(MODEL_DPE_PATH),
+        "conso": load_model(MODEL_CONSO_PATH),
+        "preproc_conso": load_model(PREPROC_CONSO_PATH),
+    }
+
+    t0 = time.perf_counter()
+    for row in payloads:
+        predict_frame(prepare_features(pd.DataFrame([row])), models)
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    predict_frame(prepare_features(pd.DataFrame(payloads)), models)
+    batch_s = time.perf_counter() - t0
+
+    return {"single_s": single_s, "batch_s": batch_s}
+
+
+def bench_http(payloads: list, url: str) -> dict:
+    """Mesure les deux chemins via l'API HTTP (aller-retour réseau inclus)."""
+    import requests
+
+    session = requests.Session()
+    t0 = time.perf_counter()
+    for row in payloads:
+        session.post(f"{url}/predict_all", json=row, timeout=60).raise_for_status()
+    single_s = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    session.post(f"{url}/predict_batch", json=payloads, timeout=600).raise_for_status()
+    batch_s = time.perf_counter() - t0
+
+    return {"single_s": single_s, "batch_s": batch_s}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000, help="Nombre de logements à prédire")
+    parser.add_argument("--url", default=None, help="URL de l'API (sinon mesure en mémoire)")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.rows)
+    timings = bench_http(payloads, args.url) if args.url else bench_in_process(payloads)
+
+    result = {
+        "rows": args.rows,
+        "mode": "http" if args.url else "in_process",
+        "single_rows_per_s": round(args.rows / timings["single_s"], 1),
+        "batch_rows_per_s": round(args.rows / timings["batch_s"], 1),
+        "speedup": round(timings["single_s"] / timings["batch_s"], 1),
+    }
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+# ============================================================
+# ⏱️ Test de charge — /predict_all avec et sans micro-batching
+# ============================================================
+"""
+Envoie --requests prédictions unitaires depuis --clients clients concurrents
+et mesure le débit (req/s) et la latence (p50 / p99, ms).
+
+En mémoire (défaut) : compare le chemin direct et le micro-batching sur les
+mêmes modèles, sans réseau. En HTTP (--url) : mesure l'API telle que lancée
+(démarrer uvicorn avec puis sans MICROBATCH_ENABLED=1 pour comparer).
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.load_predict --clients 64 --requests 2000
+    python -m benchmarks.load_predict --clients 64 --requests 2000 --url http://127.0.0.1:8000
+"""
+import argparse
+import asyncio
+import json
+import time
+
+import numpy as np
+
+from benchmarks.bench_predict_batch import make_payloads
+
+
+def summarize(latencies: list, elapsed: float, errors: int = 0) -> dict:
+    lat = np.array(latencies) * 1000
+    p50, p90, p99 = np.percentile(lat, [50, 90, 99]) if len(lat) else (float("nan"),) * 3
+    return {
+        "requests": len(latencies) + errors,
+        "errors": errors,
+        "req_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(float(p50), 2),
+        "p90_ms": round(float(p90), 2),
+        "p99_ms": round(float(p99), 2),
+    }
+
+
+async def _load_async(predict, payloads: list, clients: int) -> dict:
+    """clients coroutines qui se partagent les payloads, une requête à la fois chacune."""
+    latencies, errors = [], 0
+    queue = list(reversed(payloads))
+
+    async def client():
+        nonlocal errors
+        while queue:
+            row = queue.pop()
+            t0 = time.perf_counter()
+            try:
+                await predict(row)
+                latencies.append(time.perf_counter() - t0)
+            except Exception:
+                errors += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[client() for _ in range(clients)])
+    return summarize(latencies, time.perf_counter() - t0, errors)
+
+
+def bench_in_process(payloads: list, clients: int, max_batch: int, max_wait_ms: float) -> dict:
+    """Même charge sur le chemin direct puis via MicroBatcher (exécuteur d'inférence partagé)."""
+    from api import main
+    from api.batching import MicroBatcher
+
+    results = {}
+    main.BATCHER = None
+    results["direct"] = asyncio.run(_load_async(main._predict_single, payloads, clients))
+
+    main.BATCHER = MicroBatcher(main._predict_many, main.INFERENCE.run, max_batch, max_wait_ms)
+    results["microbatch"] = asyncio.run(_load_async(main._predict_single, payloads, clients))
+    results["microbatch"]["mean_batch_size"] = main.BATCHER.stats()["mean_batch_size"]
+    return results
+
+
+def bench_http(payloads: list, clients: int, url: str) -> dict:
+    """Charge HTTP réelle : un thread + une session par client."""
+    import threading
+    from concurrent.futures import ThreadPoolExecutor
+
+    import requests
+
+    local = threading.local()
+
+    def call(row):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        session = local.session
+        t0 = time.perf_counter()
+        r = session.post(f"{url}/predict_all", json=row, timeout=60)
+        return time.perf_counter() - t0, r.status_code == 200
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        outcomes = list(pool.map(call, payloads))
+    elapsed = time.perf_counter() - t0
+
+    result = summarize([lat for lat, ok in outcomes if ok], elapsed, sum(not ok for _, ok in outcomes))
+    try:
+        result["server_batching"] = requests.get(f"{url}/status", timeout=10).json().get("batching")
+    except Exception:
+        pass
+    return {"http": result}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="Clients concurrents")
+    parser.add_argument("--requests", type=int, default=1000, help="Nombre total de requêtes")
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--url", default=None, help="URL de l'API (sinon mesure en mémoire)")
+    args = parser.parse_args()
+
+    payloads = make_payloads(args.requests)
+    if args.url:
+        results = bench_http(payloads, args.clients, args.url)
+    else:
+        results = bench_in_process(payloads, args.clients, args.max_batch, args.max_wait_ms)
+        direct, batched = results["direct"], results["microbatch"]
+        results["throughput_gain"] = round(batched["req_per_s"] / direct["req_per_s"], 2)
+        results["p50_latency_cost_ms"] = round(batched["p50_ms"] - direct["p50_ms"], 2)
+
+    print(json.dumps({"clients": args.clients, **results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
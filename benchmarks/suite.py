@@ -0,0 +1,332 @@
+# ============================================================
+# ⏱️ Suite de benchmarks — prédiction, chargement, rafraîchissement
+# ============================================================
+"""
+Mesures reproductibles enregistrées en JSON (une exécution par commit) :
+
+- prédiction unitaire (/predict_all) et par lot (/predict_batch) : débit et
+  latences p50 / p90 / p99 à plusieurs niveaux de concurrence ;
+- chargement du dataset : pd.read_csv (chemin historique de l'API),
+  construction du store Arrow, load_dataset (corps de load_data côté
+  Streamlit), lecture de deux colonnes, read_metadata (/last_update) ;
+- rafraîchissement : append_rows (delta dédupliqué par segments) comparé à la
+  réécriture complète du CSV, à mesure que le dataset grandit ;
+- mémoire : taille des DataFrames et RSS du processus.
+
+Les datasets sont synthétiques (benchmarks.synthetic) et écrits dans un
+dossier temporaire, store compris : data/ n'est pas modifié.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.suite run                                # 10k / 100k / 1M lignes
+    python -m benchmarks.suite run --sizes 10000 --concurrency 1 8
+    python -m benchmarks.suite run --url http://127.0.0.1:8000     # prédictions via HTTP
+    python -m benchmarks.suite compare benchmarks/results/<avant>.json benchmarks/results/<après>.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from benchmarks.bench_datastore import frame_mb
+from benchmarks.bench_predict_batch import make_payloads
+from benchmarks.load_predict import _load_async, summarize
+from benchmarks.synthetic import synthetic_frame
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+DEFAULT_SIZES = (10_000, 100_000, 1_000_000)
+DEFAULT_CONCURRENCY = (1, 8, 32)
+DEFAULT_BATCH_SIZES = (100, 1000)
+
+
+@contextmanager
+def timed(result: dict, key: str):
+    t0 = time.perf_counter()
+    yield
+    result[key] = round(time.perf_counter() - t0, 4)
+
+
+def peak_rss_mb() -> float:
+    """RSS maximale atteinte par le processus depuis son démarrage (Mo)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 2**20 if sys.platform == "darwin" else peak / 2**10, 1)
+
+
+def environment() -> dict:
+    """Commit, machine, versions et réglages de l'API : ce qui rend deux fichiers comparables."""
+    def git(*args):
+        try:
+            return subprocess.run(["git", *args], capture_output=True, text=True, timeout=10).stdout.strip()
+        except (OSError, subprocess.SubprocessError):
+            return None
+
+    import numpy as np
+    import sklearn
+    from api import config
+
+    return {
+        "commit": git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(git("status", "--porcelain", "--untracked-files=no")),
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"pandas": pd.__version__, "numpy": np.__version__, "sklearn": sklearn.__version__},
+        "config": {
+            "FOREST_ENGINE": config.FOREST_ENGINE,
+            "LOOKUP_ENABLED": config.LOOKUP_ENABLED,
+            "PREDICTION_CACHE_SIZE": config.PREDICTION_CACHE_SIZE,
+            "MICROBATCH_ENABLED": config.MICROBATCH_ENABLED,
+            "INFERENCE_WORKERS": config.INFERENCE_WORKERS,
+        },
+    }
+
+
+# ------------------------------------------------------------
+# 📦 Dataset : chargement, rafraîchissement, mémoire
+# ------------------------------------------------------------
+def bench_dataset(rows: int, delta_rows: int, seed: int = 0) -> dict:
+    """Mesures sur un dataset synthétique de `rows` lignes, dans un dossier temporaire."""
+    from api import datastore
+
+    result = {"rows": rows}
+    with tempfile.TemporaryDirectory(prefix="bench_dpe_") as workdir:
+        datastore.STORE_DIR = os.path.join(workdir, ".store")  # store du benchmark, pas celui de data/
+        os.makedirs(datastore.STORE_DIR)
+        csv_path = os.path.join(workdir, "donnees_dpe_73_clean.csv")
+
+        with timed(result, "generate_s"):
+            df = synthetic_frame(rows, seed)
+        with timed(result, "write_csv_s"):
+            df.to_csv(csv_path, index=False)
+        result["csv_mb"] = round(os.path.getsize(csv_path) / 1e6, 1)
+        # Delta d'un rafraîchissement : lignes récentes + 10 % de DPE déjà connus (renvoyés par l'API ADEME)
+        known = df.tail(min(delta_rows // 10, rows))
+        delta = pd.concat([known, synthetic_frame(delta_rows - len(known), seed + 1, first_id=rows,
+                                                  start="2025-06-01", end="2025-07-31")], ignore_index=True)
+        del df
+
+        with timed(result, "read_csv_s"):
+            df_csv = pd.read_csv(csv_path, low_memory=False)
+        result["read_csv_mb"] = frame_mb(df_csv)
+        del df_csv
+
+        with timed(result, "store_build_s"):
+            datastore.ensure_store(csv_path)
+        with timed(result, "load_dataset_s"):
+            df_store = datastore.load_dataset(csv_path)
+        result["load_dataset_mb"] = frame_mb(df_store)
+        del df_store
+        with timed(result, "load_two_columns_s"):
+            datastore.load_dataset(csv_path, columns=["etiquette_dpe", "date_reception_dpe"])
+        with timed(result, "read_metadata_s"):
+            datastore.read_metadata(csv_path)
+
+        result["delta_rows"] = delta_rows
+        with timed(result, "append_rows_s"):
+            summary = datastore.append_rows(csv_path, delta)
+        result["appended_rows"] = summary["new_rows"]
+        with timed(result, "load_after_append_s"):
+            datastore.load_dataset(csv_path)
+
+        # Chemin historique : relecture, concaténation, déduplication et réécriture du CSV
+        with timed(result, "full_rewrite_s"):
+            merged = pd.concat([pd.read_csv(csv_path, low_memory=False), delta], ignore_index=True)
+            merged = merged.drop_duplicates(subset=["numero_dpe"], keep="last")
+            merged.to_csv(os.path.join(workdir, "rewrite.csv"), index=False)
+        del merged
+
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+# ------------------------------------------------------------
+# 🔮 Prédictions : débit et latences selon la concurrence
+# ------------------------------------------------------------
+def bench_predict_in_process(levels, requests: int, batch_sizes) -> dict:
+    """Chemins de l'API appelés en mémoire (exécuteur d'inférence, table, cache), sans réseau."""
+    from api import main
+    from api.models_loader import process_rss_mb
+
+    result = {"mode": "in_process"}
+    with timed(result, "models_load_s"):
+        main._warm_up(main.REGISTRY.current().models)
+    result["rss_after_load_mb"] = round(process_rss_mb() or 0, 1)
+
+    # Payloads différents à chaque niveau : le cache de prédictions ne sert pas d'un niveau à l'autre
+    result["single"] = {
+        f"c{c}": asyncio.run(_load_async(main._predict_single, make_payloads(requests, seed=1000 + c), c))
+        for c in levels
+    }
+
+    async def predict_batch(rows):
+        return await main.INFERENCE.run(main._predict_with, rows)
+
+    result["batch"] = {}
+    for size in batch_sizes:
+        for c in levels:
+            batches = [make_payloads(size, seed=size * 100 + c * 10 + i) for i in range(max(2 * c, 4))]
+            stats = asyncio.run(_load_async(predict_batch, batches, c))
+            stats["rows_per_s"] = round(stats["req_per_s"] * size, 1)
+            result["batch"][f"rows{size}_c{c}"] = stats
+    result["rss_after_predict_mb"] = round(process_rss_mb() or 0, 1)
+    return result
+
+
+def _load_threads(call, items: list, clients: int) -> dict:
+    """call(item) -> bool (succès) sur un pool de `clients` threads ; mêmes statistiques que _load_async."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    def timed_call(item):
+        t0 = time.perf_counter()
+        ok = call(item)
+        return time.perf_counter() - t0, ok
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        outcomes = list(pool.map(timed_call, items))
+    elapsed = time.perf_counter() - t0
+    return summarize([lat for lat, ok in outcomes if ok], elapsed, sum(not ok for _, ok in outcomes))
+
+
+def bench_predict_http(url: str, levels, requests: int, batch_sizes) -> dict:
+    """Mêmes mesures via l'API HTTP (aller-retour réseau et sérialisation JSON inclus)."""
+    import threading
+
+    import requests as http
+
+    local = threading.local()
+
+    def post(path, payload, timeout):
+        if not hasattr(local, "session"):
+            local.session = http.Session()
+        try:
+            return local.session.post(f"{url}{path}", json=payload, timeout=timeout).status_code == 200
+        except http.RequestException:
+            return False
+
+    result = {"mode": "http", "url": url}
+    result["single"] = {
+        f"c{c}": _load_threads(lambda row: post("/predict_all", row, 60), make_payloads(requests, seed=1000 + c), c)
+        for c in levels
+    }
+    result["batch"] = {}
+    for size in batch_sizes:
+        for c in levels:
+            batches = [make_payloads(size, seed=size * 100 + c * 10 + i) for i in range(max(2 * c, 4))]
+            stats = _load_threads(lambda rows: post("/predict_batch", rows, 600), batches, c)
+            stats["rows_per_s"] = round(stats["req_per_s"] * size, 1)
+            result["batch"][f"rows{size}_c{c}"] = stats
+    return result
+
+
+# ------------------------------------------------------------
+# 🔍 Comparaison de deux exécutions
+# ------------------------------------------------------------
+def _flatten(node, prefix: str = "") -> dict:
+    if isinstance(node, dict):
+        flat = {}
+        for key, value in node.items():
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        return flat
+    return {prefix[:-1]: node}
+
+
+def _lower_is_better(key: str):
+    """True (durée, mémoire), False (débit) ou None (valeur non comparée)."""
+    name = key.rsplit(".", 1)[-1]
+    if name.endswith("_per_s"):
+        return False
+    if name.endswith(("_s", "_ms", "_mb")) and name not in ("csv_mb",):
+        return True
+    return None
+
+
+def compare(old: dict, new: dict, threshold: float = 0.10) -> list:
+    """Affiche l'évolution de chaque mesure ; renvoie les régressions au-delà de `threshold`."""
+    old_flat, new_flat = _flatten(old.get("results", {})), _flatten(new.get("results", {}))
+    print(f"Avant : {old['environment'].get('commit')}  Après : {new['environment'].get('commit')}")
+    regressions = []
+    for key in sorted(set(old_flat) & set(new_flat)):
+        lower = _lower_is_better(key)
+        a, b = old_flat[key], new_flat[key]
+        if lower is None or not isinstance(a, (int, float)) or not isinstance(b, (int, float)) or a <= 0:
+            continue
+        ratio = b / a
+        worse = ratio - 1 if lower else 1 - ratio
+        flag = "  ⚠️" if worse > threshold else ""
+        print(f"{key:55s} {a:>12,.4g} -> {b:>12,.4g}  ({ratio - 1:+.1%}){flag}")
+        if worse > threshold:
+            regressions.append(key)
+    return regressions
+
+
+# ------------------------------------------------------------
+# 🚀 CLI
+# ------------------------------------------------------------
+def run(args) -> dict:
+    results = {}
+    if not args.skip_predict:
+        print("[INFO] Prédictions...")
+        if args.url:
+            results["predict"] = bench_predict_http(args.url, args.concurrency, args.requests, args.batch_sizes)
+        else:
+            results["predict"] = bench_predict_in_process(args.concurrency, args.requests, args.batch_sizes)
+    if not args.skip_dataset:
+        results["dataset"] = {}
+        for rows in args.sizes:
+            print(f"[INFO] Dataset synthétique : {rows:,} lignes...")
+            results["dataset"][f"rows{rows}"] = bench_dataset(rows, min(args.delta_rows, rows))
+    return {"environment": environment(), "results": results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_run = sub.add_parser("run", help="Exécute la suite et enregistre le JSON")
+    p_run.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), help="Tailles de dataset")
+    p_run.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    p_run.add_argument("--requests", type=int, default=500, help="Prédictions unitaires par niveau")
+    p_run.add_argument("--batch-sizes", type=int, nargs="+", default=list(DEFAULT_BATCH_SIZES))
+    p_run.add_argument("--delta-rows", type=int, default=5000, help="Lignes ajoutées par le rafraîchissement")
+    p_run.add_argument("--url", default=None, help="URL de l'API (sinon prédictions en mémoire)")
+    p_run.add_argument("--skip-predict", action="store_true")
+    p_run.add_argument("--skip-dataset", action="store_true")
+    p_run.add_argument("--out", default=None, help="Fichier JSON (défaut : benchmarks/results/<commit>.json)")
+
+    p_cmp = sub.add_parser("compare", help="Compare deux fichiers de résultats")
+    p_cmp.add_argument("old")
+    p_cmp.add_argument("new")
+    p_cmp.add_argument("--threshold", type=float, default=0.10, help="Dégradation tolérée (0.10 = 10 %%)")
+
+    args = parser.parse_args()
+    if args.command == "compare":
+        with open(args.old, encoding="utf-8") as f:
+            old = json.load(f)
+        with open(args.new, encoding="utf-8") as f:
+            new = json.load(f)
+        regressions = compare(old, new, args.threshold)
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+        sys.exit(1 if regressions else 0)
+
+    report = run(args)
+    out = args.out or os.path.join(RESULTS_DIR, f"{report['environment']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"✅ Résultats enregistrés : {out}")
+
+
+if __name__ == "__main__":
+    main()
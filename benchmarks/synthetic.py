@@ -0,0 +1,447 @@
+# ============================================================
+# 🧪 Générateur de datasets DPE synthétiques (tests à l'échelle)
+# ============================================================
+"""
+Lignes synthétiques au schéma de donnees_dpe_73_clean.csv, avec des
+distributions jointes plausibles plutôt que des tirages indépendants :
+
+- localisation : département (pondéré par sa population) -> code postal ->
+  commune, latitude / longitude autour du centre du code postal, classe
+  d'altitude et zone climatique du territoire ;
+- bâti : Ancien / Neuf -> année (puis période) de construction -> qualité
+  d'isolation ; type de bâtiment selon la commune (stations, villes) ->
+  surface habitable ;
+- énergie : énergie de chauffage selon l'ancienneté et l'altitude ->
+  conso_5_usages_par_m2_ef (isolation, altitude, type, énergie) -> énergie
+  primaire et émissions -> etiquette_dpe / etiquette_ges par les seuils du
+  DPE 2021 (double seuil énergie / climat), coûts par usage.
+
+L'écriture est faite par blocs (CSV, CSV gzip ou Parquet) : la mémoire est
+constante quelle que soit la taille demandée, jusqu'à des dizaines de
+millions de lignes. Un même (seed, chunk_rows) donne le même fichier.
+
+Usage (depuis la racine du projet) :
+    python -m benchmarks.synthetic --rows 1000000 --out /tmp/dpe_73_1M.csv
+    python -m benchmarks.synthetic --rows 30000000 --departments all --out /tmp/dpe_france.parquet
+"""
+import argparse
+import gzip
+import os
+import time
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+# ------------------------------------------------------------
+# 🗺️ Territoire
+# ------------------------------------------------------------
+ALTITUDES = ["inférieur à 400m", "400-800m", "supérieur à 800m"]
+
+# Communes de Savoie : code postal, nom, latitude, longitude, altitude, part des appartements, poids
+SAVOIE_COMMUNES = [
+    ("73000", "Chambéry", 45.566, 5.921, 0, 0.70, 60),
+    ("73100", "Aix-les-Bains", 45.688, 5.915, 0, 0.65, 30),
+    ("73200", "Albertville", 45.676, 6.392, 0, 0.55, 20),
+    ("73290", "La Motte-Servolex", 45.595, 5.877, 0, 0.35, 12),
+    ("73490", "La Ravoire", 45.561, 5.961, 0, 0.45, 8),
+    ("73190", "Challes-les-Eaux", 45.547, 5.985, 0, 0.40, 4),
+    ("73800", "Montmélian", 45.502, 6.047, 0, 0.35, 5),
+    ("73110", "La Rochette", 45.457, 6.108, 0, 0.30, 3),
+    ("73300", "Saint-Jean-de-Maurienne", 45.276, 6.346, 1, 0.45, 8),
+    ("73400", "Ugine", 45.751, 6.416, 1, 0.40, 5),
+    ("73600", "Moûtiers", 45.485, 6.532, 1, 0.60, 4),
+    ("73130", "Saint-Étienne-de-Cuines", 45.350, 6.280, 1, 0.20, 2),
+    ("73700", "Bourg-Saint-Maurice", 45.618, 6.769, 2, 0.75, 7),
+    ("73500", "Modane", 45.200, 6.671, 2, 0.60, 3),
+    ("73120", "Courchevel", 45.415, 6.634, 2, 0.90, 5),
+    ("73150", "Val-d'Isère", 45.448, 6.980, 2, 0.92, 3),
+    ("73440", "Les Belleville", 45.360, 6.510, 2, 0.90, 3),
+]
+
+# Départements métropolitains : code;préfecture;lat;lon;zone climatique;montagne;population (centaines de milliers)
+DEPARTMENTS_TABLE = """
+01;Bourg-en-Bresse;46.205;5.226;H1;0;6.6
+02;Laon;49.564;3.620;H1;0;5.3
+03;Moulins;46.566;3.333;H1;0;3.4
+04;Digne-les-Bains;44.092;6.236;H2;1;1.6
+05;Gap;44.559;6.079;H1;1;1.4
+06;Nice;43.710;7.262;H3;1;11.0
+07;Privas;44.735;4.599;H2;1;3.3
+08;Charleville-Mézières;49.762;4.726;H1;0;2.7
+09;Foix;42.965;1.607;H2;1;1.5
+10;Troyes;48.297;4.074;H1;0;3.1
+11;Carcassonne;43.213;2.349;H3;0;3.8
+12;Rodez;44.350;2.575;H2;1;2.8
+13;Marseille;43.296;5.370;H3;0;20.4
+14;Caen;49.183;-0.370;H1;0;6.9
+15;Aurillac;44.927;2.440;H1;1;1.4
+16;Angoulême;45.649;0.156;H2;0;3.5
+17;La Rochelle;46.160;-1.151;H2;0;6.6
+18;Bourges;47.081;2.399;H2;0;3.0
+19;Tulle;45.267;1.772;H1;1;2.4
+2A;Ajaccio;41.919;8.738;H3;1;1.6
+2B;Bastia;42.697;9.450;H3;1;1.8
+21;Dijon;47.322;5.041;H1;0;5.3
+22;Saint-Brieuc;48.514;-2.765;H2;0;6.0
+23;Guéret;46.171;1.871;H1;0;1.2
+24;Périgueux;45.184;0.721;H2;0;4.1
+25;Besançon;47.238;6.024;H1;1;5.4
+26;Valence;44.933;4.892;H2;0;5.2
+27;Évreux;49.024;1.151;H1;0;6.0
+28;Chartres;48.446;1.489;H1;0;4.3
+29;Quimper;47.996;-4.102;H2;0;9.2
+30;Nîmes;43.837;4.360;H3;0;7.5
+31;Toulouse;43.605;1.444;H2;0;14.2
+32;Auch;43.646;0.586;H2;0;1.9
+33;Bordeaux;44.838;-0.579;H2;0;16.4
+34;Montpellier;43.611;3.877;H3;0;12.0
+35;Rennes;48.117;-1.678;H2;0;11.0
+36;Châteauroux;46.811;1.691;H2;0;2.2
+37;Tours;47.394;0.685;H2;0;6.1
+38;Grenoble;45.188;5.725;H1;1;12.7
+39;Lons-le-Saunier;46.675;5.555;H1;1;2.6
+40;Mont-de-Marsan;43.894;-0.500;H2;0;4.1
+41;Blois;47.586;1.336;H2;0;3.3
+42;Saint-Étienne;45.440;4.387;H1;0;7.7
+43;Le Puy-en-Velay;45.043;3.885;H1;1;2.3
+44;Nantes;47.218;-1.554;H2;0;14.3
+45;Orléans;47.903;1.909;H1;0;6.8
+46;Cahors;44.448;1.441;H2;0;1.7
+47;Agen;44.203;0.616;H2;0;3.3
+48;Mende;44.518;3.500;H2;1;0.8
+49;Angers;47.478;-0.563;H2;0;8.2
+50;Saint-Lô;49.116;-1.091;H2;0;5.0
+51;Châlons-en-Champagne;48.957;4.365;H1;0;5.7
+52;Chaumont;48.111;5.139;H1;0;1.7
+53;Laval;48.073;-0.770;H2;0;3.1
+54;Nancy;48.692;6.184;H1;0;7.3
+55;Bar-le-Duc;48.773;5.160;H1;0;1.8
+56;Vannes;47.658;-2.760;H2;0;7.6
+57;Metz;49.119;6.176;H1;0;10.4
+58;Nevers;46.990;3.159;H1;0;2.0
+59;Lille;50.629;3.057;H1;0;26.1
+60;Beauvais;49.430;2.081;H1;0;8.3
+61;Alençon;48.432;0.091;H1;0;2.8
+62;Arras;50.291;2.777;H1;0;14.6
+63;Clermont-Ferrand;45.778;3.087;H1;1;6.6
+64;Pau;43.295;-0.371;H2;1;6.8
+65;Tarbes;43.233;0.078;H2;1;2.3
+66;Perpignan;42.699;2.895;H3;1;4.8
+67;Strasbourg;48.573;7.752;H1;0;11.4
+68;Colmar;48.079;7.358;H1;1;7.7
+69;Lyon;45.764;4.836;H1;0;19.0
+70;Vesoul;47.622;6.155;H1;0;2.3
+71;Mâcon;46.307;4.829;H1;0;5.5
+72;Le Mans;48.006;0.199;H2;0;5.7
+73;Chambéry;45.566;5.921;H1;1;4.4
+74;Annecy;45.899;6.129;H1;1;8.4
+75;Paris;48.857;2.352;H1;0;21.3
+76;Rouen;49.443;1.099;H1;0;12.5
+77;Melun;48.540;2.660;H1;0;14.4
+78;Versailles;48.805;2.120;H1;0;14.5
+79;Niort;46.324;-0.465;H2;0;3.7
+80;Amiens;49.894;2.296;H1;0;5.7
+81;Albi;43.928;2.146;H2;0;3.9
+82;Montauban;44.018;1.355;H2;0;2.6
+83;Toulon;43.124;5.928;H3;0;10.8
+84;Avignon;43.949;4.806;H3;0;5.6
+85;La Roche-sur-Yon;46.670;-1.426;H2;0;6.9
+86;Poitiers;46.580;0.340;H2;0;4.4
+87;Limoges;45.834;1.261;H1;0;3.7
+88;Épinal;48.173;6.451;H1;1;3.6
+89;Auxerre;47.798;3.567;H1;0;3.3
+90;Belfort;47.640;6.863;H1;0;1.4
+91;Évry-Courcouronnes;48.629;2.441;H1;0;13.0
+92;Nanterre;48.892;2.207;H1;0;16.2
+93;Bobigny;48.908;2.440;H1;0;16.6
+94;Créteil;48.790;2.455;H1;0;14.1
+95;Cergy;49.036;2.076;H1;0;12.5
+"""
+
+DEPARTMENTS = {}
+for _line in DEPARTMENTS_TABLE.strip().splitlines():
+    _code, _pref, _lat, _lon, _zone, _mountain, _pop = _line.split(";")
+    DEPARTMENTS[_code] = (_pref, float(_lat), float(_lon), _zone, _mountain == "1", float(_pop))
+
+
+def postal_prefix(dept: str) -> str:
+    """Préfixe des codes postaux d'un département (la Corse partage le préfixe 20)."""
+    return {"2A": "201", "2B": "202"}.get(dept, dept)
+
+
+@lru_cache(maxsize=None)
+def department_postcodes(dept: str) -> pd.DataFrame:
+    """
+    Codes postaux d'un département avec commune, centre, altitude, part des
+    appartements et poids. Savoie : communes réelles ; ailleurs : la
+    préfecture et des codes postaux placés autour (déterministe par département).
+    """
+    if dept == "73":
+        cols = ["code_postal_ban", "nom_commune_ban", "lat", "lon", "altitude", "share_flat", "weight"]
+        df = pd.DataFrame(SAVOIE_COMMUNES, columns=cols)
+        df["zone_climatique"] = "H1"
+        return df
+
+    prefecture, lat, lon, zone, mountain, _ = DEPARTMENTS[dept]
+    rng = np.random.default_rng(int(dept, 36))
+    prefix = postal_prefix(dept)
+    width = 5 - len(prefix)
+    n = 20 if dept == "75" else (9 if width == 2 else 30)
+    if dept == "75":
+        codes = [f"750{i:02d}" for i in range(1, 21)]
+        names = ["Paris"] * 20
+    else:
+        suffixes = np.sort(rng.choice(np.arange(1, 10 ** width // 10), n - 1, replace=False) * 10)
+        codes = [prefix + "0" * width] + [f"{prefix}{s:0{width}d}" for s in suffixes]
+        names = [prefecture] + [f"Commune {c}" for c in codes[1:]]
+    spread = np.r_[0.0, rng.uniform(0.08, 0.45, n - 1)]
+    angle = rng.uniform(0, 2 * np.pi, n)
+    altitude_probs = [0.45, 0.35, 0.20] if mountain else [0.90, 0.10, 0.0]
+    return pd.DataFrame({
+        "code_postal_ban": codes,
+        "nom_commune_ban": names,
+        "lat": lat + spread * np.sin(angle),
+        "lon": lon + spread * np.cos(angle) * 1.4,
+        "altitude": np.r_[0, rng.choice(3, n - 1, p=altitude_probs)],
+        "share_flat": np.r_[0.95 if dept == "75" else 0.65, rng.uniform(0.15, 0.45, n - 1)],
+        "weight": np.r_[n * 0.6, rng.gamma(1.5, 1.0, n - 1)],
+        "zone_climatique": zone,
+    })
+
+
+@lru_cache(maxsize=None)
+def territory(departments: tuple) -> pd.DataFrame:
+    """Codes postaux des départements demandés, pondérés par population (probabilités normalisées)."""
+    parts = []
+    for dept in departments:
+        part = department_postcodes(dept).copy()
+        part["departement"] = dept
+        part["prob"] = part["weight"] / part["weight"].sum() * DEPARTMENTS[dept][5]
+        parts.append(part)
+    df = pd.concat(parts, ignore_index=True)
+    df["prob"] /= df["prob"].sum()
+    return df
+
+
+# ------------------------------------------------------------
+# 🏠 Bâti et énergie
+# ------------------------------------------------------------
+QUALITIES = ["insuffisante", "moyenne", "bonne", "très bonne"]
+INERTIA = (["Légère", "Moyenne", "Lourde", "Très lourde"], [0.15, 0.35, 0.35, 0.15])
+
+# Énergie de chauffage (libellé ADEME, libellé court, facteur énergie primaire, kgCO2/kWh, €/kWh)
+ENERGIES = [
+    ("Électricité", "Électricité", 2.3, 0.079, 0.25),
+    ("Gaz naturel", "Gaz", 1.0, 0.227, 0.11),
+    ("Fioul domestique", "Fioul", 1.0, 0.324, 0.12),
+    ("Bois – Bûches", "Bois", 1.0, 0.030, 0.07),
+]
+
+# Tranches d'années de construction des logements anciens (début, fin, poids)
+ERAS = [(1700, 1899, 0.10), (1900, 1948, 0.12), (1949, 1974, 0.28), (1975, 2000, 0.30), (2001, 2012, 0.20)]
+
+# Modalités ADEME de periode_construction (dernière année incluse, libellé) ; au-delà : "après 2021"
+PERIODS = [(1947, "avant 1948"), (1974, "1948-1974"), (1977, "1975-1977"), (1982, "1978-1982"),
+           (1988, "1983-1988"), (2000, "1989-2000"), (2005, "2001-2005"), (2012, "2006-2012"),
+           (2021, "2013-2021")]
+LAST_PERIOD = "après 2021"
+
+# Seuils DPE 2021 : énergie primaire (kWh/m²/an) et émissions (kgCO2/m²/an), classes A à F
+LABELS = np.array(list("ABCDEFG"))
+EP_THRESHOLDS = [70, 110, 180, 250, 330, 420]
+GES_THRESHOLDS = [6, 11, 30, 50, 70, 100]
+
+
+def _pick(rng, probs: np.ndarray) -> np.ndarray:
+    """Un tirage par ligne dans des probabilités ligne à ligne (n, k) -> indices."""
+    u = rng.random(len(probs))[:, None]
+    return np.minimum((u > np.cumsum(probs, axis=1)).sum(axis=1), probs.shape[1] - 1)
+
+
+def _periode(years: np.ndarray) -> np.ndarray:
+    out = np.full(len(years), LAST_PERIOD, dtype=object)
+    for bound, label in reversed(PERIODS):
+        out[years <= bound] = label
+    return out
+
+
+def _quality_probs(years: np.ndarray) -> np.ndarray:
+    """Probabilités (insuffisante .. très bonne) selon l'année de construction."""
+    table = np.array([[0.45, 0.35, 0.15, 0.05], [0.20, 0.40, 0.30, 0.10],
+                      [0.05, 0.30, 0.45, 0.20], [0.00, 0.10, 0.40, 0.50]])
+    return table[np.searchsorted([1974, 2000, 2012], years)]
+
+
+def generate_chunk(rng, n: int, first_id: int = 0, start: str = "2021-07-01", end: str = "2025-06-30",
+                   departments: tuple = ("73",)) -> pd.DataFrame:
+    """Un bloc de n logements (numero_dpe à partir de first_id)."""
+    places = territory(tuple(departments))
+    where = places.iloc[rng.choice(len(places), n, p=places["prob"].to_numpy())]
+    altitude = where["altitude"].to_numpy()
+    df = pd.DataFrame({
+        "code_postal_ban": where["code_postal_ban"].to_numpy(),
+        "nom_commune_ban": where["nom_commune_ban"].to_numpy(),
+        "latitude": np.round(where["lat"].to_numpy() + rng.normal(0, 0.012, n), 6),
+        "longitude": np.round(where["lon"].to_numpy() + rng.normal(0, 0.016, n), 6),
+        "classe_altitude": np.array(ALTITUDES, dtype=object)[altitude],
+        "zone_climatique": where["zone_climatique"].to_numpy(),
+    })
+
+    # --- Ancien / Neuf, année, type de bâtiment, surface ---
+    new = rng.random(n) < 0.15
+    era = rng.choice(len(ERAS), n, p=[w for _, _, w in ERAS])
+    lo, hi = np.array([e[0] for e in ERAS])[era], np.array([e[1] for e in ERAS])[era]
+    years = np.where(new, rng.integers(2013, 2026, n), lo + (rng.random(n) * (hi - lo + 1)).astype(int))
+    flat = rng.random(n) < np.where(new, 0.60, where["share_flat"].to_numpy())
+    surface = np.where(flat, rng.lognormal(np.log(55), 0.35, n), rng.lognormal(np.log(110), 0.30, n))
+    surface = np.round(np.clip(surface, 9, 450), 1)
+    df["Logement"] = np.where(new, "Neuf", "Ancien")
+    df["type_batiment"] = np.where(flat, "appartement", "maison")
+    df["annee_construction"] = years
+    df["periode_construction"] = _periode(years)
+    df["surface_habitable_logement"] = surface
+
+    # --- Isolation, inertie, traversant ---
+    q_walls = _pick(rng, _quality_probs(years))
+    q_windows = _pick(rng, _quality_probs(years))
+    qualities = np.array(QUALITIES, dtype=object)
+    df["qualite_isolation_murs"] = qualities[q_walls]
+    df["qualite_isolation_menuiseries"] = qualities[q_windows]
+    df["qualite_isolation_enveloppe"] = qualities[(q_walls + q_windows) // 2]
+    df["classe_inertie_batiment"] = rng.choice(INERTIA[0], n, p=INERTIA[1])
+    df["logement_traversant"] = np.where(rng.random(n) < np.where(flat, 0.45, 0.80), "oui", "non")
+    df["isolation_toiture"] = (rng.random(n) < 0.3 + 0.2 * q_walls).astype(int)
+    df["indicateur_confort_ete"] = np.array(["insuffisant", "moyen", "bon"], dtype=object)[
+        np.minimum(q_walls + rng.integers(-1, 2, n), 2).clip(0)]
+    df["ubat_w_par_m2_k"] = np.round(np.clip(2.1 - 0.45 * (q_walls + q_windows) / 2 + rng.normal(0, 0.2, n),
+                                             0.15, 3.0), 3)
+
+    # --- Énergie : neuf et altitude -> électricité et bois plus fréquents ---
+    energy_probs = np.where(new[:, None], [0.60, 0.15, 0.0, 0.25],
+                            np.where((altitude == 2)[:, None], [0.55, 0.05, 0.15, 0.25], [0.38, 0.30, 0.14, 0.18]))
+    energy = _pick(rng, energy_probs)
+    ep_factor, ges_factor, price = (np.array([e[i] for e in ENERGIES]) for i in (2, 3, 4))
+    df["type_energie_principale_chauffage"] = np.array([e[0] for e in ENERGIES], dtype=object)[energy]
+    df["energie_chauffage"] = np.array([e[1] for e in ENERGIES], dtype=object)[energy]
+    ecs = np.where(rng.random(n) < 0.7, energy, 0)
+    df["type_energie_principale_ecs"] = np.array([e[0] for e in ENERGIES], dtype=object)[ecs]
+
+    # --- Consommation, étiquettes, émissions, coûts ---
+    base = np.where(new, 75.0, 270 - 25 * (q_walls + q_windows))
+    ef = base * np.array([1.0, 1.12, 1.25])[altitude] * np.where(flat, 0.85, 1.0)
+    ef = ef * np.where(energy == 0, 0.65, 1.0) * rng.lognormal(0, 0.25, n)
+    ef = np.round(np.clip(ef, 25, 900), 1)
+    ep = ef * ep_factor[energy]
+    ges = np.round(ef * ges_factor[energy], 1)
+    label_ep = np.searchsorted(EP_THRESHOLDS, ep, side="left")
+    label_ges = np.searchsorted(GES_THRESHOLDS, ges, side="left")
+    df["conso_5_usages_par_m2_ef"] = ef
+    df["conso_5_usages_par_m2_ep"] = np.round(ep, 1)
+    df["emission_ges_5_usages_par_m2"] = ges
+    df["etiquette_dpe"] = LABELS[np.maximum(label_ep, label_ges)]
+    df["etiquette_ges"] = LABELS[label_ges]
+
+    total = ef * surface
+    heating, hot_water = total * rng.uniform(0.55, 0.75, n), total * rng.uniform(0.12, 0.22, n)
+    df["conso_5_usages_ef"] = np.round(total, 1)
+    df["conso_chauffage_ef"] = np.round(heating, 1)
+    df["conso_ecs_ef"] = np.round(hot_water, 1)
+    df["emission_ges_5_usages"] = np.round(ges * surface, 1)
+    df["cout_chauffage"] = np.round(heating * price[energy], 2)
+    df["cout_ecs"] = np.round(hot_water * price[ecs], 2)
+    df["cout_refroidissement"] = np.round(np.where(rng.random(n) < 0.08, surface * rng.uniform(0.5, 2.5, n), 0), 2)
+    df["cout_eclairage"] = np.round(surface * 3.0 * price[0], 2)
+    df["cout_auxiliaires"] = np.round(surface * rng.uniform(1.0, 4.0, n) * price[0], 2)
+    df["cout_total_5_usages"] = df[["cout_chauffage", "cout_ecs", "cout_refroidissement",
+                                    "cout_eclairage", "cout_auxiliaires"]].sum(axis=1).round(2)
+
+    # --- Réception du DPE ---
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days + 1
+    dates = pd.Timestamp(start) + pd.to_timedelta(np.sort(rng.integers(0, days, n)), unit="D")
+    df["date_reception_dpe"] = dates.strftime("%Y-%m-%d")
+    df["annee_reception_DPE"] = dates.year
+    dept = where["departement"].to_numpy()
+    df["numero_dpe"] = [f"23{d}E{i:010d}" for d, i in zip(dept, range(first_id, first_id + n))]
+    return df
+
+
+def synthetic_frame(n: int, seed: int = 0, first_id: int = 0, start: str = "2021-07-01",
+                    end: str = "2025-06-30", departments: tuple = ("73",)) -> pd.DataFrame:
+    """n logements en une seule DataFrame (petits volumes, benchmarks)."""
+    return generate_chunk(np.random.default_rng(seed), n, first_id, start, end, departments)
+
+
+def iter_chunks(rows: int, chunk_rows: int = 100_000, seed: int = 0, **kwargs):
+    """Blocs successifs de chunk_rows lignes (le dernier éventuellement plus court)."""
+    for i, offset in enumerate(range(0, rows, chunk_rows)):
+        rng = np.random.default_rng([seed, i])
+        yield generate_chunk(rng, min(chunk_rows, rows - offset), first_id=offset, **kwargs)
+
+
+def write_dataset(path: str, rows: int, chunk_rows: int = 100_000, seed: int = 0, **kwargs) -> dict:
+    """
+    Écrit `rows` lignes dans path (.csv, .csv.gz ou .parquet) bloc par bloc ;
+    chaque bloc est libéré après écriture (mémoire constante).
+    """
+    t0 = time.perf_counter()
+    parquet = path.endswith(".parquet")
+    if parquet:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        writer, schema = None, None
+    else:
+        handle = gzip.open(path, "wt", encoding="utf-8", newline="") if path.endswith(".gz") else \
+            open(path, "w", encoding="utf-8", newline="")
+
+    written = 0
+    try:
+        for chunk in iter_chunks(rows, chunk_rows, seed, **kwargs):
+            if parquet:
+                table = pa.Table.from_pandas(chunk, schema=schema, preserve_index=False)
+                if writer is None:
+                    schema = table.schema
+                    writer = pq.ParquetWriter(path, schema, compression="zstd")
+                writer.write_table(table)
+            else:
+                chunk.to_csv(handle, header=written == 0, index=False)
+            written += len(chunk)
+            elapsed = time.perf_counter() - t0
+            print(f"[INFO] {written:,} / {rows:,} lignes ({written / elapsed:,.0f} lignes/s)")
+    finally:
+        if parquet:
+            if writer is not None:
+                writer.close()
+        else:
+            handle.close()
+
+    return {"path": path, "rows": written, "mb": round(os.path.getsize(path) / 1e6, 1),
+            "seconds": round(time.perf_counter() - t0, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, required=True, help="Nombre de lignes à générer")
+    parser.add_argument("--out", required=True, help="Fichier de sortie (.csv, .csv.gz ou .parquet)")
+    parser.add_argument("--departments", nargs="+", default=["73"],
+                        help="Codes départements (ex. 73 74 38) ou 'all' pour la métropole")
+    parser.add_argument("--chunk-rows", type=int, default=100_000, help="Lignes par bloc (borne la mémoire)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--start", default="2021-07-01", help="Première date de réception")
+    parser.add_argument("--end", default="2025-06-30", help="Dernière date de réception")
+    args = parser.parse_args()
+
+    departments = tuple(DEPARTMENTS) if args.departments == ["all"] else tuple(args.departments)
+    unknown = [d for d in departments if d not in DEPARTMENTS]
+    if unknown:
+        parser.error(f"Départements inconnus : {', '.join(unknown)}")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    summary = write_dataset(args.out, args.rows, args.chunk_rows, args.seed,
+                            start=args.start, end=args.end, departments=departments)
+    print(f"✅ {summary['rows']:,} lignes écrites dans {summary['path']} ({summary['mb']} Mo, {summary['seconds']} s)")
+
+
+if __name__ == "__main__":
+    main()
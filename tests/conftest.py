@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Racine du projet importable (api, benchmarks) quel que soit le dossier de lancement
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Caches et stores des tests hors de data/.store (lu par api.config à l'import)
+os.environ.setdefault("STORE_DIR", tempfile.mkdtemp(prefix="dpe-store-"))
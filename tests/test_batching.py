@@ -0,0 +1,32 @@
+"""Micro-batching : file d'attente bornée, rafale au-delà rejetée (QueueFullError -> 429)."""
+import asyncio
+
+from api.batching import MicroBatcher
+from api.executor import QueueFullError
+
+
+async def run(fn, rows):
+    await asyncio.sleep(0.01)
+    return fn(rows)
+
+
+def test_burst_beyond_queue_bound_is_rejected():
+    batcher = MicroBatcher(lambda rows: [row * 10 for row in rows], run, max_batch=2, max_wait_ms=1, max_queue=2)
+
+    async def burst():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(10)), return_exceptions=True)
+
+    results = asyncio.run(burst())
+
+    assert results[:4] == [0, 10, 20, 30]  # 2 lots de 2 lignes en attente au plus
+    assert all(isinstance(r, QueueFullError) for r in results[4:])
+    assert batcher.stats()["rejected"] == 6
+
+
+def test_unbounded_by_default():
+    batcher = MicroBatcher(lambda rows: rows, run, max_batch=2, max_wait_ms=1)
+
+    async def burst():
+        return await asyncio.gather(*(batcher.submit(i) for i in range(50)))
+
+    assert asyncio.run(burst()) == list(range(50))
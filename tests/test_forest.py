@@ -0,0 +1,50 @@
+"""Moteur compilé des RandomForest : prédictions identiques bit à bit à sklearn, après rechargement mmap."""
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from api import forest
+
+
+@pytest.fixture
+def data():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(600, 6))
+    X[:, 2] = rng.integers(0, 5, 600)  # valeurs répétées : comparaisons égales aux seuils
+    y_class = np.array(list("ABCDEFG"))[(X[:, 0] * 2 + X[:, 2]).astype(int) % 7]
+    y_reg = 100 + 30 * X[:, 0] - 12 * X[:, 1] ** 2 + 5 * X[:, 2] + rng.normal(size=600)
+    X_test = np.vstack([rng.normal(size=(400, 6)) * 1.5, X[:50]])
+    return X, y_class, y_reg, X_test
+
+
+def compile_reload(model, tmp_path, monkeypatch):
+    monkeypatch.setattr(forest, "MODELS_CACHE_DIR", str(tmp_path))
+    compiled = forest.compile_and_save(model, str(tmp_path / "model.joblib"))
+    assert compiled is not None  # vérification interne contre sklearn réussie
+    assert isinstance(compiled.forest.threshold, np.memmap)  # relu depuis les .npy en memory-map
+    return compiled
+
+
+def test_classifier_pipeline_is_bit_identical(data, tmp_path, monkeypatch):
+    X, y, _, X_test = data
+    model = Pipeline([
+        ("scale", StandardScaler()),
+        ("model", RandomForestClassifier(n_estimators=25, max_depth=8, random_state=0, n_jobs=1)),
+    ]).fit(X, y)
+
+    compiled = compile_reload(model, tmp_path, monkeypatch)
+
+    assert np.array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+    assert np.array_equal(compiled.predict(X_test), model.predict(X_test))
+    assert list(compiled.classes_) == list(model.classes_)
+
+
+def test_regressor_is_bit_identical(data, tmp_path, monkeypatch):
+    X, _, y, X_test = data
+    model = RandomForestRegressor(n_estimators=25, min_samples_leaf=2, random_state=0, n_jobs=1).fit(X, y)
+
+    compiled = compile_reload(model, tmp_path, monkeypatch)
+
+    assert np.array_equal(compiled.predict(X_test), model.predict(X_test))
@@ -0,0 +1,68 @@
+"""Ingestion ADEME contre le serveur bouchon : pagination "next", retries et reprise."""
+import pytest
+
+from api.ingestion import ingest
+from benchmarks.ademe_stub import make_rows, start_stub_server
+
+ROWS = 600
+START, END = "2023-01-01", "2025-12-31"
+
+
+class Crash(Exception):
+    pass
+
+
+@pytest.fixture
+def stub():
+    server, url = start_stub_server(ROWS, fail_rate=0.1)
+    endpoints = {"existants": f"{url}/dpe03existant/lines", "neufs": f"{url}/dpe02neuf/lines"}
+    yield endpoints
+    server.shutdown()
+
+
+def test_ingest_resumes_after_crash_without_duplicates(stub, tmp_path):
+    pages = []
+
+    def crash_after_some_pages(**page):
+        pages.append(page)
+        if len(pages) >= 15:
+            raise Crash("interruption simulée")
+
+    with pytest.raises(Crash):
+        ingest("73", START, END, endpoints=stub, freq="QS", checkpoint_dir=str(tmp_path),
+               progress=crash_after_some_pages, page_size=20)
+    interrupted = len(pages)
+
+    resumed = []
+    frames, checkpoint = ingest("73", START, END, endpoints=stub, freq="QS", checkpoint_dir=str(tmp_path),
+                                progress=lambda **page: resumed.append(page), page_size=20)
+
+    # Chaque dataset est complet, sans doublon, et la reprise n'a pas refait les pages reçues
+    assert set(frames) == {"existants", "neufs"}
+    for label, seed in (("existants", 0), ("neufs", 1)):
+        expected = {r["numero_dpe"] for r in make_rows(ROWS, seed=seed)}
+        ids = frames[label]["numero_dpe"]
+        assert len(ids) == ROWS
+        assert ids.is_unique
+        assert set(ids) == expected
+    total_pages = sum(st["pages"] for st in checkpoint.state.values())
+    assert interrupted + len(resumed) == total_pages
+    assert total_pages > 2 * ROWS // 20  # plusieurs pages par tranche : liens "next" suivis
+
+    checkpoint.clear()
+
+
+def test_ingest_corsica_queries_every_postal_prefix(tmp_path):
+    server, url = start_stub_server(300, dept="2A,2B,73")
+    try:
+        endpoints = {"existants": f"{url}/dpe03existant/lines"}
+        frames, checkpoint = ingest("2A", START, END, endpoints=endpoints, freq="YS",
+                                    checkpoint_dir=str(tmp_path), page_size=50)
+    finally:
+        server.shutdown()
+
+    expected = {r["numero_dpe"] for r in make_rows(300, dept="2A", seed=0)}
+    postcodes = frames["existants"]["code_postal_ban"].astype(str)
+    assert set(frames["existants"]["numero_dpe"]) == expected
+    assert postcodes.str[:3].isin(["200", "201"]).all()
+    checkpoint.clear()
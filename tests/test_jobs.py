@@ -0,0 +1,34 @@
+"""Verrou inter-processus : reprise d'un verrou orphelin sans supprimer celui d'un autre processus."""
+import json
+import subprocess
+import sys
+
+import pytest
+
+from api import jobs
+
+
+@pytest.fixture
+def dead_holder(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "JOBS_DIR", str(tmp_path))
+    proc = subprocess.Popen([sys.executable, "-c", "pass"])
+    proc.wait()  # processus terminé : pid orphelin
+    holder = {"pid": proc.pid, "job_id": "ancien", "since": "2025-01-01T00:00:00"}
+    with open(jobs.lock_path("refresh"), "w", encoding="utf-8") as f:
+        json.dump(holder, f)
+    return holder
+
+
+def test_orphan_lock_is_taken_over(dead_holder):
+    assert jobs.acquire_lock("refresh", "nouveau")
+    assert jobs.lock_holder("refresh")["job_id"] == "nouveau"
+    assert not jobs.acquire_lock("refresh", "autre")
+
+
+def test_late_stale_cleanup_keeps_the_fresh_lock(dead_holder):
+    # A et B voient tous deux le détenteur mort ; A reprend le verrou avant que B ne le supprime
+    assert jobs.acquire_lock("refresh", "A")
+    jobs._remove_stale_lock("refresh", dead_holder)
+
+    assert jobs.lock_holder("refresh")["job_id"] == "A"
+    assert not jobs.acquire_lock("refresh", "B")
@@ -0,0 +1,130 @@
+"""Table de prédictions précalculées : identique aux modèles sur la grille, repli sur les modèles sinon."""
+import os
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+
+from api import lookup
+from api.registry import model_fingerprint
+from api.inference import FEATURES, predict_rows, prepare_features
+
+CATEGORIES = {
+    "type_batiment": ["appartement", "maison"],
+    "type_energie_principale_chauffage": ["Gaz naturel", "Électricité"],
+    "classe_inertie_batiment": ["Légère", "Lourde"],
+    "qualite_isolation_murs": ["bonne", "insuffisante"],
+    "qualite_isolation_menuiseries": ["bonne", "moyenne"],
+    "classe_altitude": ["400-800m", "inférieur à 400m"],
+}
+NUMERIC = ["annee_construction", "surface_habitable_logement", "logement_traversant"]
+YEARS, SURFACES = (1950, 1990, 10), (50, 90, 20)
+
+
+def preprocessor():
+    return ColumnTransformer([
+        ("cat", OneHotEncoder(handle_unknown="ignore"), list(CATEGORIES)),
+        ("num", StandardScaler(), NUMERIC),
+    ])
+
+
+@pytest.fixture(scope="module")
+def models():
+    rng = np.random.default_rng(0)
+    n = 800
+    X = pd.DataFrame({col: rng.choice(cats, n) for col, cats in CATEGORIES.items()})
+    X["annee_construction"] = rng.integers(1900, 2021, n)
+    X["surface_habitable_logement"] = rng.uniform(15, 200, n).round()
+    X["logement_traversant"] = rng.integers(0, 2, n)
+    X = X[FEATURES]
+    conso = 400 - 1.5 * (X["annee_construction"] - 1900) + 40 * (X["type_batiment"] == "maison") + rng.normal(0, 5, n)
+    dpe = np.array(list("ABCDEFG"))[np.clip((conso // 60).astype(int), 0, 6)]
+    mpr = (conso > 250).astype(int)
+
+    prep_conso = preprocessor().fit(X)
+    return {
+        "dpe": Pipeline([("preprocess", preprocessor()), ("model", RandomForestClassifier(20, random_state=0))]).fit(X, dpe),
+        "mpr": Pipeline([("preprocess", preprocessor()), ("model", RandomForestClassifier(20, random_state=1))]).fit(X, mpr),
+        "preproc_conso": prep_conso,
+        "conso": RandomForestRegressor(20, random_state=0).fit(prep_conso.transform(X), conso),
+    }
+
+
+@pytest.fixture(scope="module")
+def tables(models, tmp_path_factory):
+    directory = str(tmp_path_factory.mktemp("lookup"))
+    model_set = SimpleNamespace(models=models, key="jeu-1", versions={})
+    lookup.build_table(model_set, YEARS, SURFACES, directory=directory, report_rows=200)
+    return lookup.LookupTables(directory, check_interval=0)
+
+
+def raw_rows(models, years, surfaces):
+    """Logements saisis comme par l'API (casse / accents libres, traversant en oui / non)."""
+    rows = []
+    for i, (year, surface) in enumerate(zip(years, surfaces)):
+        row = {col: cats[(i + j) % len(cats)].upper() for j, (col, cats) in enumerate(CATEGORIES.items())}
+        row.update(annee_construction=year, surface_habitable_logement=surface,
+                   logement_traversant="oui" if i % 2 else "non")
+        rows.append(row)
+    return prepare_features(pd.DataFrame(rows), models)
+
+
+class Live:
+    """Modèles appelés en repli : lignes reçues enregistrées."""
+
+    def __init__(self, models):
+        self.models, self.calls = models, []
+
+    def __call__(self, df):
+        self.calls.append(len(df))
+        return predict_rows(df, self.models)
+
+
+def test_grid_rows_match_live_models_exactly(models, tables):
+    df = raw_rows(models, [1950, 1960, 1970, 1980, 1990, 1960], [50, 70, 90, 50, 70, 90])
+    live = Live(models)
+
+    served = tables.predict_rows(df, "jeu-1", live)
+
+    assert live.calls == []  # toutes les lignes lues dans la table
+    assert served == predict_rows(df, models)
+
+
+def test_off_grid_rows_fall_back_to_models(models, tables):
+    df = raw_rows(models, [1960, 1963, 1970, 2005], [70, 70, 71.5, 50])
+    live = Live(models)
+
+    served = tables.predict_rows(df, "jeu-1", live)
+
+    assert live.calls == [3]  # seules les lignes hors grille passent par les modèles
+    assert served == predict_rows(df, models)
+
+
+def test_other_model_set_key_falls_back_to_models(models, tables):
+    df = raw_rows(models, [1950, 1960], [50, 70])
+    live = Live(models)
+
+    served = tables.predict_rows(df, "jeu-2", live)
+
+    assert live.calls == [2]  # table construite pour jeu-1 : ignorée
+    assert served == predict_rows(df, models)
+
+
+def test_table_refused_when_model_file_overwritten(models, tmp_path):
+    model_file = tmp_path / "model_conso.pkl"
+    model_file.write_bytes(b"v1")
+    model_set = SimpleNamespace(models=models, key="jeu-1", versions={"conso": "config"},
+                                paths={"conso": str(model_file)}, fingerprints={"conso": model_fingerprint(str(model_file))})
+    lookup.build_table(model_set, YEARS, SURFACES, directory=str(tmp_path / "lookup"), report_rows=50)
+    tables = lookup.LookupTables(str(tmp_path / "lookup"), check_interval=0)
+    assert tables.get("jeu-1") is not None
+
+    model_file.write_bytes(b"v2 - retrained")  # même chemin, même clé de jeu
+    os.utime(model_file, ns=(0, model_file.stat().st_mtime_ns + 10**9))
+
+    assert tables.get("jeu-1") is None
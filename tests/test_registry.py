@@ -0,0 +1,41 @@
+"""Registre des modèles sans manifest : un fichier réentraîné et écrasé sur place est rechargé à chaud."""
+import os
+
+import joblib
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression
+
+from api import registry
+
+
+def fit(slope: float) -> LinearRegression:
+    X = np.arange(10, dtype=float).reshape(-1, 1)
+    return LinearRegression().fit(X, slope * X.ravel())
+
+
+@pytest.fixture
+def paths(tmp_path, monkeypatch):
+    paths = {key: str(tmp_path / f"model_{key}.pkl") for key in registry.DEFAULT_PATHS}
+    for i, path in enumerate(paths.values()):
+        joblib.dump(fit(i + 1), path)
+    monkeypatch.setattr(registry, "DEFAULT_PATHS", paths)
+    return paths
+
+
+def test_config_model_overwritten_in_place_is_swapped(paths, tmp_path):
+    models = registry.VersionedRegistry(str(tmp_path / "manifest.json"), mmap=False, check_interval=0)
+    before = models.current()
+    assert before.models["conso"].predict([[1.0]])[0] == pytest.approx(2.0)
+
+    joblib.dump(fit(10), paths["conso"])  # réentraînement : même chemin, version toujours "config"
+    st = os.stat(paths["conso"])
+    os.utime(paths["conso"], ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert models._watch_fingerprint() != models._fingerprint  # détecté par current()
+
+    assert models.reload()
+    after = models.current()
+    assert after.versions == before.versions
+    assert after.key != before.key
+    assert after.models["conso"].predict([[1.0]])[0] == pytest.approx(10.0)
+    assert not models.reload()  # fichiers inchangés : pas de nouvelle bascule
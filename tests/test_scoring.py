@@ -0,0 +1,15 @@
+"""Scoring de fichier en flux : un fichier sans ligne de données garde son en-tête."""
+import pandas as pd
+
+from api.inference import FEATURES, OUTPUTS
+from api.scoring import stream_scores
+
+
+def test_empty_csv_returns_header_only(tmp_path):
+    path = tmp_path / "vide.csv"
+    pd.DataFrame(columns=["id"] + FEATURES).to_csv(path, index=False)
+
+    body = "".join(stream_scores(str(path), "csv", "csv", {}, chunk_rows=100, keep=["id"]))
+
+    assert body == ",".join(["id"] + OUTPUTS + ["error"]) + "\n"
+    assert not path.exists()  # fichier temporaire supprimé
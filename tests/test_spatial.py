@@ -0,0 +1,65 @@
+"""Publication de l'index spatial : verrou inter-processus, version concurrente, versions conservées."""
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from api import spatial
+
+CSV = "dpe_73.csv"
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(spatial, "STORE_DIR", str(tmp_path))
+    return spatial.index_root(CSV)
+
+
+def points(n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    lat, lon = rng.uniform(45.2, 45.8, n), rng.uniform(5.6, 7.1, n)
+    order = np.argsort(spatial.cell_keys(lat, lon), kind="stable")
+    lat, lon = lat[order], lon[order]
+    return {
+        "keys": spatial.cell_keys(lat, lon),
+        "lat": lat,
+        "lon": lon,
+        "xyz": spatial.unit_vectors(lat, lon),
+        "label": rng.integers(0, 7, n).astype("int8"),
+        "conso": rng.uniform(50, 400, n).astype("float32"),
+    }
+
+
+def test_publish_keeps_previous_version_for_late_readers(store):
+    paths = [spatial._publish(CSV, points(100 + i, seed=i), {"mode": "full"}) for i in range(3)]
+
+    assert sorted(os.listdir(store)) == ["v2", "v3"]
+    assert spatial.current_index_path(CSV) == paths[-1]
+    assert spatial.SpatialIndex(paths[-2]).rows == 101  # précédente encore lisible
+
+
+def test_concurrent_publish_returns_winning_version(store, monkeypatch):
+    winner = spatial._publish(CSV, points(100), {"mode": "full"})
+    monkeypatch.setattr(spatial, "_versions", lambda root: [])  # second processus : même v<n+1> calculé
+
+    path = spatial._publish(CSV, points(50, seed=1), {"mode": "full"})
+
+    assert path == winner
+    assert os.listdir(store) == ["v1"]  # dossier temporaire du perdant supprimé
+    assert spatial.SpatialIndex(path).rows == 100
+
+
+def test_index_updates_are_serialized(store):
+    entered = threading.Event()
+
+    def second_writer():
+        with spatial._index_lock(CSV, poll=0.01):
+            entered.set()
+
+    with spatial._index_lock(CSV):
+        thread = threading.Thread(target=second_writer)
+        thread.start()
+        assert not entered.wait(0.2)  # attend la fin de la mise à jour en cours
+    thread.join(5)
+    assert entered.is_set()